@@ -0,0 +1,315 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  NumPy engine that advances many Kuba boards at once with the same move rules as KubaGame.
+
+import random
+import sys
+
+import numpy as np
+
+from KubaGame import KubaGame
+
+DIRECTIONS = ("L", "R", "F", "B")
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+# cell values, the marble colors use the same order as KubaGame.get_marble_count
+EMPTY = 0
+WHITE = 1
+BLACK = 2
+RED = 3
+CELL_VALUES = {"X": EMPTY, "W": WHITE, "B": BLACK, "R": RED}
+
+_START_ROWS = (
+    "WWXXXBB",
+    "WWXRXBB",
+    "XXRRRXX",
+    "XRRRRRX",
+    "XXRRRXX",
+    "BBXRXWW",
+    "BBXXXWW",
+)
+
+
+def _build_tables():
+    """
+    Builds the move tables indexed by square * 4 + direction code: the flat board index of each cell on the ray from
+    the square to the edge (padded with 0 past the edge), the ray length, and the flat index of the access square (-1
+    on the edge of the board).
+    """
+    steps = {"L": (0, -1), "R": (0, 1), "F": (-1, 0), "B": (1, 0)}
+    ray_index = np.zeros((196, 7), dtype=np.intp)
+    ray_length = np.zeros(196, dtype=np.intp)
+    access_index = np.full(196, -1, dtype=np.intp)
+    for x in range(7):
+        for y in range(7):
+            for code, direction in enumerate(DIRECTIONS):
+                dx, dy = steps[direction]
+                move = (x * 7 + y) * 4 + code
+                cx, cy = x, y
+                length = 0
+                while 0 <= cx <= 6 and 0 <= cy <= 6:
+                    ray_index[move, length] = cx * 7 + cy
+                    length += 1
+                    cx += dx
+                    cy += dy
+                ray_length[move] = length
+                ax, ay = x - dx, y - dy
+                if 0 <= ax <= 6 and 0 <= ay <= 6:
+                    access_index[move] = ax * 7 + ay
+    return ray_index, ray_length, access_index
+
+
+_RAY_INDEX, _RAY_LENGTH, _ACCESS_INDEX = _build_tables()
+_POSITIONS = np.arange(7)
+
+
+class KubaBatch:
+    """
+    Class holding N Kuba games as an (N, 7, 7) int8 array and applying one move to every board per call with
+    vectorized NumPy operations.  Moves, rejections, push-offs, capture counts, the Ko rule, turn order and the winner
+    follow KubaGame.make_move.  Players are referred to by index, 0 for player A and 1 for player B, and a turn or
+    winner of -1 means None.
+    """
+
+    def __init__(self, games, player_a_color="W", player_b_color="B"):
+        """
+        Creates the given number of games, all at the starting position with no captures, no current turn and no
+        winner.
+        """
+        start = np.array([[CELL_VALUES[cell] for cell in row] for row in _START_ROWS], dtype=np.int8)
+        self._boards = np.repeat(start[np.newaxis], games, axis=0)
+        self._ko_boards = np.full((games, 49), -1, dtype=np.int8)
+        self._colors = np.array([CELL_VALUES[player_a_color], CELL_VALUES[player_b_color]], dtype=np.int8)
+        self._counts = np.repeat(np.array([[8, 8, 13]], dtype=np.int16), games, axis=0)
+        self._captured = np.zeros((games, 2), dtype=np.int16)
+        self._turns = np.full(games, -1, dtype=np.int8)
+        self._winners = np.full(games, -1, dtype=np.int8)
+
+    def __len__(self):
+        """
+        Returns the number of games.
+        """
+        return len(self._boards)
+
+    def truncate(self, games):
+        """
+        Keeps the first games boards and drops the rest, so boards that were never loaded are not played.
+        """
+        self._boards = self._boards[:games]
+        self._ko_boards = self._ko_boards[:games]
+        self._counts = self._counts[:games]
+        self._captured = self._captured[:games]
+        self._turns = self._turns[:games]
+        self._winners = self._winners[:games]
+
+    def make_moves(self, players, xs, ys, directions):
+        """
+        Takes arrays of length N holding, for every board, the moving player (0 or 1), the coordinates as separate x and
+        y arrays and the direction code (see DIRECTION_CODES).  Applies each legal move to its board and returns a
+        boolean array that is True where the move was made.  Like KubaGame.make_move, the first player to try a move
+        takes the first turn even if the move is rejected.
+        """
+        players = np.asarray(players, dtype=np.intp)
+        xs = np.asarray(xs, dtype=np.intp)
+        ys = np.asarray(ys, dtype=np.intp)
+        directions = np.asarray(directions, dtype=np.intp)
+        games = np.arange(len(self._boards))
+        flat = self._boards.reshape(len(self._boards), 49)
+
+        first = self._turns == -1
+        self._turns[first] = players[first]
+
+        legal = (self._winners == -1) & (self._turns == players)
+        legal &= (xs >= 0) & (xs <= 6) & (ys >= 0) & (ys <= 6) & (directions >= 0) & (directions <= 3)
+        move = np.where(legal, (xs * 7 + ys) * 4 + directions, 0)
+        length = _RAY_LENGTH[move]
+        legal &= length > 1     # cannot push your own marble off
+
+        # gather every ray as a row of 7 cells, with the cells past the edge of the board marked -1
+        ray_index = _RAY_INDEX[move]
+        line = flat[games[:, np.newaxis], ray_index]
+        inside = _POSITIONS < length[:, np.newaxis]
+        line = np.where(inside, line, -1)
+        legal &= line[:, 0] == self._colors[players]
+        access = _ACCESS_INDEX[move]
+        legal &= (access < 0) | (flat[games, np.maximum(access, 0)] == EMPTY)
+
+        # the first vacant cell stops the push, without one the last cell of the ray is pushed off
+        vacant = line == EMPTY
+        has_gap = vacant.any(axis=1)
+        stop = np.where(has_gap, vacant.argmax(axis=1), length - 1)
+        pushed_off = np.where(has_gap, EMPTY, line[games, length - 1])
+        shifted = np.concatenate([np.zeros((len(line), 1), dtype=line.dtype), line[:, :-1]], axis=1)
+        new_line = np.where(_POSITIONS <= stop[:, np.newaxis], shifted, line)
+
+        # a plain shift that recreates the board before the opponent's last move breaks the Ko rule
+        candidate = flat.copy()
+        rows = np.broadcast_to(games[:, np.newaxis], ray_index.shape)
+        candidate[rows[inside], ray_index[inside]] = new_line[inside]
+        ko = has_gap & (candidate == self._ko_boards).all(axis=1)
+        legal &= ~ko
+
+        self._ko_boards[legal] = flat[legal]
+        flat[legal] = candidate[legal]
+
+        # update captures, marble counts, the turn and the winner of the boards that moved
+        mover = players[legal]
+        pushed = pushed_off[legal]
+        moved = games[legal]
+        self._captured[moved, mover] += pushed == RED
+        off = pushed != EMPTY
+        np.subtract.at(self._counts, (moved[off], pushed[off] - 1), 1)
+        self._turns[moved] = 1 - mover
+
+        colors = self._colors
+        capture_win = self._captured[moved, mover] >= 7
+        opponent_gone = self._counts[moved, colors[1 - mover] - 1] == 0
+        own_gone = self._counts[moved, colors[mover] - 1] == 0
+        winners = np.where(capture_win | opponent_gone, mover, np.where(own_gone, 1 - mover, -1))
+        self._winners[moved] = np.where(off, winners, self._winners[moved])
+        return legal
+
+    def load_game(self, index, game):
+        """
+        Copies the board, marble counts, captures, turn and winner of a KubaGame into board index.  The game's players
+        must have the colors this batch was created with.  KubaGame does not keep the board from before the last move,
+        so the Ko rule is not applied to the first move made on the loaded board.
+        """
+        names = (game.get_player_a_name(), game.get_player_b_name())
+        self._boards[index] = [[CELL_VALUES[game.get_marble((x, y))] for y in range(7)] for x in range(7)]
+        self._ko_boards[index] = -1
+        self._counts[index] = game.get_marble_count()
+        self._captured[index] = (game.get_captured(names[0]), game.get_captured(names[1]))
+        turn = game.get_current_turn()
+        self._turns[index] = names.index(turn) if turn is not None else -1
+        winner = game.get_winner()
+        self._winners[index] = names.index(winner) if winner is not None else -1
+
+    def play_random(self, max_moves=200, seed=None):
+        """
+        Plays uniformly random legal moves on every board until each board has a winner or max_moves moves have been
+        tried, and returns the winner of each board as 0, 1 or -1 for no result.  A player to move with no legal moves
+        loses, and a board without a current turn starts with player A.
+        """
+        rng = np.random.default_rng(seed)
+        games = len(self._boards)
+        losers = np.full(games, -1, dtype=np.int8)
+        for _ in range(max_moves):
+            active = (self._winners == -1) & (losers == -1)
+            if not active.any():
+                break
+            mask = self.legal_move_mask().reshape(games, 196)
+            players = np.maximum(self._turns, 0)
+            stuck = active & ~mask.any(axis=1)
+            losers[stuck] = players[stuck]
+            active &= ~stuck
+            choice = (rng.random((games, 196)) * mask).argmax(axis=1)
+            squares = choice // 4
+            xs = np.where(active, squares // 7, -1)     # boards that are finished get an off board move
+            self.make_moves(players, xs, squares % 7, choice % 4)
+        return np.where(losers >= 0, 1 - losers, self._winners).astype(np.int8)
+
+    def legal_move_mask(self):
+        """
+        Returns an (N, 49, 4) boolean array of the moves each board's player to move can make, indexed by square
+        (x * 7 + y) and direction code.  While a board has no current turn the mask is for player A.  The Ko rule is
+        not applied, so make_moves can still reject a masked move that repeats a position.
+        """
+        flat = self._boards.reshape(len(self._boards), 49)
+        players = np.maximum(self._turns, 0)
+        own = flat == self._colors[players][:, np.newaxis]
+        access = _ACCESS_INDEX.reshape(49, 4)
+        access_clear = (access < 0) | (flat[:, np.maximum(access, 0)] == EMPTY)
+        on_board = _RAY_LENGTH.reshape(49, 4) > 1
+        mask = own[:, :, np.newaxis] & access_clear & on_board
+        mask &= (self._winners == -1)[:, np.newaxis, np.newaxis]
+        return mask
+
+    def get_boards(self):
+        """
+        Returns the (N, 7, 7) int8 board array using the EMPTY, WHITE, BLACK and RED cell values.
+        """
+        return self._boards
+
+    def get_marble_counts(self):
+        """
+        Returns an (N, 3) array of the white, black and red marble counts of each board.
+        """
+        return self._counts
+
+    def get_captured(self):
+        """
+        Returns an (N, 2) array of the reds captured by player A and player B on each board.
+        """
+        return self._captured
+
+    def get_current_turns(self):
+        """
+        Returns the player to move on each board, -1 before the first move.
+        """
+        return self._turns
+
+    def get_winners(self):
+        """
+        Returns the winner of each board, -1 while there is no winner.
+        """
+        return self._winners
+
+
+def verify_parity(games=200, moves=200, seed=0):
+    """
+    Plays the same random moves on a KubaBatch and on one KubaGame per board and raises AssertionError at the first
+    difference in move results, boards, marble counts, captures, turns or winners.  Half of the moves are legal moves,
+    preferring push-offs so games are won, and half are random coordinates and directions, which are usually
+    rejected.  Returns the number of moves compared.
+    """
+    rng = random.Random(seed)
+    names = ("PlayerA", "PlayerB")
+    batch = KubaBatch(games)
+    reference = [KubaGame((names[0], "W"), (names[1], "B")) for _ in range(games)]
+    compared = 0
+    for _ in range(moves):
+        players = np.zeros(games, dtype=np.intp)
+        xs = np.zeros(games, dtype=np.intp)
+        ys = np.zeros(games, dtype=np.intp)
+        directions = np.zeros(games, dtype=np.intp)
+        for index, game in enumerate(reference):
+            player = rng.randrange(2)
+            legal = list(game.legal_moves(names[player])) if rng.random() < 0.5 else []
+            pushes = [move for move in legal if game.get_pushed_off_marble(move[0], move[1]) is not None]
+            if pushes and rng.random() < 0.5:
+                (x, y), direction = rng.choice(pushes)
+            elif legal:
+                (x, y), direction = rng.choice(legal)
+            else:
+                x, y, direction = rng.randrange(-1, 8), rng.randrange(-1, 8), rng.choice(DIRECTIONS)
+            players[index], xs[index], ys[index] = player, x, y
+            directions[index] = DIRECTION_CODES[direction]
+
+        made = batch.make_moves(players, xs, ys, directions)
+        for index, game in enumerate(reference):
+            result = game.make_move(names[players[index]], (xs[index], ys[index]), DIRECTIONS[directions[index]])
+            compared += 1
+            assert bool(result) == bool(made[index]), f"game {index}: make_move returned {result}"
+            cells = [CELL_VALUES[game.get_marble((x, y))] for x in range(7) for y in range(7)]
+            assert cells == batch.get_boards()[index].ravel().tolist(), f"game {index}: boards differ"
+            assert list(game.get_marble_count()) == batch.get_marble_counts()[index].tolist()
+            assert [game.get_captured(names[0]), game.get_captured(names[1])] == batch.get_captured()[index].tolist()
+            turn = batch.get_current_turns()[index]
+            assert game.get_current_turn() == (names[turn] if turn >= 0 else None), f"game {index}: turns differ"
+            winner = batch.get_winners()[index]
+            assert game.get_winner() == (names[winner] if winner >= 0 else None), f"game {index}: winners differ"
+    return compared
+
+
+def main():
+    """
+    Runs the parity check against KubaGame
+    """
+    compared = verify_parity()
+    print(f"KubaBatch matches KubaGame on {compared} moves")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Bitboard implementation of the Kuba board game with the same public interface as KubaGame.
+# Game rules are explained at this link:  https://sites.google.com/site/boardandpieces/list-of-games/kuba
+
+# Squares are numbered x * 7 + y, so bit 0 is (0, 0), bit 6 is (0, 6) and bit 48 is (6, 6).  A move along a row is a
+# shift by 1 and a move along a column is a shift by 7.
+
+DIRECTIONS = ("L", "R", "F", "B")
+
+# (step in rows, step in columns) for each direction, matching KubaGame.make_move
+_DIRECTION_STEPS = {"L": (0, -1), "R": (0, 1), "F": (-1, 0), "B": (1, 0)}
+
+_START_ROWS = (
+    "WWXXXBB",
+    "WWXRXBB",
+    "XXRRRXX",
+    "XRRRRRX",
+    "XXRRRXX",
+    "BBXRXWW",
+    "BBXXXWW",
+)
+
+
+def _build_rays():
+    """
+    Builds the move table.  For every direction it maps each coordinate tuple to the square's bit, the ray mask (the
+    square itself through the edge of the board in the direction of the move), the bit of the access square that must
+    be vacant (0 at the edge), the bit that falls off the board on a push-off, and the shift amount.  Moves that would
+    push the moving marble straight off the board are stored as None, and coordinates off the board are not stored at
+    all so one dictionary lookup validates both.
+    """
+    rays = {}
+    for direction in DIRECTIONS:
+        dx, dy = _DIRECTION_STEPS[direction]
+        table = {}
+        for x in range(7):
+            for y in range(7):
+                ray = 0
+                edge = 0
+                cx, cy = x, y
+                while 0 <= cx <= 6 and 0 <= cy <= 6:
+                    edge = 1 << (cx * 7 + cy)
+                    ray |= edge
+                    cx += dx
+                    cy += dy
+                bit = 1 << (x * 7 + y)
+                if ray == bit:
+                    table[(x, y)] = None
+                    continue
+                ax, ay = x - dx, y - dy
+                access = 1 << (ax * 7 + ay) if 0 <= ax <= 6 and 0 <= ay <= 6 else 0
+                table[(x, y)] = (bit, ray, access, edge, dx * 7 + dy)
+        rays[direction] = table
+    return rays
+
+
+_RAYS = _build_rays()
+
+_COLOR_INDEX = {"W": 0, "B": 1, "R": 2}
+
+_OFF_BOARD = object()
+
+
+def _bit_board(color):
+    """
+    Returns the bitboard of the starting position for one marble color.
+    """
+    board = 0
+    for x, row in enumerate(_START_ROWS):
+        for y, cell in enumerate(row):
+            if cell == color:
+                board |= 1 << (x * 7 + y)
+    return board
+
+
+class KubaBitboard:
+    """
+    Class representing the Kuba Board Game stored as three 49 bit integers, one per marble color (W, B and R).  It
+    exposes the same public methods as KubaGame so it can be used as a drop in replacement where move throughput
+    matters.  Marble lookups are a single bit test, marble counts are popcounts, and row and column pushes are shift
+    and mask operations instead of list walks.
+    """
+
+    def __init__(self, player_a, player_b):
+        """
+        Initiates the bitboards, player information, current turn to None and current winner to None.  The bitboards
+        are kept in a list in the order (W, B, R) so a player's color can be looked up by index.
+        """
+        self._boards = [_bit_board("W"), _bit_board("B"), _bit_board("R")]
+        self._player_a = player_a
+        self._player_b = player_b
+        self._player_a_name = player_a[0]
+        self._player_b_name = player_b[0]
+        self._player_a_color = player_a[1]
+        self._player_b_color = player_b[1]
+        self._player_a_captured = 0
+        self._player_b_captured = 0
+        a_index = _COLOR_INDEX[self._player_a_color]
+        b_index = _COLOR_INDEX[self._player_b_color]
+        self._sides = {
+            self._player_a_name: (a_index, self._player_b_name, b_index),
+            self._player_b_name: (b_index, self._player_a_name, a_index),
+        }
+        self._current_turn = None
+        self._winner = None
+        self._ko_boards = None
+
+    def get_current_turn(self):
+        """
+        Returns the player whose turn it is.
+        """
+        return self._current_turn
+
+    def make_move(self, player_name, coordinates, direction):
+        """
+        Takes a player name such as ("PlayerA"), coordinates such as (3, 5), and direction ("L" for left, "R" for right,
+        "B" for backward, or "F" for forward) and moves the marbles exactly as KubaGame.make_move does.  Returns False
+        if the move is not legal, otherwise updates the board, capture counts and turn and returns True.  The winner is
+        checked after every push-off, the only time captures or marble counts change.  A move that returns the board to
+        its state before the opponent's last move breaks the Ko rule and is rejected.  Unknown player names and
+        directions are rejected.
+        """
+        if self._winner is not None:
+            return False
+        side = self._sides.get(player_name)
+        if side is None:
+            return False
+        if self._current_turn is None:
+            self._current_turn = player_name
+        elif self._current_turn != player_name:
+            return False
+
+        table = _RAYS.get(direction)
+        if table is None:
+            return False
+        move = table.get(coordinates, _OFF_BOARD)
+        if move is None:
+            return False     # cannot push your own marble off
+        if move is _OFF_BOARD:
+            return False
+        own, opponent, opponent_index = side
+        boards = self._boards
+        bit, ray, access, edge, shift = move
+        if not boards[own] & bit:
+            return False
+
+        white, black, red = boards
+        occupied = white | black | red
+        if occupied & access:
+            return False
+
+        # find the first vacant square along the ray, the marbles between it and the moving marble shift one square
+        empty = ray & ~occupied
+        if empty:
+            if shift < 0:
+                moving = ray & ~((2 << (empty.bit_length() - 1)) - 1)
+            else:
+                moving = ray & ((empty & -empty) - 1)
+            vacated = moving
+        else:
+            if red & edge:
+                if player_name == self._player_a_name:
+                    self._player_a_captured += 1
+                else:
+                    self._player_b_captured += 1
+            moving = ray & ~edge
+            vacated = ray
+
+        # clear the shifted squares then drop each marble one square further along the ray, skipping colors that
+        # have no marble on the shifted squares
+        if shift < 0:
+            shift = -shift
+            shifted = white & vacated
+            if shifted:
+                boards[0] = (white ^ shifted) | ((shifted & moving) >> shift)
+            shifted = black & vacated
+            if shifted:
+                boards[1] = (black ^ shifted) | ((shifted & moving) >> shift)
+            shifted = red & vacated
+            if shifted:
+                boards[2] = (red ^ shifted) | ((shifted & moving) >> shift)
+        else:
+            shifted = white & vacated
+            if shifted:
+                boards[0] = (white ^ shifted) | ((shifted & moving) << shift)
+            shifted = black & vacated
+            if shifted:
+                boards[1] = (black ^ shifted) | ((shifted & moving) << shift)
+            shifted = red & vacated
+            if shifted:
+                boards[2] = (red ^ shifted) | ((shifted & moving) << shift)
+
+        # a push-off always changes the marble counts, so only a plain shift can break the Ko rule
+        if empty and self._ko_boards == boards:
+            boards[0] = white
+            boards[1] = black
+            boards[2] = red
+            return False
+        self._ko_boards = [white, black, red]
+
+        # set the turn order to the next player and check for a winner
+        self._current_turn = opponent
+        if not empty:
+            if self._player_a_captured >= 7:
+                self._winner = self._player_a_name
+            elif self._player_b_captured >= 7:
+                self._winner = self._player_b_name
+            elif not boards[opponent_index]:
+                self._winner = player_name
+            elif not boards[own]:
+                self._winner = opponent
+        return True
+
+    def get_winner(self):
+        """
+        Returns the winner of the game if a winner has been chosen, or returns None if there is no winner yet.
+        """
+        return self._winner
+
+    def get_captured(self, player):
+        """
+        Takes a player name as a parameter such as ("PlayerA") and returns the number of red marbles that player
+        has captured.
+        """
+        if self._player_a_name == player:
+            return self._player_a_captured
+        if self._player_b_name == player:
+            return self._player_b_captured
+        return "Not a valid player name"
+
+    def get_marble(self, coordinates):
+        """
+        Takes coordinates as a parameter such as (5, 6) and returns the color of marble at those coordinates or returns
+        X if no marble is present.
+        """
+        x = coordinates[0]
+        y = coordinates[1]
+        if x < 0 or x > 6 or y < 0 or y > 6:
+            return "Not a valid coordinate"
+        bit = 1 << (x * 7 + y)
+        white, black, red = self._boards
+        if white & bit:
+            return "W"
+        if black & bit:
+            return "B"
+        if red & bit:
+            return "R"
+        return "X"
+
+    def get_marble_count(self):
+        """
+        Returns the number of white, black and red marbles as a tuple in the order (W,B,R).
+        """
+        white, black, red = self._boards
+        return white.bit_count(), black.bit_count(), red.bit_count()
+
+    def get_rows(self):
+        """
+        Returns the board as a list of seven row lists in the same layout KubaGame uses.
+        """
+        return [[self.get_marble((x, y)) for y in range(7)] for x in range(7)]
+
+    def print_board(self):
+        """
+        Prints a visual of the game board
+        """
+        for row in self.get_rows():
+            print(row)
+
+    def get_player_a_color(self):
+        """
+        Returns the color of player A
+        """
+        return self._player_a_color
+
+    def get_player_b_color(self):
+        """
+        Returns the color of player B
+        """
+        return self._player_b_color
+
+    def get_player_a_name(self):
+        """
+        Returns the name of player A
+        """
+        return self._player_a_name
+
+    def get_player_b_name(self):
+        """
+        Returns the name of player B
+        """
+        return self._player_b_name
+
+    def get_player_a_count(self):
+        """
+        Returns the number of red marbles captured by player A
+        """
+        return self._player_a_captured
+
+    def get_player_b_count(self):
+        """
+        Returns the number of red marbles captured by player B
+        """
+        return self._player_b_captured
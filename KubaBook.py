@@ -0,0 +1,255 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Opening book for KubaGame: an offline builder that searches every position of the first plies from
+# the starting layout, and a memory mapped book file looked up by binary search.
+
+# Positions are stored in their KubaSymmetry canonical form, with the player to move as white, so the 8 rotations and
+# reflections of a position and both choices of first player share one entry.  An entry's key is the first 8 bytes of
+# a BLAKE2b digest of the canonical board and the reds captured by the player to move and by the opponent, and its move
+# is the best move in the canonical frame, which probe maps back to the game's frame.
+#
+# File layout:  the 8 byte header b"KUBABK\x01\x00", a 4 byte little endian entry count, then the entries sorted by
+# key.  Each entry is the 8 byte key, the move byte (x * 7 + y) * 4 + direction code as in KubaRecord, the 4 byte
+# score for the player to move and the search depth, all little endian.
+#
+# The key does not cover the Ko rule, which depends on the position before the last move, so probe only returns a
+# move that is legal in the game.
+
+import argparse
+import hashlib
+import mmap
+import multiprocessing
+import struct
+import sys
+import time
+
+from KubaGame import KubaGame
+from KubaRecord import decode_move, encode_move
+from KubaSearch import KubaSearch
+from KubaSymmetry import board_string, canonical_board, transform_move, untransform_move
+
+MAGIC = b"KUBABK\x01\x00"
+PLAYERS = (("PlayerA", "W"), ("PlayerB", "B"))
+
+_COUNT = struct.Struct("<I")
+_ENTRY = struct.Struct("<QBiB")
+_KEY = struct.Struct("<Q")
+
+
+class BookError(Exception):
+    """
+    Raised when a book file is not in the expected format.
+    """
+    pass
+
+
+def book_key(game, player_name):
+    """
+    Returns (key, transform) for the game's position with player_name to move, where the transform maps the game's
+    moves to the canonical frame the book stores them in.
+    """
+    if player_name == game.get_player_a_name():
+        color = game.get_player_a_color()
+        opponent = game.get_player_b_name()
+    else:
+        color = game.get_player_b_color()
+        opponent = game.get_player_a_name()
+    cells, transform = canonical_board(board_string(game), color == "B")
+    text = f"{cells}{game.get_captured(player_name)}:{game.get_captured(opponent)}"
+    key = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+    return key, transform
+
+
+def _player_to_move(game):
+    """
+    Returns the player to move, taking player A before the first move.
+    """
+    player_name = game.get_current_turn()
+    if player_name is None:
+        return game.get_player_a_name()
+    return player_name
+
+
+def expand(plies):
+    """
+    Returns a dict mapping the key of every position reached in fewer than plies moves from the starting layout, with
+    player A moving first, to the list of (player, coordinates, direction) moves that first reached it.  Positions where
+    the game is over are left out.
+    """
+    game = KubaGame(*PLAYERS)
+    positions = {book_key(game, _player_to_move(game))[0]: []}
+    frontier = [[]]
+    for _ in range(plies - 1):
+        next_frontier = []
+        for moves in frontier:
+            game = KubaGame.replay(PLAYERS, moves)
+            player_name = _player_to_move(game)
+            for coordinates, direction in list(game.legal_moves(player_name)):
+                delta = game.make_move(player_name, coordinates, direction, return_delta=True)
+                child_player = game.get_current_turn()
+                if game.get_winner() is None and next(game.legal_moves(child_player), None) is not None:
+                    key = book_key(game, child_player)[0]
+                    if key not in positions:
+                        child = moves + [(player_name, coordinates, direction)]
+                        positions[key] = child
+                        next_frontier.append(child)
+                game.unmake_move(delta)
+        frontier = next_frontier
+    return positions
+
+
+def score_position(moves, depth):
+    """
+    Replays the moves from the starting layout, searches the position to the given depth and returns the book entry
+    (key, canonical move byte, score, depth).
+    """
+    game = KubaGame.replay(PLAYERS, moves)
+    player_name = _player_to_move(game)
+    search = KubaSearch(time_budget=float("inf"), max_depth=depth, table_bits=16)
+    move = search.choose_move(game, player_name)
+    key, transform = book_key(game, player_name)
+    stats = search.get_last_stats()
+    return key, encode_move(*transform_move(move, transform)), stats["score"], stats["depth"]
+
+
+def _score_task(task):
+    """
+    Unpacks a task tuple for Pool.imap_unordered.
+    """
+    return score_position(*task)
+
+
+def build(path, plies=5, depth=4, workers=None, progress=None):
+    """
+    Searches every position reached in fewer than plies moves from the starting layout to the given depth and writes
+    the book to path.  Searches are spread over a pool of worker processes (one per CPU by default), or run in this
+    process when workers is 1.  progress, if given, is called with a message at each stage.  Returns the number of
+    entries written.
+    """
+    def report(message):
+        if progress is not None:
+            progress(message)
+
+    positions = expand(plies)
+    report(f"{len(positions):,} positions in the first {plies} plies")
+    tasks = [(moves, depth) for moves in positions.values()]
+    if workers == 1:
+        entries = [_score_task(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            entries = list(pool.imap_unordered(_score_task, tasks, 8))
+    report(f"{len(entries):,} positions searched to depth {depth}")
+
+    entries.sort()
+    with open(path, "wb") as book_file:
+        book_file.write(MAGIC)
+        book_file.write(_COUNT.pack(len(entries)))
+        for entry in entries:
+            book_file.write(_ENTRY.pack(*entry))
+    return len(entries)
+
+
+class KubaBook:
+    """
+    Read only access to a book file through mmap.  A lookup is a binary search over the sorted keys, so it reads
+    O(log n) entries and nothing is loaded up front.
+    """
+
+    def __init__(self, path):
+        """
+        Opens and maps the book file at path.
+        """
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise BookError(f"{path} is empty")
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise BookError(f"{path} is not a Kuba opening book")
+        self._count = _COUNT.unpack_from(self._map, len(MAGIC))[0]
+        self._start = len(MAGIC) + _COUNT.size
+        if len(self._map) != self._start + self._count * _ENTRY.size:
+            self.close()
+            raise BookError(f"{path} is truncated")
+
+    def __len__(self):
+        """
+        Returns the number of positions in the book.
+        """
+        return self._count
+
+    def probe_key(self, key):
+        """
+        Returns the (canonical move byte, score, depth) stored for a key, or None if the key is not in the book.
+        """
+        book_map = self._map
+        start = self._start
+        size = _ENTRY.size
+        low = 0
+        high = self._count
+        while low < high:
+            middle = (low + high) // 2
+            if _KEY.unpack_from(book_map, start + middle * size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self._count:
+            return None
+        entry = _ENTRY.unpack_from(book_map, start + low * size)
+        if entry[0] != key:
+            return None
+        return entry[1:]
+
+    def probe(self, game, player_name=None):
+        """
+        Takes a KubaGame and returns (move, score, depth) for the player to move, where move is a (coordinates,
+        direction) tuple, or None if the position is not in the book or its book move is not legal.  Before the first
+        move player_name says which player is moving, player A by default.
+        """
+        if player_name is None:
+            player_name = _player_to_move(game)
+        key, transform = book_key(game, player_name)
+        entry = self.probe_key(key)
+        if entry is None:
+            return None
+        move = untransform_move(decode_move(entry[0]), transform)
+        if move not in game.legal_moves(player_name):
+            return None
+        return move, entry[1], entry[2]
+
+    def close(self):
+        """
+        Unmaps and closes the file.
+        """
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    """
+    Builds an opening book from the command line
+    """
+    parser = argparse.ArgumentParser(description="Build a Kuba opening book.")
+    parser.add_argument("path", help="book file to write")
+    parser.add_argument("--plies", type=int, default=5, help="book positions reached in fewer than this many moves")
+    parser.add_argument("--depth", type=int, default=4, help="search depth for each position")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU by default")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = build(args.path, args.plies, args.depth, args.workers,
+                  progress=lambda message: print(message, file=sys.stderr))
+    elapsed = time.perf_counter() - start
+    print(f"{count:,} positions written in {elapsed:.1f} seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Static evaluation of KubaGame positions for the computer players, kept up to date incrementally from
+# the squares each move changes, with a bounded LRU cache of scores by position.
+
+# The evaluation weighs four features for each color: the marbles left on the board, the reds captured, the mobility,
+# the number of moves that are legal apart from the Ko rule, and the edge exposure, the marbles that sit in a run of
+# marbles touching an end of their row or column and so can be pushed off from the other side.  Mobility and exposure
+# add up over the 7 rows and 7 columns, and a row's share depends only on the 7 cells of the row, so the shares of
+# every possible line are computed once into a table.  A move changes cells in one row or column, so only that line
+# and the lines crossing it at the changed cells are looked up again.
+#
+# The evaluator keeps the line strings and feature totals of the positions on the current line of play, so after a
+# move only the squares it shifted are read, and a move that is taken back costs nothing.  Any other position is
+# compared row by row with the last one evaluated, usually a sibling in a search, so the line strings are only built
+# from scratch once.
+
+import argparse
+import itertools
+import random
+import sys
+import time
+from collections import OrderedDict
+
+from KubaGame import KubaGame
+
+CAPTURE_WEIGHT = 100
+MARBLE_WEIGHT = 60
+MOBILITY_WEIGHT = 2
+EXPOSURE_WEIGHT = 5
+
+PLAYERS = (("PlayerA", "W"), ("PlayerB", "B"))
+
+
+def line_features(line):
+    """
+    Takes the 7 cells of a row or column and returns (white mobility, black mobility, white exposure, black exposure)
+    for moves along the line.
+    """
+    mobility = {"W": 0, "B": 0, "R": 0, "X": 0}
+    exposure = {"W": 0, "B": 0, "R": 0, "X": 0}
+    for index, cell in enumerate(line):
+        if cell == "X":
+            continue
+        if index < 6 and (index == 0 or line[index - 1] == "X"):
+            mobility[cell] += 1
+        if index > 0 and (index == 6 or line[index + 1] == "X"):
+            mobility[cell] += 1
+        if "X" not in line[:index] or "X" not in line[index + 1:]:
+            exposure[cell] += 1
+    return mobility["W"], mobility["B"], exposure["W"], exposure["B"]
+
+
+_LINE_FEATURES = {"".join(line): line_features(line) for line in itertools.product("WBRX", repeat=7)}
+
+
+def board_features(game):
+    """
+    Returns (white mobility, black mobility, white exposure, black exposure) of a KubaGame by scanning all 49 cells,
+    without the line table.
+    """
+    rows = game.get_rows()
+    totals = [0, 0, 0, 0]
+    for line in rows + [[row[y] for row in rows] for y in range(7)]:
+        for index, value in enumerate(line_features(line)):
+            totals[index] += value
+    return tuple(totals)
+
+
+def score(game, player_name, features):
+    """
+    Returns the score of the position for the player from its (white mobility, black mobility, white exposure, black
+    exposure) features and the game's marble counts and captures.
+    """
+    if player_name == game.get_player_a_name():
+        color = game.get_player_a_color()
+        opponent = game.get_player_b_name()
+    else:
+        color = game.get_player_b_color()
+        opponent = game.get_player_a_name()
+    white, black, red = game.get_marble_count()
+    white_mobility, black_mobility, white_exposure, black_exposure = features
+    marbles = white - black
+    mobility = white_mobility - black_mobility
+    exposure = white_exposure - black_exposure
+    if color == "B":
+        marbles = -marbles
+        mobility = -mobility
+        exposure = -exposure
+    captures = game.get_captured(player_name) - game.get_captured(opponent)
+    return (CAPTURE_WEIGHT * captures + MARBLE_WEIGHT * marbles + MOBILITY_WEIGHT * mobility
+            - EXPOSURE_WEIGHT * exposure)
+
+
+def evaluate_scratch(game, player_name):
+    """
+    Returns the score of the position for the player, computed from a full scan of the board.
+    """
+    return score(game, player_name, board_features(game))
+
+
+class KubaEvaluator:
+    """
+    Evaluates positions of a KubaGame for the player to move, updating the features from the squares the last move
+    changed instead of scanning the board.  Scores are also kept in an LRU cache of cache_size positions keyed by
+    KubaGame.get_position_key and the player.  scans counts the positions whose features were added up from every line.
+    """
+
+    def __init__(self, cache_size=65536):
+        """
+        Takes the number of positions the score cache holds, 0 for no cache.
+        """
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._game = None
+        self._path = []
+        self._last = None
+        self.hits = 0
+        self.misses = 0
+        self.scans = 0
+
+    def evaluate(self, game, player_name):
+        """
+        Returns the score of the game's position for the player.
+        """
+        cache = self._cache
+        if self._cache_size:
+            key = (game.get_position_key(), player_name)
+            cached = cache.get(key)
+            if cached is not None:
+                cache.move_to_end(key)
+                self.hits += 1
+                return cached
+        self.misses += 1
+        result = score(game, player_name, self.get_features(game))
+        if self._cache_size:
+            cache[key] = result
+            if len(cache) > self._cache_size:
+                cache.popitem(last=False)
+        return result
+
+    def get_features(self, game):
+        """
+        Returns the (white mobility, black mobility, white exposure, black exposure) features of the game's position.
+        """
+        move_count = game.get_move_count()
+        position_hash = game.get_hash()
+        path = self._path
+        if game is not self._game:
+            self._game = game
+            path.clear()
+
+        # drop the positions of moves that have been taken back
+        while path and (path[-1][0] > move_count or (path[-1][0] == move_count and path[-1][1] != position_hash)):
+            path.pop()
+        if path and path[-1][0] == move_count:
+            return path[-1][3]
+
+        last_change = game.get_last_change()
+        if path and path[-1][0] == move_count - 1 and last_change is not None and last_change[0] == path[-1][1]:
+            entry = self._advance(game, path[-1][2:], last_change[1])
+        else:
+            entry = self._compare(game, self._last)
+            path.clear()
+        path.append((move_count, position_hash) + entry)
+        self._last = entry
+        return entry[1]
+
+    def _advance(self, game, previous, squares):
+        """
+        Returns the (lines, features) after a move from the previous (lines, features), where squares are the
+        coordinates the move shifted.  lines holds the rows then the columns as strings.
+        """
+        lines = list(previous[0])
+        changed = {}
+        get_marble = game.get_marble
+        for x, y in squares:
+            marble = get_marble((x, y))
+            if lines[x][y] != marble:
+                lines[x] = lines[x][:y] + marble + lines[x][y + 1:]
+                lines[7 + y] = lines[7 + y][:x] + marble + lines[7 + y][x + 1:]
+                changed[x] = None
+                changed[7 + y] = None
+        return lines, _update_features(previous, lines, changed)
+
+    def _compare(self, game, previous):
+        """
+        Returns the (lines, features) of the game's position found by comparing its rows with the previous (lines,
+        features), usually a position a move or two away such as a sibling in a search.  With no previous position
+        the features are added up from every line.
+        """
+        rows = ["".join(row) for row in game.get_rows()]
+        if previous is None:
+            self.scans += 1
+            lines = rows + ["".join(row[y] for row in rows) for y in range(7)]
+            return lines, _update_features(([""] * 14, (0, 0, 0, 0)), lines, range(14))
+
+        old_lines = previous[0]
+        lines = list(old_lines)
+        changed = {}
+        for x, row in enumerate(rows):
+            old_row = old_lines[x]
+            if row == old_row:
+                continue
+            lines[x] = row
+            changed[x] = None
+            for y in range(7):
+                if row[y] != old_row[y]:
+                    lines[7 + y] = lines[7 + y][:x] + row[y] + lines[7 + y][x + 1:]
+                    changed[7 + y] = None
+        return lines, _update_features(previous, lines, changed)
+
+
+def _update_features(previous, lines, changed):
+    """
+    Returns the features of the previous (lines, features) with the shares of the changed line numbers replaced by
+    those of the new lines.
+    """
+    old_lines = previous[0]
+    white_mobility, black_mobility, white_exposure, black_exposure = previous[1]
+    for index in changed:
+        new = _LINE_FEATURES[lines[index]]
+        old = _LINE_FEATURES.get(old_lines[index], (0, 0, 0, 0))
+        white_mobility += new[0] - old[0]
+        black_mobility += new[1] - old[1]
+        white_exposure += new[2] - old[2]
+        black_exposure += new[3] - old[3]
+    return white_mobility, black_mobility, white_exposure, black_exposure
+
+
+def _positions(games, seed):
+    """
+    Plays random games and returns the list of (move list, player to move) of every position reached, for replaying
+    in the benchmark.
+    """
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(games):
+        game = KubaGame(*PLAYERS)
+        player_name = PLAYERS[0][0]
+        moves = []
+        for _ in range(120):
+            legal = list(game.legal_moves(player_name))
+            if not legal:
+                break
+            positions.append((list(moves), player_name))
+            coordinates, direction = rng.choice(legal)
+            game.make_move(player_name, coordinates, direction)
+            moves.append((player_name, coordinates, direction))
+            if game.get_winner() is not None:
+                break
+            player_name = game.get_current_turn()
+    return positions
+
+
+def _time_leaves(games, evaluate):
+    """
+    Makes every legal move of every position, evaluates the position for the player who replies and takes the move
+    back, as a search does at its leaves.  Returns (evaluations, seconds spent including the moves).
+    """
+    evaluations = 0
+    start = time.perf_counter()
+    for game, player_name in games:
+        for coordinates, direction in list(game.legal_moves(player_name)):
+            delta = game.make_move(player_name, coordinates, direction, return_delta=True)
+            if game.get_winner() is None:
+                evaluate(game, game.get_current_turn())
+                evaluations += 1
+            game.unmake_move(delta)
+    return evaluations, time.perf_counter() - start
+
+
+def main():
+    """
+    Benchmarks the incremental evaluator, with and without its cache, against evaluation from scratch
+    """
+    parser = argparse.ArgumentParser(description="Benchmark incremental against from-scratch Kuba evaluation.")
+    parser.add_argument("--games", type=int, default=20, help="random games whose positions are evaluated")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random games")
+    args = parser.parse_args()
+
+    positions = _positions(args.games, args.seed)
+    games = [(KubaGame.replay(PLAYERS, moves), player_name) for moves, player_name in positions]
+
+    evaluations, baseline = _time_leaves(games, lambda game, player_name: None)
+    print(f"{len(games):,} positions, {evaluations:,} leaf evaluations per run")
+    runs = (
+        ("from scratch", evaluate_scratch),
+        ("incremental", KubaEvaluator(cache_size=0).evaluate),
+        ("incremental + cache (2nd pass)", None),
+    )
+    for name, evaluate in runs:
+        if evaluate is None:
+            evaluator = KubaEvaluator(cache_size=1 << 20)
+            _time_leaves(games, evaluator.evaluate)
+            evaluate = evaluator.evaluate
+        evaluations, seconds = _time_leaves(games, evaluate)
+        seconds = max(seconds - baseline, 1e-9)
+        print(f"{name:32} {evaluations / seconds:12,.0f} evaluations/sec")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
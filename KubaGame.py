@@ -3,6 +3,64 @@
 # Description:  The Kuba board game Class used by main.py
 # Game rules are explained at this link:  https://sites.google.com/site/boardandpieces/list-of-games/kuba
 
+import random
+
+DIRECTIONS = ("L", "R", "F", "B")
+
+
+def _build_move_table():
+    """
+    Precomputes the moves available from every square.  For each (x, y) it stores a tuple of (direction, access
+    square, ray) for the directions that do not push the marble straight off the board.  The access square is the cell
+    that must be vacant for the move (None on the edge of the board) and the ray is the tuple of coordinates from the
+    square to the edge of the board in the direction of the move.
+    """
+    steps = {"L": (0, -1), "R": (0, 1), "F": (-1, 0), "B": (1, 0)}
+    table = {}
+    for x in range(7):
+        for y in range(7):
+            moves = []
+            for direction in DIRECTIONS:
+                dx, dy = steps[direction]
+                ray = []
+                cx, cy = x, y
+                while 0 <= cx <= 6 and 0 <= cy <= 6:
+                    ray.append((cx, cy))
+                    cx += dx
+                    cy += dy
+                if len(ray) == 1:
+                    continue
+                ax, ay = x - dx, y - dy
+                access = (ax, ay) if 0 <= ax <= 6 and 0 <= ay <= 6 else None
+                moves.append((direction, access, tuple(ray)))
+            table[(x, y)] = tuple(moves)
+    return table
+
+
+_MOVE_TABLE = _build_move_table()
+
+_MOVES = {(square, direction): (access, ray) for square, moves in _MOVE_TABLE.items()
+          for direction, access, ray in moves}
+
+
+def _build_zobrist_keys():
+    """
+    Generates the 64 bit Zobrist keys from a fixed seed so hashes are the same in every process.  Returns a dict that
+    maps each (x, y) to a dict of keys by marble color (an empty cell has key 0), the keys for player A and player B
+    to move, and a list of keys by capture count for each player.
+    """
+    rng = random.Random(0x4B756261)
+    squares = {}
+    for x in range(7):
+        for y in range(7):
+            squares[(x, y)] = {"X": 0, "W": rng.getrandbits(64), "B": rng.getrandbits(64), "R": rng.getrandbits(64)}
+    turns = (rng.getrandbits(64), rng.getrandbits(64))
+    captures = ([rng.getrandbits(64) for _ in range(14)], [rng.getrandbits(64) for _ in range(14)])
+    return squares, turns, captures
+
+
+_ZOBRIST, _ZOBRIST_TURNS, _ZOBRIST_CAPTURES = _build_zobrist_keys()
+
 
 class KubaGame:
     """
@@ -17,9 +75,9 @@ class KubaGame:
         """
         Initiates the Kuba boards, player information, current turn to None and current winner to None.
         Main Board is the primary game board that the players interact with.
-        Temp Board is used temporarily to check for the Ko rule to avoid making an illegal move on the main board.
-        Prev Board is what Temp Board checks against to see if the move returns the board to the previous state which
-        would violate the Ko rule.
+        The board is also tracked as a Zobrist hash that is updated as marbles move.  The history of hashes is used to
+        check for the Ko rule, a move cannot return the board to its state before the opponent's last move, and the
+        position counts give repetition detection in O(1).
         """
 
         self._row_0 = ["W", "W", "X", "X", "X", "B", "B"]
@@ -29,6 +87,7 @@ class KubaGame:
         self._row_4 = ["X", "X", "R", "R", "R", "X", "X"]
         self._row_5 = ["B", "B", "X", "R", "X", "W", "W"]
         self._row_6 = ["B", "B", "X", "X", "X", "W", "W"]
+        self._rows = [self._row_0, self._row_1, self._row_2, self._row_3, self._row_4, self._row_5, self._row_6]
         self._player_a = player_a
         self._player_b = player_b
         self._player_a_captured = 0
@@ -37,8 +96,20 @@ class KubaGame:
         self._player_b_color = player_b[1]
         self._player_a_name = player_a[0]
         self._player_b_name = player_b[0]
+        self._players = {
+            self._player_a_name: (self._player_a_color, self._player_b_name),
+            self._player_b_name: (self._player_b_color, self._player_a_name),
+        }
         self._current_turn = None
         self._winner = None
+        self._hash = 0
+        for x in range(7):
+            for y in range(7):
+                self._hash ^= _ZOBRIST[(x, y)][self._rows[x][y]]
+        self._marble_counts = {"W": 8, "B": 8, "R": 13}
+        self._history = [self._hash]
+        self._position_counts = {self._hash: 1}
+        self._shifted_history = [()]
 
     def get_current_turn(self):
         """
@@ -46,277 +117,351 @@ class KubaGame:
         """
         return self._current_turn
 
-    def make_move(self, player_name, coordinates, direction):
+    def make_move(self, player_name, coordinates, direction, return_delta=False):
         """
         Takes a player name such as ("PlayerA"), coordinates such as (3, 5), and direction ("L" for left, "R" for right,
         "B" for backward, or "F" for forward) to move marbles for the players turn.  Validates that the move is legal
         and returns False if it is not legal.  After the turn is complete, if a marble was knocked off the marble and
         capture counts are updated.  If the game is won a winner is set.  If game is not won the current
         player is set to the next player, then the method returns True.
+        If return_delta is True a legal move returns a delta that unmake_move can use to undo it instead of True.  The
+        delta is a tuple of (squares, cells, pushed off marble, player credited with a capture, previous turn, previous
+        winner), where squares are the coordinates the move shifted and cells are their marbles before the move.
+        A move that would return the board to the position before the opponent's last move breaks the Ko rule and is
+        not legal.
         """
+        delta = self._apply_move(player_name, coordinates, direction)
+        if delta is None:
+            return False
+        if return_delta:
+            return delta
+        return True
 
-        """determine first player to act"""
-        if self._current_turn is None:
+    def _apply_move(self, player_name, coordinates, direction):
+        """
+        Makes a move for make_move and _play, the one place the rules of a move are applied.  Returns the move's delta,
+        or None if the move is not legal, leaving the game as it was apart from the first turn being taken.
+        """
+        previous_turn = self._current_turn
+        if previous_turn != player_name:
+            """determine first player to act, otherwise it is the other player's turn"""
+            if previous_turn is not None or player_name not in self._players:
+                return None
             self._current_turn = player_name
 
         """check if player is making a move after winner is decided"""
         if self._winner is not None:
-            return False
+            return None
+
+        """unknown directions, coordinates off the board and moves straight off the board are missing from the table"""
+        try:
+            move = _MOVES.get((coordinates, direction))
+        except TypeError:
+            move = _MOVES.get((tuple(coordinates), direction))
+        if move is None:
+            return None
+
+        """the marble must be the player's color and the square behind it must be vacant or off the board"""
+        access, ray = move
+        rows = self._rows
+        color, opponent = self._players[player_name]
+        x, y = ray[0]
+        if rows[x][y] != color:
+            return None
+        if access is not None and rows[access[0]][access[1]] != "X":
+            return None
+
+        """shift the marbles along the ray up to the first vacant cell, updating the position hash as they move"""
+        position_hash = self._hash
+        cell_list = []
+        previous = "X"
+        for square in ray:
+            row = rows[square[0]]
+            cell = row[square[1]]
+            cell_list.append(cell)
+            row[square[1]] = previous
+            keys = _ZOBRIST[square]
+            position_hash ^= keys[cell] ^ keys[previous]
+            if cell == "X":
+                break
+            previous = cell
+        squares = ray[:len(cell_list)]
+        cells = tuple(cell_list)
+
+        pushed_off = None
+        captured_by = None
+        if cells[-1] != "X":
+            pushed_off = cells[-1]
+            self._marble_counts[pushed_off] -= 1
+            if pushed_off == "R":
+                captured_by = player_name
+                if player_name == self._player_a_name:
+                    self._player_a_captured += 1
+                else:
+                    self._player_b_captured += 1
+        self._current_turn = opponent
+        delta = (squares, cells, pushed_off, captured_by, previous_turn, self._winner)
+
+        """check for the Ko rule and take the move back if it repeats the position before the opponent's move"""
+        history = self._history
+        if len(history) >= 2 and position_hash == history[-2]:
+            self._restore(delta)
+            self._current_turn = player_name
+            return None
 
-        """check if player taking a turn during another player's turn to act"""
-        if self._current_turn != player_name:
-            return False
+        history.append(position_hash)
+        self._position_counts[position_hash] = self._position_counts.get(position_hash, 0) + 1
+        self._hash = position_hash
+        self._shifted_history.append(squares)
 
-        """check for out of bounds coordinates"""
-        x = coordinates[0]
-        y = coordinates[1]
-        if x < 0 or x > 6:
-            return False
-        if y < 0 or y > 6:
-            return False
+        """check for a winner, captures and marble counts only change when a marble is pushed off"""
+        if pushed_off is not None:
+            self._check_winner(player_name)
+        return delta
+
+    def unmake_move(self, delta):
+        """
+        Takes a delta returned by make_move and undoes that move, restoring the shifted cells, the capture count, the
+        turn, the winner and the position history.  Moves must be undone in the reverse of the order they were made.
+        """
+        self._restore(delta)
+        history = self._history
+        position_hash = history.pop()
+        count = self._position_counts[position_hash] - 1
+        if count:
+            self._position_counts[position_hash] = count
+        else:
+            del self._position_counts[position_hash]
+        self._hash = history[-1]
+        self._shifted_history.pop()
 
-        """check for empty tile or wrong color tile"""
-        selected_marble = self.get_marble(coordinates)
+    def _restore(self, delta):
+        """
+        Writes the cells, capture count, turn and winner saved in a delta back to the game.
+        """
+        squares, cells, pushed_off, captured_by, previous_turn, previous_winner = delta
+        rows = self._rows
+        for (x, y), cell in zip(squares, cells):
+            rows[x][y] = cell
+
+        if pushed_off is not None:
+            self._marble_counts[pushed_off] += 1
+        if captured_by is not None:
+            if captured_by == self._player_a_name:
+                self._player_a_captured -= 1
+            else:
+                self._player_b_captured -= 1
+        self._current_turn = previous_turn
+        self._winner = previous_winner
+
+    def apply_moves(self, moves, states=False):
+        """
+        Takes a sequence of (player name, coordinates, direction) moves, such as ("PlayerA", (3, 5), "L"), and makes
+        them in order, stopping at the first move make_move would reject.  Returns the game in its final state.  The
+        moves made are the increase in get_move_count, so a shortfall points at the illegal move.
+        If states is True a generator is returned instead, which makes one move each time it is advanced and yields the
+        KubaPosition after it.
+        """
+        if states:
+            return self._positions(moves)
+        for _ in self._play(moves):
+            pass
+        return self
+
+    @staticmethod
+    def replay(players, moves, states=False):
+        """
+        Takes the (name, color) tuples of player A and player B and a sequence of moves as for apply_moves, and returns
+        a new KubaGame with the moves made up to the first illegal one.  get_move_count tells how many were made.  If
+        states is True a generator of the KubaPosition after each move is returned instead.
+        """
+        game = KubaGame(players[0], players[1])
+        return game.apply_moves(moves, states)
+
+    def _positions(self, moves):
+        """
+        Yields the KubaPosition after each move that _play makes.
+        """
+        from KubaPosition import KubaPosition
+
+        position = KubaPosition.from_game(self)
+        for move in self._play(moves):
+            position = position.apply(move)
+            yield position
+
+    def _play(self, moves):
+        """
+        Makes the moves one at a time with _apply_move, yielding the (coordinates, direction) of each move once the game
+        is up to date with it, and returns at the first illegal move.
+        """
+        apply_move = self._apply_move
+        for player_name, coordinates, direction in moves:
+            delta = apply_move(player_name, coordinates, direction)
+            if delta is None:
+                return
+            yield delta[0][0], direction
+
+    def _check_winner(self, player_name):
+        """
+        Sets the winner after the player's move pushed a marble off.  The player wins with seven captured reds or when
+        the opponent has no marbles left, and loses when the player's own marbles are all gone.
+        """
         if player_name == self._player_a_name:
-            current_color = self._player_a_color
-        if player_name == self._player_b_name:
-            current_color = self._player_b_color
-        if selected_marble != current_color:
-            return False
+            captured = self._player_a_captured
+            own_color = self._player_a_color
+            opponent = self._player_b_name
+            opponent_color = self._player_b_color
+        else:
+            captured = self._player_b_captured
+            own_color = self._player_b_color
+            opponent = self._player_a_name
+            opponent_color = self._player_a_color
 
-        """determine which row to use for the movement"""
-        if x == 0:
-            current_row = self._row_0
-        if x == 1:
-            current_row = self._row_1
-        if x == 2:
-            current_row = self._row_2
-        if x == 3:
-            current_row = self._row_3
-        if x == 4:
-            current_row = self._row_4
-        if x == 5:
-            current_row = self._row_5
-        if x == 6:
-            current_row = self._row_6
-
-        """check if movement direction is valid (L, R, B, F)"""
-        if direction == "L":
-            if y == 0:
-                return False     #cannot push your own marble off
-
-            if y != 6:
-                adjacent_marble = self.get_marble((x, y+1))
-                if adjacent_marble != "X":
-                    return False
-
-            """complete movement"""
-            initialized_index = y
-            index = y
-            while index >= 0:
-                if current_row[index] == "X":
-                    """start pushing marbles"""
-                    starting_index = index
-                    for tiles in range(starting_index, initialized_index):
-                        current_row[tiles] = current_row[tiles + 1]
-                    current_row[initialized_index] = "X"
-
-                    """set the turn order to the next player and return True"""
-                    if player_name == self._player_a_name:
-                        self._current_turn = self._player_b_name
-                    if player_name == self._player_b_name:
-                        self._current_turn = self._player_a_name
-                    return True
-
-                """push marble off"""
-                if index == 0:
-                    if current_row[0] == "R":
-                        if self._current_turn == self._player_a_name:
-                            self._player_a_captured += 1
-                        if self._current_turn == self._player_b_name:
-                            self._player_b_captured += 1
-                    starting_index = index
-                    for tiles in range(starting_index, initialized_index):
-                        current_row[tiles] = current_row[tiles + 1]
-                    current_row[initialized_index] = "X"
-
-                    """set the turn order to the next player and return True"""
-                    if player_name == self._player_a_name:
-                        self._current_turn = self._player_b_name
-                    if player_name == self._player_b_name:
-                        self._current_turn = self._player_a_name
-                    return True
-                index -= 1
-
-        if direction == "R":
-            if y == 6:
-                return False    #cannot push your own marble off
-
-            if y != 0:
-                adjacent_marble = self.get_marble((x, y-1))
-                if adjacent_marble != "X":
-                    return False
-
-            """complete movement:"""
-            initialized_index = y
-            index = y
-            while index <= 6:
-                if current_row[index] == "X":
-                    """start pushing marbles"""
-                    starting_index = index
-                    for tiles in range(starting_index, initialized_index, -1):
-                        current_row[tiles] = current_row[tiles - 1]
-                    current_row[initialized_index] = "X"
-
-                    """set the turn order to the next player and return True"""
-                    if player_name == self._player_a_name:
-                        self._current_turn = self._player_b_name
-                    if player_name == self._player_b_name:
-                        self._current_turn = self._player_a_name
-                    return True
-
-                """push marble off"""
-                if index == 6:
-                    if current_row[6] == "R":
-                        if self._current_turn == self._player_a_name:
-                            self._player_a_captured += 1
-                        if self._current_turn == self._player_b_name:
-                            self._player_b_captured += 1
-                    starting_index = index
-                    for tiles in range(starting_index, initialized_index, -1):
-                        current_row[tiles] = current_row[tiles - 1]
-                    current_row[initialized_index] = "X"
-
-                    """set the turn order to the next player and return True"""
-                    if player_name == self._player_a_name:
-                        self._current_turn = self._player_b_name
-                    if player_name == self._player_b_name:
-                        self._current_turn = self._player_a_name
-                    return True
-                index += 1
-
-        if direction == "F":
-            if x == 0:
-                return False        #cannot push your own marble off
-
-            row_list = [self._row_0, self._row_1, self._row_2, self._row_3, self._row_4, self._row_5, self._row_6]
-            if x != 6:
-                adjacent_marble = row_list[x+1][y]
-                if adjacent_marble != "X":
-                    return False
-
-            """complete movement:"""
-            initialized_index = x
-            index = x
-            while index >= 0:
-                if row_list[index][y] == "X":
-                    """start pushing marbles"""
-                    starting_index = index
-                    for tiles in range(starting_index, initialized_index):
-                        row_list[tiles][y] = row_list[tiles + 1][y]
-                    current_row[y] = "X"
-
-                    """set the turn order to the next player and return True"""
-                    if player_name == self._player_a_name:
-                        self._current_turn = self._player_b_name
-                    if player_name == self._player_b_name:
-                        self._current_turn = self._player_a_name
-                    return True
-
-                """push marble off"""
-                if index == 0:
-                    if self._row_0[y] == "R":
-                        if self._current_turn == self._player_a_name:
-                            self._player_a_captured += 1
-                        if self._current_turn == self._player_b_name:
-                            self._player_b_captured += 1
-                    starting_index = index
-                    for tiles in range(starting_index, initialized_index):
-                        row_list[tiles][y] = row_list[tiles + 1][y]
-                    current_row[y] = "X"
-
-                    """set the turn order to the next player and return True"""
-                    if player_name == self._player_a_name:
-                        self._current_turn = self._player_b_name
-                    if player_name == self._player_b_name:
-                        self._current_turn = self._player_a_name
-                    return True
-                index -= 1
-
-        if direction == "B":
-            if x == 6:
-                return False    #cannot push your own marble off
-
-            row_list = [self._row_0, self._row_1, self._row_2, self._row_3, self._row_4, self._row_5, self._row_6]
-            if x != 0:
-                adjacent_marble = row_list[x-1][y]
-                if adjacent_marble != "X":
-                    return False
-
-            """complete movement:"""
-            initialized_index = x
-            index = x
-            while index <= 6:
-                if row_list[index][y] == "X":
-                    """start pushing marbles"""
-                    starting_index = index
-                    for tiles in range(starting_index, initialized_index, -1):
-                        row_list[tiles][y] = row_list[tiles - 1][y]
-                    current_row[y] = "X"
-                    """set the turn order to the next player and return True"""
-                    if player_name == self._player_a_name:
-                        self._current_turn = self._player_b_name
-                    if player_name == self._player_b_name:
-                        self._current_turn = self._player_a_name
-                    return True
-
-                """push marble off"""
-                if index == 6:
-                    if self._row_6[y] == "R":
-                        if self._current_turn == self._player_a_name:
-                            self._player_a_captured += 1
-                        if self._current_turn == self._player_b_name:
-                            self._player_b_captured += 1
-                    starting_index = index
-                    for tiles in range(starting_index, initialized_index, -1):
-                        row_list[tiles][y] = row_list[tiles - 1][y]
-                    current_row[y] = "X"
-
-                    """set the turn order to the next player and return True"""
-                    if player_name == self._player_a_name:
-                        self._current_turn = self._player_b_name
-                    if player_name == self._player_b_name:
-                        self._current_turn = self._player_a_name
-                    return True
-                index += 1
-
-        """set the turn order to the next player and return True"""
+        if captured >= 7 or self._marble_counts[opponent_color] == 0:
+            self._winner = player_name
+        elif self._marble_counts[own_color] == 0:
+            self._winner = opponent
+
+    def get_state(self):
+        """
+        Returns a tuple holding everything from_state needs to rebuild the game: player A, player B, the board as a 49
+        character string read row by row, the reds captured by player A and player B, the current turn, the winner,
+        the tuple of board hashes since the start of the game and the coordinates the last move shifted.
+        """
+        return (self._player_a, self._player_b, "".join(map("".join, self._rows)), self._player_a_captured,
+                self._player_b_captured, self._current_turn, self._winner, tuple(self._history),
+                tuple(self._shifted_history[-1]))
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Takes a tuple returned by get_state and returns a new game in the same position, with the same Ko rule and
+        repetition counts.  Moves made before the state was taken cannot be undone with unmake_move.
+        """
+        player_a, player_b, board, a_captured, b_captured, current_turn, winner, history, last_shifted = state
+        game = cls(player_a, player_b)
+        for x, row in enumerate(game._rows):
+            row[:] = board[x * 7:x * 7 + 7]
+        game._player_a_captured = a_captured
+        game._player_b_captured = b_captured
+        game._current_turn = current_turn
+        game._winner = winner
+        game._hash = history[-1]
+        game._history = list(history)
+        position_counts = {}
+        for position_hash in history:
+            position_counts[position_hash] = position_counts.get(position_hash, 0) + 1
+        game._position_counts = position_counts
+        game._shifted_history = [()] * (len(history) - 1) + [tuple(last_shifted)]
+        game._marble_counts = {"W": board.count("W"), "B": board.count("B"), "R": board.count("R")}
+        return game
+
+    def get_hash(self):
+        """
+        Returns the 64 bit Zobrist hash of the marbles on the board.  The hash is updated as marbles move, so two games
+        with the same board have the same hash.
+        """
+        return self._hash
+
+    def get_position_key(self):
+        """
+        Returns the board hash combined with the player to move and the capture counts, for use as a transposition
+        table key.
+        """
+        key = self._hash
+        if self._current_turn == self._player_a_name:
+            key ^= _ZOBRIST_TURNS[0]
+        elif self._current_turn == self._player_b_name:
+            key ^= _ZOBRIST_TURNS[1]
+        return key ^ _ZOBRIST_CAPTURES[0][self._player_a_captured] ^ _ZOBRIST_CAPTURES[1][self._player_b_captured]
+
+    def get_move_count(self):
+        """
+        Returns the number of moves made so far.
+        """
+        return len(self._history) - 1
+
+    def get_last_change(self):
+        """
+        Returns a tuple of the board hash before the last move and the coordinates the last move shifted, or None
+        before the first move.  Caches of the board can use it to update only the squares the last move touched.
+        """
+        if len(self._history) < 2:
+            return None
+        return self._history[-2], self._shifted_history[-1]
+
+    def get_repetition_count(self):
+        """
+        Returns how many times the current board has appeared in this game, including now.
+        """
+        return self._position_counts[self._hash]
+
+    def legal_moves(self, player_name):
+        """
+        Takes a player name such as ("PlayerA") and yields every move make_move would accept for that player as a
+        (coordinates, direction) tuple such as ((3, 5), "L").  Nothing is yielded once the game has a winner or while it
+        is the other player's turn.  The board is not changed, so moves can be listed in any position without copying
+        the game.
+        """
+        if self._winner is not None:
+            return
+        if self._current_turn is not None and self._current_turn != player_name:
+            return
         if player_name == self._player_a_name:
-            self._current_turn = self._player_b_name
-        if player_name == self._player_b_name:
-            self._current_turn = self._player_a_name
-
-        """check for a winner"""
-        if self._player_a_captured == 7:
-            self._winner = self._player_a_name
-
-        if self._player_b_captured == 7:
-            self._winner = self._player_b_name
-
-        marble_count = self.get_marble_count()
-        white_count = marble_count[0]
-        black_count = marble_count[2]
-        if black_count == 0:
-            if self._player_a_color == "B":
-                self._winner = self._player_b_name
-            if self._player_b_color == "B":
-                self._winner = self._player_a_name
-        if white_count == 0:
-            if self._player_a_color == "W":
-                self._winner = self._player_b_name
-            if self._player_b_color == "W":
-                self._winner = self._player_a_name
-        return True
+            color = self._player_a_color
+        elif player_name == self._player_b_name:
+            color = self._player_b_color
+        else:
+            return
+
+        """a move can only break the Ko rule if it moves a marble the opponent's last move shifted"""
+        rows = self._rows
+        last_squares = self._shifted_history[-1]
+        ko_hash = self._history[-2] if len(self._history) >= 2 else None
+        for x in range(7):
+            row = rows[x]
+            for y in range(7):
+                if row[y] != color:
+                    continue
+                for direction, access, ray in _MOVE_TABLE[(x, y)]:
+                    if access is not None and rows[access[0]][access[1]] != "X":
+                        continue
+                    if (x, y) in last_squares and self._hash_after(ray) == ko_hash:
+                        continue
+                    yield (x, y), direction
+
+    def get_pushed_off_marble(self, coordinates, direction):
+        """
+        Takes coordinates such as (3, 5) and a direction and returns the color of the marble that moving the marble at
+        those coordinates in that direction would push off the board, or None if nothing would be pushed off.  The move
+        is not checked for legality and the board is not changed.
+        """
+        move = _MOVES.get((tuple(coordinates), direction))
+        if move is None:
+            return None
+        ray = move[1]
+        rows = self._rows
+        for x, y in ray:
+            if rows[x][y] == "X":
+                return None
+        x, y = ray[-1]
+        return rows[x][y]
+
+    def _hash_after(self, ray):
+        """
+        Returns the board hash after pushing the marbles along a ray one square, without changing the board.
+        """
+        rows = self._rows
+        position_hash = self._hash
+        previous = "X"
+        for square in ray:
+            cell = rows[square[0]][square[1]]
+            keys = _ZOBRIST[square]
+            position_hash ^= keys[cell] ^ keys[previous]
+            if cell == "X":
+                break
+            previous = cell
+        return position_hash
 
     def get_winner(self):
         """
@@ -364,70 +509,19 @@ class KubaGame:
         if x == 6:
             return self._row_6[y]
 
+    def get_rows(self):
+        """
+        Returns a copy of the board as a list of seven row lists.
+        """
+        return [list(row) for row in self._rows]
+
     def get_marble_count(self):
         """
-        Returns the number of white, black and red marbles as a tuple in the order (W,B,R).
-        """
-        white_count = 0
-        black_count = 0
-        red_count = 0
-        for index in self._row_0:
-            if index == "W":
-                white_count += 1
-            if index == "B":
-                black_count += 1
-            if index == "R":
-                red_count += 1
-
-        for index in self._row_1:
-            if index == "W":
-                white_count += 1
-            if index == "B":
-                black_count += 1
-            if index == "R":
-                red_count += 1
-
-        for index in self._row_2:
-            if index == "W":
-                white_count += 1
-            if index == "B":
-                black_count += 1
-            if index == "R":
-                red_count += 1
-
-        for index in self._row_3:
-            if index == "W":
-                white_count += 1
-            if index == "B":
-                black_count += 1
-            if index == "R":
-                red_count += 1
-
-        for index in self._row_4:
-            if index == "W":
-                white_count += 1
-            if index == "B":
-                black_count += 1
-            if index == "R":
-                red_count += 1
-
-        for index in self._row_5:
-            if index == "W":
-                white_count += 1
-            if index == "B":
-                black_count += 1
-            if index == "R":
-                red_count += 1
-
-        for index in self._row_6:
-            if index == "W":
-                white_count += 1
-            if index == "B":
-                black_count += 1
-            if index == "R":
-                red_count += 1
-        count_tuple = (white_count, black_count, red_count)
-        return count_tuple
+        Returns the number of white, black and red marbles as a tuple in the order (W,B,R).  The counts are updated as
+        marbles are pushed off so no board scan is needed.
+        """
+        marble_counts = self._marble_counts
+        return marble_counts["W"], marble_counts["B"], marble_counts["R"]
 
     def print_board(self):
         """
@@ -0,0 +1,263 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Opt-in instrumentation for KubaGame that counts calls and keeps latency histograms of the hot paths,
+# with cProfile and tracemalloc captures that can be switched on and off while a program runs.
+
+# Instrumentation works by replacing the KubaGame methods it measures with timing wrappers while it is enabled and
+# putting the original methods back when it is disabled.  When it is off KubaGame runs its own methods untouched, so
+# there is no cost at all on the fast path.
+
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+
+from KubaGame import KubaGame
+
+BUCKETS = 40
+MEASURED_METHODS = ("make_move", "get_marble_count")
+
+_active = None
+
+
+class LatencyStats:
+    """
+    Call count and latency histogram of one measured path.  Bucket n counts calls that took less than 2 ** n
+    nanoseconds and at least 2 ** (n - 1).
+    """
+
+    __slots__ = ("count", "total_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        """
+        Starts with no calls recorded.
+        """
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * BUCKETS
+
+    def record(self, elapsed_ns):
+        """
+        Adds one call that took elapsed_ns nanoseconds.
+        """
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.buckets[min(elapsed_ns.bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """
+        Returns the upper bound in nanoseconds of the bucket holding the given fraction of calls, such as 0.99.
+        """
+        if not self.count:
+            return 0
+        wanted = fraction * self.count
+        seen = 0
+        for bucket, calls in enumerate(self.buckets):
+            seen += calls
+            if seen >= wanted:
+                return min(1 << bucket, self.max_ns)
+        return self.max_ns
+
+    def to_dict(self):
+        """
+        Returns the stats as a dict of plain values.
+        """
+        return {
+            "count": self.count,
+            "mean_ns": self.total_ns // self.count if self.count else 0,
+            "p50_ns": self.percentile(0.5),
+            "p90_ns": self.percentile(0.9),
+            "p99_ns": self.percentile(0.99),
+            "max_ns": self.max_ns,
+            "histogram": {f"<{1 << bucket}ns": calls for bucket, calls in enumerate(self.buckets) if calls},
+        }
+
+
+class KubaInstrumentation:
+    """
+    Records call counts and latency histograms of KubaGame.make_move by direction and outcome (rejected, shift or
+    push_off), and of KubaGame.get_marble_count.  A rejected move stops in validation, so the rejected stats are the
+    cost of validating a move.  Only one instance can be enabled at a time and it measures every KubaGame while it is
+    enabled.
+    """
+
+    def __init__(self):
+        """
+        Creates a disabled instrumentation with empty stats.
+        """
+        self._originals = None
+        self._stats = {}
+        self._profiler = None
+        self._tracing = False
+
+    def enable(self):
+        """
+        Starts measuring KubaGame.  Raises RuntimeError if another instrumentation is already enabled.
+        """
+        global _active
+        if _active is self:
+            return
+        if _active is not None:
+            raise RuntimeError("another KubaInstrumentation is already enabled")
+        self._originals = {name: KubaGame.__dict__[name] for name in MEASURED_METHODS}
+        KubaGame.make_move = self._wrap_make_move(self._originals["make_move"])
+        KubaGame.get_marble_count = self._wrap(self._originals["get_marble_count"], "get_marble_count")
+        _active = self
+
+    def disable(self):
+        """
+        Stops measuring and puts the original KubaGame methods back.  The stats are kept until reset.
+        """
+        global _active
+        if _active is not self:
+            return
+        for name, method in self._originals.items():
+            setattr(KubaGame, name, method)
+        self._originals = None
+        _active = None
+
+    def is_enabled(self):
+        """
+        Returns True while this instrumentation is measuring KubaGame.
+        """
+        return _active is self
+
+    def reset(self):
+        """
+        Clears the recorded stats.
+        """
+        self._stats = {}
+
+    def _get_stats(self, key):
+        """
+        Returns the LatencyStats for a key, creating it on first use.
+        """
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = LatencyStats()
+        return stats
+
+    def _wrap(self, method, name):
+        """
+        Returns a wrapper of a KubaGame method that records the latency of every call under name.
+        """
+        get_stats = self._get_stats
+        clock = time.perf_counter_ns
+
+        def wrapper(game, *args, **kwargs):
+            start = clock()
+            try:
+                return method(game, *args, **kwargs)
+            finally:
+                get_stats((name,)).record(clock() - start)
+
+        wrapper.__name__ = method.__name__
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    def _wrap_make_move(self, method):
+        """
+        Returns a wrapper of KubaGame.make_move that records the latency of every call by direction and outcome.  A
+        move that changes the marble counts pushed a marble off.
+        """
+        get_stats = self._get_stats
+        clock = time.perf_counter_ns
+
+        def make_move(game, player_name, coordinates, direction, return_delta=False):
+            marbles = sum(game._marble_counts.values())
+            start = clock()
+            result = method(game, player_name, coordinates, direction, return_delta)
+            elapsed = clock() - start
+            if not result:
+                outcome = "rejected"
+            elif sum(game._marble_counts.values()) != marbles:
+                outcome = "push_off"
+            else:
+                outcome = "shift"
+            get_stats(("make_move", direction, outcome)).record(elapsed)
+            return result
+
+        make_move.__doc__ = method.__doc__
+        return make_move
+
+    def snapshot(self):
+        """
+        Returns the recorded stats as a dict.  make_move stats are nested by direction then outcome, the other paths
+        are keyed by name.
+        """
+        result = {"enabled": self.is_enabled(), "make_move": {}}
+        for key, stats in sorted(self._stats.items()):
+            if key[0] == "make_move":
+                result["make_move"].setdefault(key[1], {})[key[2]] = stats.to_dict()
+            else:
+                result[key[0]] = stats.to_dict()
+        return result
+
+    def start_capture(self, profile=True, memory=False):
+        """
+        Starts a cProfile capture, a tracemalloc capture or both.  Captures run independently of the latency stats.
+        """
+        if profile and self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+
+    def stop_capture(self, limit=20):
+        """
+        Stops the running captures and returns a dict with "profile", the cProfile report of the limit most expensive
+        functions by cumulative time, and "memory", the limit lines that allocated the most memory, for the captures
+        that were running.
+        """
+        result = {}
+        if self._profiler is not None:
+            self._profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(self._profiler, stream=report).sort_stats("cumulative").print_stats(limit)
+            result["profile"] = report.getvalue()
+            self._profiler = None
+        if self._tracing:
+            statistics = tracemalloc.take_snapshot().statistics("lineno")
+            tracemalloc.stop()
+            result["memory"] = [str(statistic) for statistic in statistics[:limit]]
+            self._tracing = False
+        return result
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+
+def main():
+    """
+    Plays random games with instrumentation enabled and prints the snapshot
+    """
+    import json
+    import random
+
+    rng = random.Random(0)
+    with KubaInstrumentation() as instrumentation:
+        for _ in range(20):
+            game = KubaGame(("PlayerA", "W"), ("PlayerB", "B"))
+            player_name = "PlayerA"
+            for _ in range(200):
+                moves = list(game.legal_moves(player_name))
+                if not moves or game.get_winner() is not None:
+                    break
+                game.make_move(player_name, *rng.choice(moves))
+                game.make_move(player_name, (0, 0), "L")     # a rejected move
+                game.get_marble_count()
+                player_name = game.get_current_turn()
+    print(json.dumps(instrumentation.snapshot(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
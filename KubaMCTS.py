@@ -0,0 +1,340 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Computer opponent for KubaGame using Monte Carlo tree search with UCT selection, batched random
+# playouts and tree reuse between moves.
+
+# Each iteration walks down the tree from the root with UCT, adds the children of the leaf it reaches, and scores the
+# leaf with a random playout.  Leaves are collected batch_size at a time, using a virtual loss so the walks of one
+# batch spread over different leaves, and their playouts run together on the NumPy KubaBatch engine.  Without numpy the
+# playouts run one at a time on the KubaGame.
+
+import math
+import random
+import time
+from array import array
+
+from KubaRecord import decode_move, encode_move
+
+try:
+    from KubaBatch import KubaBatch
+except ImportError:
+    KubaBatch = None
+
+NO_MOVE = 255
+
+
+class NodeArena:
+    """
+    Stores the nodes of a search tree in parallel arrays indexed by node number, so each node costs a few bytes in
+    each array instead of a Python object.  The children of a node are added together and numbered first_child to
+    first_child + child_count - 1, and an unexpanded node has a first_child of -1.  Node 0 is the root.  wins holds the
+    playout results for the player who made the move into the node, 1 for a win and 0.5 for a playout with no winner.
+    """
+
+    def __init__(self):
+        """
+        Creates an arena holding only the root.
+        """
+        self.parent = array("i", [-1])
+        self.first_child = array("i", [-1])
+        self.child_count = array("H", [0])
+        self.move = array("B", [NO_MOVE])
+        self.visits = array("i", [0])
+        self.wins = array("f", [0.0])
+
+    def __len__(self):
+        """
+        Returns the number of nodes.
+        """
+        return len(self.move)
+
+    def add_children(self, node, move_codes):
+        """
+        Adds one unvisited child of node for every move code.
+        """
+        first = len(self.move)
+        count = len(move_codes)
+        self.first_child[node] = first
+        self.child_count[node] = count
+        self.parent.extend([node] * count)
+        self.first_child.extend([-1] * count)
+        self.child_count.extend([0] * count)
+        self.move.extend(move_codes)
+        self.visits.extend([0] * count)
+        self.wins.extend([0.0] * count)
+
+    def bytes_per_node(self):
+        """
+        Returns the bytes of array storage used per node, including the spare room the arrays keep for growth.
+        """
+        arrays = (self.parent, self.first_child, self.child_count, self.move, self.visits, self.wins)
+        used = sum(values.buffer_info()[1] * values.itemsize for values in arrays)
+        return used / len(self.move)
+
+    def subtree(self, node):
+        """
+        Returns a new arena holding a copy of the subtree below node, with node as the new root.
+        """
+        tree = NodeArena()
+        tree.visits[0] = self.visits[node]
+        tree.wins[0] = self.wins[node]
+        pending = [(node, 0)]
+        while pending:
+            old, new = pending.pop()
+            first = self.first_child[old]
+            if first < 0:
+                continue
+            count = self.child_count[old]
+            base = len(tree)
+            tree.add_children(new, self.move[first:first + count])
+            tree.visits[base:base + count] = self.visits[first:first + count]
+            tree.wins[base:base + count] = self.wins[first:first + count]
+            pending.extend((first + offset, base + offset) for offset in range(count))
+        return tree
+
+
+class KubaMCTS:
+    """
+    Chooses moves for one player of a KubaGame with Monte Carlo tree search.  The search makes and unmakes moves on the
+    game it is given and leaves it exactly as it found it.  When reuse_tree is True the part of the tree below the
+    position reached after the opponent's reply is kept for the next call to choose_move.
+    """
+
+    def __init__(self, time_budget=1.0, max_playouts=None, batch_size=64, exploration=1.4, reuse_tree=True,
+                 playout_depth=200, max_nodes=5000000, seed=None):
+        """
+        Takes the time budget in seconds for each move, an optional limit on playouts per move, the number of leaves
+        whose playouts run together, the UCT exploration constant, whether to reuse the tree between moves, the moves
+        a playout tries before it is scored as no result, the node limit after which leaves are no longer expanded and
+        a random seed.
+        """
+        self._time_budget = time_budget
+        self._max_playouts = max_playouts
+        self._batch_size = batch_size
+        self._exploration = exploration
+        self._reuse_tree = reuse_tree
+        self._playout_depth = playout_depth
+        self._max_nodes = max_nodes
+        self._rng = random.Random(seed)
+        self._tree = None
+        self._tree_keys = {}
+        self._last_stats = None
+
+    def get_last_stats(self):
+        """
+        Returns a dict describing the last search: the move chosen, its visits and win rate, the number of playouts,
+        the elapsed seconds, the playouts per second, the nodes in the tree, the nodes reused from the previous search
+        and the bytes of storage per node.
+        """
+        return self._last_stats
+
+    def choose_move(self, game, player_name):
+        """
+        Takes a KubaGame and the name of the player to move and returns the chosen move as a (coordinates, direction)
+        tuple, or None if the player has no legal move.
+        """
+        moves = list(game.legal_moves(player_name))
+        if not moves:
+            return None
+
+        codes = [encode_move(coordinates, direction) for coordinates, direction in moves]
+        tree = self._take_tree(game, codes)
+        reused = len(tree) if tree is not None else 0
+        if tree is None:
+            tree = NodeArena()
+            tree.add_children(0, codes)
+
+        start = time.perf_counter()
+        deadline = start + self._time_budget
+        playouts = 0
+        while time.perf_counter() < deadline:
+            batch = self._batch_size
+            if self._max_playouts is not None:
+                batch = min(batch, self._max_playouts - playouts)
+                if batch <= 0:
+                    break
+            playouts += self._run_batch(game, player_name, tree, batch)
+
+        first = tree.first_child[0]
+        best = max(range(first, first + tree.child_count[0]), key=tree.visits.__getitem__)
+        best_move = decode_move(tree.move[best])
+        elapsed = time.perf_counter() - start
+        visits = tree.visits[best]
+        self._last_stats = {
+            "move": best_move,
+            "visits": visits,
+            "win_rate": tree.wins[best] / visits if visits else 0.0,
+            "playouts": playouts,
+            "seconds": elapsed,
+            "playouts_per_second": playouts / elapsed if elapsed > 0 else 0.0,
+            "nodes": len(tree),
+            "reused_nodes": reused,
+            "bytes_per_node": tree.bytes_per_node(),
+        }
+        if self._reuse_tree:
+            self._keep_tree(game, player_name, tree, best)
+        return best_move
+
+    def _run_batch(self, game, player_name, tree, size):
+        """
+        Selects up to size leaves, scores them and backs the results up the tree.  Returns the number of leaves scored.
+        """
+        names = (game.get_player_a_name(), game.get_player_b_name())
+        batch = None
+        if KubaBatch is not None:
+            batch = KubaBatch(size, game.get_player_a_color(), game.get_player_b_color())
+
+        results = []
+        pending = []
+        for _ in range(size):
+            path, movers, winner = self._select(game, player_name, tree, batch, len(pending))
+            if winner is False:
+                pending.append((path, movers))
+            else:
+                results.append((path, movers, winner))
+
+        if pending:
+            # leaves that ended the game were scored without a slot, so only the first len(pending) slots are loaded
+            batch.truncate(len(pending))
+            winners = batch.play_random(self._playout_depth, self._rng.getrandbits(64))
+            for slot, (path, movers) in enumerate(pending):
+                results.append((path, movers, names[winners[slot]] if winners[slot] >= 0 else None))
+
+        wins = tree.wins
+        for path, movers, winner in results:
+            for node, mover in zip(path, movers):
+                if winner is None:
+                    wins[node] += 0.5
+                elif winner == mover:
+                    wins[node] += 1.0
+        return len(results)
+
+    def _select(self, game, player_name, tree, batch, slot):
+        """
+        Walks from the root to a leaf with UCT, adding a virtual loss to every node on the way.  Returns the path of
+        nodes, the player who moved into each node and the winner at the leaf, a player name or None for no result.
+        With a batch, a leaf that needs a playout is loaded into slot of the batch and the winner returned is False
+        until the batch is played.  Without one the playout is run here.
+        """
+        first_child = tree.first_child
+        child_count = tree.child_count
+        visits = tree.visits
+        wins = tree.wins
+        exploration = self._exploration
+        node = 0
+        path = [0]
+        movers = [None]
+        deltas = []
+        visits[0] += 1
+        try:
+            while True:
+                winner = game.get_winner()
+                if winner is not None:
+                    return path, movers, winner
+
+                if first_child[node] < 0:
+                    if visits[node] <= 1 or len(tree) >= self._max_nodes:
+                        break
+                    moves = [encode_move(coordinates, direction)
+                             for coordinates, direction in game.legal_moves(player_name)]
+                    if not moves:
+                        return path, movers, movers[-1]     # a player with no legal moves has lost
+                    tree.add_children(node, moves)
+
+                first = first_child[node]
+                log_visits = math.log(visits[node])
+                best = first
+                best_score = -1.0
+                for child in range(first, first + child_count[node]):
+                    child_visits = visits[child]
+                    if not child_visits:
+                        best = child
+                        break
+                    score = wins[child] / child_visits + exploration * math.sqrt(log_visits / child_visits)
+                    if score > best_score:
+                        best_score = score
+                        best = child
+
+                coordinates, direction = decode_move(tree.move[best])
+                deltas.append(game.make_move(player_name, coordinates, direction, return_delta=True))
+                node = best
+                visits[node] += 1
+                path.append(node)
+                movers.append(player_name)
+                player_name = game.get_current_turn()
+
+            if batch is None:
+                return path, movers, self._play_out(game, player_name)
+            if next(game.legal_moves(player_name), None) is None:
+                return path, movers, movers[-1]
+            batch.load_game(slot, game)
+            return path, movers, False
+        finally:
+            while deltas:
+                game.unmake_move(deltas.pop())
+
+    def _play_out(self, game, player_name):
+        """
+        Plays random legal moves from the game's position until the game is won, a player has no legal moves or
+        playout_depth moves are made, then takes all the moves back.  Returns the winner or None.
+        """
+        deltas = []
+        try:
+            for _ in range(self._playout_depth):
+                winner = game.get_winner()
+                if winner is not None:
+                    return winner
+                moves = list(game.legal_moves(player_name))
+                if not moves:
+                    if player_name == game.get_player_a_name():
+                        return game.get_player_b_name()
+                    return game.get_player_a_name()
+                coordinates, direction = self._rng.choice(moves)
+                deltas.append(game.make_move(player_name, coordinates, direction, return_delta=True))
+                player_name = game.get_current_turn()
+            return game.get_winner()
+        finally:
+            while deltas:
+                game.unmake_move(deltas.pop())
+
+    def _keep_tree(self, game, player_name, tree, best):
+        """
+        Remembers the tree and the position key of the position after the chosen move and after each reply that was
+        searched, so the next search can start from the matching subtree.
+        """
+        self._tree = tree
+        self._tree_keys = {game.get_position_key(): 0}
+        coordinates, direction = decode_move(tree.move[best])
+        delta = game.make_move(player_name, coordinates, direction, return_delta=True)
+        try:
+            self._tree_keys[game.get_position_key()] = best
+            first = tree.first_child[best]
+            if first < 0:
+                return
+            opponent = game.get_current_turn()
+            for child in range(first, first + tree.child_count[best]):
+                coordinates, direction = decode_move(tree.move[child])
+                reply = game.make_move(opponent, coordinates, direction, return_delta=True)
+                self._tree_keys[game.get_position_key()] = child
+                game.unmake_move(reply)
+        finally:
+            game.unmake_move(delta)
+
+    def _take_tree(self, game, codes):
+        """
+        Returns the remembered subtree for the game's position, or None if there is none.  The position key does not
+        cover the Ko rule, which depends on the position before the last move, so a subtree whose root moves are not the
+        legal move codes given is not used.
+        """
+        tree = self._tree
+        node = self._tree_keys.get(game.get_position_key())
+        self._tree = None
+        self._tree_keys = {}
+        if tree is None or node is None:
+            return None
+        if node != 0:
+            tree = tree.subtree(node)
+        first = tree.first_child[0]
+        if first < 0 or sorted(tree.move[first:first + tree.child_count[0]]) != sorted(codes):
+            return None
+        return tree
@@ -0,0 +1,370 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Computer opponent for KubaGame that spreads the root moves of each KubaSearch iteration over worker
+# processes sharing one transposition table in shared memory.
+
+# Threads cannot speed up a pure Python search, so each worker is a process with its own KubaSearch.  Every iteration
+# of the iterative deepening hands the root moves to the workers one at a time, best first by the scores of the last
+# iteration, and the best score found so far is kept in a shared value so every root move is searched with the best
+# alpha any worker has found.  A move that cannot beat that alpha comes back as a bound, so the chosen move is the best
+# of the moves whose scores are exact.
+#
+# The transposition table is a multiprocessing.shared_memory buffer of 16 byte entries without any lock.  An entry is
+# the key XOR the data, then the data: the score, the depth, the bound, the move byte as in KubaRecord and the search
+# generation packed into 64 bits.  A probe only accepts an entry whose two words XOR back to the key, so a write torn
+# by another process, or a slot of another key, reads as a miss.  The first 8 bytes of the buffer hold the generation.
+
+import argparse
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+from KubaGame import KubaGame
+from KubaRecord import decode_move, encode_move
+from KubaSearch import KubaSearch, SearchTimeout, WIN_SCORE
+
+PLAYERS = (("PlayerA", "W"), ("PlayerB", "B"))
+
+_HEADER = struct.Struct("<Q")
+_ENTRY = struct.Struct("<QQ")
+_NO_MOVE = 255
+
+_worker_search = None
+_worker_alpha = None
+
+
+class SharedTranspositionTable:
+    """
+    Transposition table with the interface of KubaSearch's TranspositionTable, held in shared memory so that every
+    process that opens it by name sees the others' entries.  It uses the same replacement policy.  hits and stores
+    count the probes and stores of this process only.
+    """
+
+    def __init__(self, bits=18, name=None):
+        """
+        Creates a table with 2 ** bits slots, or opens the existing table with the given name and size.
+        """
+        size = _HEADER.size + _ENTRY.size * (1 << bits)
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True, size=size)
+            self._owner = True
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self._buffer = self._memory.buf
+        self._mask = (1 << bits) - 1
+        self._bits = bits
+        self.hits = 0
+        self.stores = 0
+
+    def get_name(self):
+        """
+        Returns the name other processes open the table by.
+        """
+        return self._memory.name
+
+    def get_bits(self):
+        """
+        Returns the table size as a power of two.
+        """
+        return self._bits
+
+    def new_search(self):
+        """
+        Marks the start of a new search in every process so entries from earlier searches can be replaced first.
+        """
+        _HEADER.pack_into(self._buffer, 0, _HEADER.unpack_from(self._buffer, 0)[0] + 1)
+
+    def probe(self, key):
+        """
+        Returns the (depth, score, bound, move) stored for the key, or None if the key is not in the table.
+        """
+        check, data = _ENTRY.unpack_from(self._buffer, _HEADER.size + _ENTRY.size * (key & self._mask))
+        if check ^ data != key or not data:
+            return None
+        self.hits += 1
+        move = (data >> 42) & 0xFF
+        return ((data >> 32) & 0xFF, (data & 0xFFFFFFFF) - (1 << 31), (data >> 40) & 3,
+                None if move == _NO_MOVE else decode_move(move))
+
+    def store(self, key, depth, score, bound, move):
+        """
+        Stores a search result for the key if the replacement policy allows it.
+        """
+        buffer = self._buffer
+        offset = _HEADER.size + _ENTRY.size * (key & self._mask)
+        generation = _HEADER.unpack_from(buffer, 0)[0] & 0xFF
+        check, old = _ENTRY.unpack_from(buffer, offset)
+        if old and check ^ old != key and (old >> 50) == generation and (old >> 32) & 0xFF > depth:
+            return
+        data = ((score + (1 << 31)) | depth << 32 | bound << 40
+                | (_NO_MOVE if move is None else encode_move(*move)) << 42 | generation << 50)
+        _ENTRY.pack_into(buffer, offset, key ^ data, data)
+        self.stores += 1
+
+    def __len__(self):
+        """
+        Returns the number of occupied slots.
+        """
+        words = self._buffer.cast("Q")
+        try:
+            return sum(1 for data in words[2::2] if data)
+        finally:
+            words.release()
+
+    def close(self):
+        """
+        Closes this process's view of the table, and frees the shared memory if this process created it.
+        """
+        if self._buffer is None:
+            return
+        self._buffer = None
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+
+def _init_worker(name, bits, alpha):
+    """
+    Runs once in each worker process, opening the shared table and keeping the shared alpha.
+    """
+    global _worker_search, _worker_alpha
+    _worker_search = KubaSearch(table=SharedTranspositionTable(bits, name))
+    _worker_alpha = alpha
+
+
+def _root_move_task(task):
+    """
+    Searches one root move in a worker process.  Returns (index, score, exact, nodes), with score None when the deadline
+    passed first.
+    """
+    index, state, player_name, move, depth, deadline = task
+    game = KubaGame.from_state(state)
+    alpha = _worker_alpha.value
+    try:
+        score = _worker_search.score_move(game, player_name, move, depth, alpha, deadline)
+    except SearchTimeout:
+        return index, None, False, 0
+    exact = score > alpha
+    if exact:
+        with _worker_alpha.get_lock():
+            if score > _worker_alpha.value:
+                _worker_alpha.value = score
+    return index, score, exact, _worker_search.get_last_stats()["nodes"]
+
+
+class KubaParallelSearch:
+    """
+    Chooses moves like KubaSearch with the root moves of each iteration searched by a pool of worker processes.  The
+    pool and the shared table stay up between moves, so call close, or use the search as a context manager, when done.
+    """
+
+    def __init__(self, time_budget=0.2, max_depth=64, workers=None, table_bits=20, serial_depth=4):
+        """
+        Takes the time budget in seconds for each move, the deepest iteration to try, the number of worker processes,
+        one per CPU by default, the size of the shared transposition table as a power of two and the deepest iteration
+        searched in this process, since shallow iterations take less time than handing their moves to the workers.
+        """
+        self._time_budget = time_budget
+        self._max_depth = max_depth
+        self._serial_depth = serial_depth
+        self._table = SharedTranspositionTable(table_bits)
+        self._search = KubaSearch(table=self._table)
+        self._alpha = multiprocessing.Value("i", 0)
+        self._workers = workers or os.cpu_count() or 1
+        self._pool = multiprocessing.Pool(self._workers, _init_worker, (self._table.get_name(), table_bits,
+                                                                        self._alpha))
+        self._last_stats = None
+
+    def get_table(self):
+        """
+        Returns the shared transposition table.
+        """
+        return self._table
+
+    def get_last_stats(self):
+        """
+        Returns a dict describing the last search, with the same keys as KubaSearch's and the number of workers.
+        """
+        return self._last_stats
+
+    def choose_move(self, game, player_name):
+        """
+        Takes a KubaGame and the name of the player to move and returns the chosen move as a (coordinates, direction)
+        tuple, or None if the player has no legal move.
+        """
+        moves = list(game.legal_moves(player_name))
+        if not moves:
+            return None
+
+        self._table.new_search()
+        state = game.get_state()
+        start = time.perf_counter()
+        deadline = start + self._time_budget
+        nodes = 0
+        own_color = game.get_player_a_color() if player_name == game.get_player_a_name() else game.get_player_b_color()
+        # pushes that capture come first until there are scores to order by
+        moves.sort(key=lambda move: game.get_pushed_off_marble(*move) in (None, own_color))
+        best_move = moves[0]
+        best_score = None
+        completed_depth = 0
+        for depth in range(1, self._max_depth + 1):
+            if depth <= self._serial_depth:
+                results, iteration_nodes = self._search_here(game, player_name, moves, depth, deadline)
+            else:
+                results, iteration_nodes = self._search_workers(state, player_name, moves, depth, deadline)
+            nodes += iteration_nodes
+            if results is None:
+                break
+
+            # ties go to the move searched first, as in KubaSearch
+            index = max((index for index in results if results[index][1]),
+                        key=lambda index: (results[index][0], -index))
+            best_move = moves[index]
+            best_score = results[index][0]
+            completed_depth = depth
+            if abs(best_score) >= WIN_SCORE - self._max_depth or len(moves) == 1:
+                break
+            if time.perf_counter() - start > self._time_budget / 2:
+                break
+            moves = [moves[index] for index in sorted(results, key=lambda index: (-results[index][0], index))]
+
+        elapsed = time.perf_counter() - start
+        self._last_stats = {
+            "move": best_move,
+            "score": best_score,
+            "depth": completed_depth,
+            "nodes": nodes,
+            "seconds": elapsed,
+            "nodes_per_second": nodes / elapsed if elapsed > 0 else 0.0,
+            "book": False,
+            "workers": self._workers,
+        }
+        return best_move
+
+    def _search_here(self, game, player_name, moves, depth, deadline):
+        """
+        Searches one iteration in this process.  Returns (results, nodes), where results maps the index of each move to
+        (score, exact), or is None if the deadline passed.
+        """
+        results = {}
+        nodes = 0
+        alpha = -WIN_SCORE - 1
+        for index, move in enumerate(moves):
+            try:
+                score = self._search.score_move(game, player_name, move, depth, alpha, deadline)
+            except SearchTimeout:
+                return None, nodes
+            nodes += self._search.get_last_stats()["nodes"]
+            results[index] = (score, score > alpha)
+            alpha = max(alpha, score)
+        return results, nodes
+
+    def _search_workers(self, state, player_name, moves, depth, deadline):
+        """
+        Searches one iteration with the root moves spread over the workers, returning the same as _search_here.
+        """
+        self._alpha.value = -WIN_SCORE - 1
+        tasks = [(index, state, player_name, move, depth, deadline) for index, move in enumerate(moves)]
+        results = {}
+        nodes = 0
+        timed_out = False
+        for index, score, exact, move_nodes in self._pool.imap_unordered(_root_move_task, tasks):
+            nodes += move_nodes
+            timed_out = timed_out or score is None
+            results[index] = (score, exact)
+        if timed_out:
+            return None, nodes
+        return results, nodes
+
+    def close(self):
+        """
+        Stops the worker processes and frees the shared table.
+        """
+        if self._pool is None:
+            return
+        self._pool.close()
+        self._pool.join()
+        self._pool = None
+        self._table.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def benchmark_positions(count=8, seed=0):
+    """
+    Returns count (move list, player to move) positions spread over the middle of a seeded random game, the fixed
+    position set of the benchmark.
+    """
+    rng = random.Random(seed)
+    game = KubaGame(*PLAYERS)
+    player_name = PLAYERS[0][0]
+    moves = []
+    positions = []
+    while len(positions) < count:
+        legal = list(game.legal_moves(player_name))
+        if not legal or game.get_winner() is not None:
+            game = KubaGame(*PLAYERS)
+            player_name = PLAYERS[0][0]
+            moves = []
+            continue
+        if len(moves) % 6 == 4:
+            positions.append((list(moves), player_name))
+        coordinates, direction = rng.choice(legal)
+        game.make_move(player_name, coordinates, direction)
+        moves.append((player_name, coordinates, direction))
+        player_name = game.get_current_turn()
+    return positions
+
+
+def main():
+    """
+    Times the parallel search on a fixed position set with 1, 2, 4 and 8 workers against the serial KubaSearch
+    """
+    parser = argparse.ArgumentParser(description="Measure the speedup of the parallel Kuba search.")
+    parser.add_argument("--depth", type=int, default=7, help="depth each position is searched to")
+    parser.add_argument("--positions", type=int, default=8, help="positions in the fixed set")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="worker counts to time")
+    args = parser.parse_args()
+
+    positions = [(KubaGame.replay(PLAYERS, moves), player_name)
+                 for moves, player_name in benchmark_positions(args.positions)]
+    print(f"{len(positions)} positions to depth {args.depth} on {os.cpu_count()} CPUs")
+
+    serial = KubaSearch(time_budget=float("inf"), max_depth=args.depth, table_bits=20)
+    start = time.perf_counter()
+    serial_scores = []
+    nodes = 0
+    for game, player_name in positions:
+        serial.choose_move(game, player_name)
+        serial_scores.append(serial.get_last_stats()["score"])
+        nodes += serial.get_last_stats()["nodes"]
+    baseline = time.perf_counter() - start
+    print(f"{'serial KubaSearch':18} {baseline:8.2f} s  {nodes:10,} nodes")
+
+    for workers in args.workers:
+        with KubaParallelSearch(time_budget=float("inf"), max_depth=args.depth, workers=workers) as search:
+            start = time.perf_counter()
+            nodes = 0
+            agree = 0
+            for (game, player_name), serial_score in zip(positions, serial_scores):
+                search.choose_move(game, player_name)
+                stats = search.get_last_stats()
+                nodes += stats["nodes"]
+                agree += stats["score"] == serial_score
+            elapsed = time.perf_counter() - start
+        print(f"{workers:2} workers         {elapsed:8.2f} s  {nodes:10,} nodes  speedup {baseline / elapsed:5.2f}x  "
+              f"scores agree {agree}/{len(positions)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Immutable value type for a single Kuba position, for analysis tools that hold many positions at once.
+
+# A KubaGame carries seven row lists, the player names and colors and its move history, well over a kilobyte per game.
+# A KubaPosition keeps only what decides the rest of the game: the board packed into one integer and a small state
+# integer.  Bits 0 to 48 of the board are the white marbles, bits 49 to 97 the black marbles and bits 98 to 146 the red
+# marbles, square x * 7 + y within each group.  The state holds the color to move in bits 0 and 1 (0 before the first
+# move, 1 for white, 2 for black and 3 once the game is won), the reds captured by the white player in bits 2 to 4 and
+# the reds captured by the black player in bits 5 to 7, so it is always one of the small integers Python shares.
+#
+# Positions are never changed after they are made, so they can be shared between threads and used as dict keys.
+# Players are named by color rather than by name.  The Ko rule depends on the position before the last move, which is
+# not part of a position, so apply does not check it, as in KubaTablebase.
+
+import weakref
+
+DIRECTIONS = ("L", "R", "F", "B")
+COLORS = (None, "W", "B")
+
+_FULL = (1 << 49) - 1
+_SPREAD = 1 | 1 << 49 | 1 << 98
+_GAME_OVER = 3
+_ENCODED_SIZE = 20
+
+_START_ROWS = (
+    "WWXXXBB",
+    "WWXRXBB",
+    "XXRRRXX",
+    "XRRRRRX",
+    "XXRRRXX",
+    "BBXRXWW",
+    "BBXXXWW",
+)
+
+
+def _build_moves():
+    """
+    Builds the move table, mapping each (coordinates, direction) that does not push the moving marble straight off the
+    board to the square's bit, the ray mask from the square to the edge of the board, the bit of the access square that
+    must be vacant (0 at the edge), the bit that falls off the board on a push-off and the shift amount.
+    """
+    steps = {"L": (0, -1), "R": (0, 1), "F": (-1, 0), "B": (1, 0)}
+    moves = {}
+    for x in range(7):
+        for y in range(7):
+            for direction in DIRECTIONS:
+                dx, dy = steps[direction]
+                ray = 0
+                edge = 0
+                cx, cy = x, y
+                while 0 <= cx <= 6 and 0 <= cy <= 6:
+                    edge = 1 << (cx * 7 + cy)
+                    ray |= edge
+                    cx += dx
+                    cy += dy
+                bit = 1 << (x * 7 + y)
+                if ray == bit:
+                    continue
+                ax, ay = x - dx, y - dy
+                access = 1 << (ax * 7 + ay) if 0 <= ax <= 6 and 0 <= ay <= 6 else 0
+                moves[((x, y), direction)] = (bit, ray, access, edge, dx * 7 + dy)
+    return moves
+
+
+_MOVES = _build_moves()
+
+_SQUARE_MOVES = tuple(tuple((coordinates, direction) + entry for (coordinates, direction), entry in _MOVES.items()
+                            if entry[0] == 1 << square) for square in range(49))
+
+
+def _start_board():
+    """
+    Returns the packed board of the starting position.
+    """
+    board = 0
+    for x, row in enumerate(_START_ROWS):
+        for y, cell in enumerate(row):
+            if cell != "X":
+                board |= 1 << (x * 7 + y + 49 * "WBR".index(cell))
+    return board
+
+
+class KubaPosition:
+    """
+    Class representing one immutable Kuba position: the marbles on the board, the reds captured by each color and the
+    color to move.  apply returns the position after a move and leaves this one as it was.  Two positions are equal and
+    hash alike when their boards, captures and colors to move are the same.  KubaPosition() is the starting position.
+    """
+
+    __slots__ = ("_board", "_state", "__weakref__")
+
+    def __init__(self, board=None, state=0):
+        """
+        Takes a packed board and state as described at the top of this module, or makes the starting position.
+        """
+        object.__setattr__(self, "_board", _START_BOARD if board is None else board)
+        object.__setattr__(self, "_state", state)
+
+    @classmethod
+    def from_game(cls, game):
+        """
+        Takes a KubaGame and returns its position.
+        """
+        board = 0
+        for x, row in enumerate(game.get_rows()):
+            for y, cell in enumerate(row):
+                if cell != "X":
+                    board |= 1 << (x * 7 + y + 49 * "WBR".index(cell))
+        a_name = game.get_player_a_name()
+        b_name = game.get_player_b_name()
+        captured = {game.get_player_a_color(): game.get_player_a_count(),
+                    game.get_player_b_color(): game.get_player_b_count()}
+        if game.get_winner() is not None:
+            turn = _GAME_OVER
+        elif game.get_current_turn() == a_name:
+            turn = COLORS.index(game.get_player_a_color())
+        elif game.get_current_turn() == b_name:
+            turn = COLORS.index(game.get_player_b_color())
+        else:
+            turn = 0
+        return _new(board, turn | captured["W"] << 2 | captured["B"] << 5)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Takes the 20 bytes written by to_bytes and returns the position.
+        """
+        if len(data) != _ENCODED_SIZE:
+            raise ValueError(f"a KubaPosition is {_ENCODED_SIZE} bytes, not {len(data)}")
+        return _new(int.from_bytes(data[:19], "little"), data[19])
+
+    def to_bytes(self):
+        """
+        Returns the position as 20 bytes, the packed board then the state.
+        """
+        return self._board.to_bytes(19, "little") + bytes((self._state,))
+
+    def __setattr__(self, name, value):
+        """
+        Positions cannot be changed.
+        """
+        raise AttributeError("KubaPosition is immutable")
+
+    def __delattr__(self, name):
+        """
+        Positions cannot be changed.
+        """
+        raise AttributeError("KubaPosition is immutable")
+
+    def __eq__(self, other):
+        """
+        Returns True if the other position has the same board, captures and color to move.
+        """
+        if other.__class__ is not KubaPosition:
+            return NotImplemented
+        return self._board == other._board and self._state == other._state
+
+    def __hash__(self):
+        """
+        Returns a hash of the board, captures and color to move.
+        """
+        return hash((self._board, self._state))
+
+    def __reduce__(self):
+        """
+        Pickles the position as its packed board and state.
+        """
+        return _new, (self._board, self._state)
+
+    def __repr__(self):
+        """
+        Returns the board as one string of 49 cells with the color to move and the captures.
+        """
+        return (f"KubaPosition('{self.get_board_string()}', turn={self.get_current_turn()!r}, "
+                f"captured=({self.get_captured('W')}, {self.get_captured('B')}))")
+
+    def intern(self):
+        """
+        Returns the one shared instance equal to this position, so tools that meet the same position many times can
+        keep a single copy.  Shared instances are dropped when nothing else refers to them.
+        """
+        return _INTERNED.setdefault(self, self)
+
+    def apply(self, move):
+        """
+        Takes a move as a (coordinates, direction) tuple, such as ((3, 5), "L"), and returns the position after it,
+        moving the marbles exactly as KubaGame.make_move does.  Returns None if the move is not legal: the game is
+        over, the marble is not the color to move, the square behind it is occupied or the move is off the board.
+        Before the first move either color may move.
+        """
+        coordinates, direction = move
+        try:
+            entry = _MOVES.get((coordinates, direction))
+        except TypeError:
+            entry = _MOVES.get((tuple(coordinates), direction))
+        if entry is None:
+            return None
+        return _apply(self._board, self._state, *entry)
+
+    def legal_moves(self):
+        """
+        Yields every move apply would accept as a (coordinates, direction) tuple.  Before the first move the moves of
+        both colors are yielded.
+        """
+        board = self._board
+        turn = self._state & 3
+        if turn == _GAME_OVER:
+            return
+        white = board & _FULL
+        black = board >> 49 & _FULL
+        occupied = white | black | board >> 98
+        if turn == 1:
+            own = white
+        elif turn == 2:
+            own = black
+        else:
+            own = white | black
+        while own:
+            low = own & -own
+            own ^= low
+            for coordinates, direction, bit, ray, access, edge, shift in _SQUARE_MOVES[low.bit_length() - 1]:
+                if not occupied & access:
+                    yield coordinates, direction
+
+    def successors(self):
+        """
+        Returns a list of (move, position) pairs, one for every legal move.
+        """
+        board = self._board
+        state = self._state
+        return [(move, _apply(board, state, *_MOVES[move])) for move in self.legal_moves()]
+
+    def get_current_turn(self):
+        """
+        Returns the color to move, "W" or "B", or None before the first move and once the game is won.
+        """
+        turn = self._state & 3
+        if turn == _GAME_OVER:
+            return None
+        return COLORS[turn]
+
+    def get_winner(self):
+        """
+        Returns the color that has won, or None if the game is not over.  Only one winning condition can become true
+        on a move, so the winner follows from the captures and marble counts.
+        """
+        if self._state & 3 != _GAME_OVER:
+            return None
+        if self._state >> 2 & 7 >= 7:
+            return "W"
+        if self._state >> 5 >= 7:
+            return "B"
+        if self._board & _FULL:
+            return "W"
+        return "B"
+
+    def get_captured(self, color):
+        """
+        Takes a color, "W" or "B", and returns the number of red marbles that color has captured.
+        """
+        if color == "W":
+            return self._state >> 2 & 7
+        if color == "B":
+            return self._state >> 5
+        return "Not a valid color"
+
+    def get_marble(self, coordinates):
+        """
+        Takes coordinates such as (5, 6) and returns the color of the marble there, or X if the square is empty.
+        """
+        x, y = coordinates
+        if not (0 <= x <= 6 and 0 <= y <= 6):
+            return "Not a valid coordinate"
+        bit = 1 << (x * 7 + y)
+        board = self._board
+        if board & bit:
+            return "W"
+        if board >> 49 & bit:
+            return "B"
+        if board >> 98 & bit:
+            return "R"
+        return "X"
+
+    def get_marble_count(self):
+        """
+        Returns the number of white, black and red marbles as a tuple in the order (W,B,R).
+        """
+        board = self._board
+        return (board & _FULL).bit_count(), (board >> 49 & _FULL).bit_count(), (board >> 98).bit_count()
+
+    def get_board_string(self):
+        """
+        Returns the board as a 49 character string read row by row.
+        """
+        board = self._board
+        return "".join("W" if board >> square & 1 else "B" if board >> (49 + square) & 1 else
+                       "R" if board >> (98 + square) & 1 else "X" for square in range(49))
+
+
+def _new(board, state):
+    """
+    Returns a KubaPosition without going through __init__, for the positions made by apply.
+    """
+    position = _allocate(KubaPosition)
+    _set_board(position, board)
+    _set_state(position, state)
+    return position
+
+
+def _apply(board, state, bit, ray, access, edge, shift):
+    """
+    Returns the position after moving the marble on bit along ray, or None if the move is not legal.  The three color
+    groups of the packed board shift together: the squares that move are spread to all three groups with one multiply.
+    """
+    turn = state & 3
+    if board & bit:
+        mover = 1
+    elif board >> 49 & bit:
+        mover = 2
+    else:
+        return None
+    if turn != mover and turn != 0:
+        return None
+    occupied = (board | board >> 49 | board >> 98) & _FULL
+    if occupied & access:
+        return None
+
+    # find the first vacant square along the ray, the marbles between it and the moving marble shift one square
+    empty = ray & ~occupied
+    pushed = 0
+    if empty:
+        if shift < 0:
+            moving = ray & ~((2 << (empty.bit_length() - 1)) - 1)
+        else:
+            moving = ray & ((empty & -empty) - 1)
+        vacated = moving
+    else:
+        if board & edge:
+            pushed = 1
+        elif board >> 49 & edge:
+            pushed = 2
+        else:
+            pushed = 3
+        moving = ray & ~edge
+        vacated = ray
+
+    shifted = board & vacated * _SPREAD
+    if shift < 0:
+        board = (board ^ shifted) | (shifted & moving * _SPREAD) >> -shift
+    else:
+        board = (board ^ shifted) | (shifted & moving * _SPREAD) << shift
+    opponent = 3 - mover
+    if not pushed:
+        return _new(board, (state & ~3) | opponent)
+
+    # captures and marble counts only change on a push-off, so the winner is only checked here
+    if pushed == 3:
+        state += 4 if mover == 1 else 32
+        captured = state >> 2 & 7 if mover == 1 else state >> 5
+        if captured >= 7:
+            return _new(board, (state & ~3) | _GAME_OVER)
+    own = board & _FULL if mover == 1 else board >> 49 & _FULL
+    other = board >> 49 & _FULL if mover == 1 else board & _FULL
+    if not other or not own:
+        return _new(board, (state & ~3) | _GAME_OVER)
+    return _new(board, (state & ~3) | opponent)
+
+
+_allocate = object.__new__
+_set_board = KubaPosition._board.__set__
+_set_state = KubaPosition._state.__set__
+_START_BOARD = _start_board()
+_INTERNED = weakref.WeakValueDictionary()
+START = KubaPosition()
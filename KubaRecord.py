@@ -0,0 +1,278 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Compact binary game record format for KubaGame with a streaming writer, a lazy reader and an index
+# for random access.
+
+# File layout:  the 5 byte file header b"KUBA\x01", then one record per game.  Each record is a 4 byte little endian
+# length of the rest of the record, the name length, name and color of player A, the same for player B, one byte for
+# which player moved first (0 for A, 1 for B), and one byte per move holding (x * 7 + y) * 4 + direction code.  Turns
+# always alternate, so the player of each move does not need to be stored.  The writer also writes an index file next
+# to the records holding the 8 byte offset of every record.
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+
+from KubaGame import KubaGame
+
+MAGIC = b"KUBA\x01"
+DIRECTIONS = ("L", "R", "F", "B")
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+_LENGTH = struct.Struct("<I")
+_MOVES = tuple(((code // 4 // 7, code // 4 % 7), DIRECTIONS[code % 4]) for code in range(196))
+
+
+class RecordError(Exception):
+    """
+    Raised when a record file is not in the expected format.
+    """
+    pass
+
+
+def encode_move(coordinates, direction):
+    """
+    Returns the byte value of a move such as ((3, 5), "L").
+    """
+    return (coordinates[0] * 7 + coordinates[1]) * 4 + DIRECTION_CODES[direction]
+
+
+def decode_move(code):
+    """
+    Returns the (coordinates, direction) move stored as a byte value.  Raises RecordError for a byte that is not a
+    move.
+    """
+    try:
+        return _MOVES[code]
+    except IndexError:
+        raise RecordError(f"{code} is not a move byte") from None
+
+
+def index_path(path):
+    """
+    Returns the path of the index file that belongs to a record file.
+    """
+    return path + ".idx"
+
+
+class GameRecordWriter:
+    """
+    Appends games to a record file one at a time, so a writer can stream games as they finish without holding them in
+    memory.  Use it as a context manager or call close when done.
+    """
+
+    def __init__(self, path):
+        """
+        Opens the record file and its index file for writing, replacing any existing files.
+        """
+        self._file = open(path, "wb")
+        self._index = open(index_path(path), "wb")
+        self._file.write(MAGIC)
+        self._offset = len(MAGIC)
+        self._games = 0
+
+    def write_game(self, player_a, player_b, first_player, moves):
+        """
+        Takes the two (name, color) player tuples, the name of the player who moved first and the list of accepted
+        (coordinates, direction) moves, and appends the game.
+        """
+        name_a = player_a[0].encode()
+        name_b = player_b[0].encode()
+        if len(name_a) > 255 or len(name_b) > 255:
+            raise RecordError("player names are limited to 255 bytes")
+        body = bytearray()
+        body.append(len(name_a))
+        body += name_a
+        body.append(ord(player_a[1]))
+        body.append(len(name_b))
+        body += name_b
+        body.append(ord(player_b[1]))
+        body.append(0 if first_player == player_a[0] else 1)
+        body += bytes(encode_move(coordinates, direction) for coordinates, direction in moves)
+
+        self._index.write(struct.pack("<Q", self._offset))
+        self._file.write(_LENGTH.pack(len(body)))
+        self._file.write(body)
+        self._offset += _LENGTH.size + len(body)
+        self._games += 1
+
+    def get_game_count(self):
+        """
+        Returns the number of games written so far.
+        """
+        return self._games
+
+    def close(self):
+        """
+        Closes the record and index files.
+        """
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _parse_record(body, offset):
+    """
+    Returns the (player_a, player_b, first player name, moves bytes) of a record body read from offset in the file.
+    Raises RecordError if the header fields do not fit the body or the names are not UTF-8.
+    """
+    try:
+        length_a = body[0]
+        position = 2 + length_a
+        length_b = body[position]
+        if position + 3 + length_b > len(body):
+            raise IndexError
+        name_a = body[1:1 + length_a].decode()
+        color_a = chr(body[1 + length_a])
+        name_b = body[position + 1:position + 1 + length_b].decode()
+        color_b = chr(body[position + 1 + length_b])
+        position += 2 + length_b
+        first_player = name_a if body[position] == 0 else name_b
+    except (IndexError, UnicodeDecodeError):
+        raise RecordError(f"damaged record at offset {offset}") from None
+    return (name_a, color_a), (name_b, color_b), first_player, body[position + 1:]
+
+
+def read_records(path):
+    """
+    Yields the (player_a, player_b, first player name, moves bytes) of every game in a record file, reading one record
+    at a time.  Moves can be decoded with decode_move.
+    """
+    with open(path, "rb") as record_file:
+        if record_file.read(len(MAGIC)) != MAGIC:
+            raise RecordError(f"{path} is not a Kuba record file")
+        read = record_file.read
+        offset = len(MAGIC)
+        while True:
+            header = read(_LENGTH.size)
+            if not header:
+                return
+            if len(header) != _LENGTH.size:
+                raise RecordError(f"{path} ends in the middle of a record")
+            length = _LENGTH.unpack(header)[0]
+            body = read(length)
+            if len(body) != length:
+                raise RecordError(f"{path} ends in the middle of a record")
+            yield _parse_record(body, offset)
+            offset += _LENGTH.size + length
+
+
+def replay_record(record):
+    """
+    Replays a record from read_records on a new KubaGame and returns the game.  Raises RecordError if a stored move is
+    not a move or not legal.
+    """
+    player_a, player_b, player_name, moves = record
+    names = (player_name, player_b[0] if player_name == player_a[0] else player_a[0])
+    game = KubaGame(player_a, player_b)
+    try:
+        moves = [(names[index & 1],) + _MOVES[code] for index, code in enumerate(moves)]
+    except IndexError:
+        code = next(code for code in moves if code >= len(_MOVES))
+        raise RecordError(f"{code} is not a move byte") from None
+    applied = game.apply_moves(moves).get_move_count()
+    if applied < len(moves):
+        player_name, coordinates, direction = moves[applied]
+        raise RecordError(f"illegal move {coordinates} {direction} by {player_name}")
+    return game
+
+
+def replay_games(path):
+    """
+    Yields a replayed KubaGame for every game in a record file, one game at a time.
+    """
+    for record in read_records(path):
+        yield replay_record(record)
+
+
+class GameRecordIndex:
+    """
+    Random access to the games of a record file through its index file.
+    """
+
+    def __init__(self, path):
+        """
+        Loads the record offsets of the record file at path.
+        """
+        self._path = path
+        self._offsets = array("Q")
+        with open(index_path(path), "rb") as index_file:
+            self._offsets.frombytes(index_file.read())
+        if sys.byteorder == "big":
+            self._offsets.byteswap()
+
+    def __len__(self):
+        """
+        Returns the number of games in the file.
+        """
+        return len(self._offsets)
+
+    def read_record(self, number):
+        """
+        Returns the (player_a, player_b, first player name, moves bytes) of game number, counting from 0.
+        """
+        offset = self._offsets[number]
+        with open(self._path, "rb") as record_file:
+            record_file.seek(offset)
+            header = record_file.read(_LENGTH.size)
+            if len(header) != _LENGTH.size:
+                raise RecordError(f"damaged record at offset {offset}")
+            return _parse_record(record_file.read(_LENGTH.unpack(header)[0]), offset)
+
+    def replay(self, number):
+        """
+        Returns game number replayed on a new KubaGame.
+        """
+        return replay_record(self.read_record(number))
+
+
+def main():
+    """
+    Packs self-play JSON lines into a record file, or times reading and replaying a record file
+    """
+    parser = argparse.ArgumentParser(description="Pack and replay Kuba game record files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="convert selfplay.py JSON lines to a record file")
+    pack.add_argument("source")
+    pack.add_argument("target")
+    replay = commands.add_parser("replay", help="time reading and replaying a record file")
+    replay.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        players = (("PlayerA", "W"), ("PlayerB", "B"))
+        with open(args.source) as source, GameRecordWriter(args.target) as writer:
+            for line in source:
+                record = json.loads(line)
+                moves = [(tuple(coordinates), direction) for player, coordinates, direction in record["moves"]]
+                first_player = record["moves"][0][0] if record["moves"] else players[0][0]
+                writer.write_game(players[0], players[1], first_player, moves)
+            games = writer.get_game_count()
+        size = os.path.getsize(args.target)
+        print(f"{games} games, {size:,} bytes ({size / max(games, 1):.1f} bytes per game)")
+        return
+
+    start = time.perf_counter()
+    games = sum(1 for _ in read_records(args.path))
+    read_time = time.perf_counter() - start
+    start = time.perf_counter()
+    moves = 0
+    for record in read_records(args.path):
+        replay_record(record)
+        moves += len(record[3])
+    replay_time = time.perf_counter() - start
+    print(f"read:    {games / read_time:12,.0f} games/sec")
+    print(f"replay:  {games / replay_time:12,.0f} games/sec ({moves / replay_time:,.0f} moves/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Cached board rendering for KubaGame, redrawing only the rows the last move touched, with a diff mode
+# that reports only the squares that changed.
+
+# A renderer keeps its own copy of the board and the move count and board hash it was taken at.  When the game is one
+# move further on and the hash before that move is the one the renderer saw, only the squares the move shifted are read
+# again, and only their rows are redrawn.  After anything else, such as several moves, an undone move or a new game,
+# the whole board is read again.
+
+import contextlib
+import io
+import random
+import sys
+
+from KubaGame import KubaGame
+
+
+def _row_text(row):
+    """
+    Returns a row as print_board prints it, such as ['W', 'W', 'X', 'X', 'X', 'B', 'B'].
+    """
+    return "['" + "', '".join(row) + "']"
+
+
+class KubaRenderer:
+    """
+    Renders the board of one KubaGame as text, keeping the text of each row between calls.  render and diff both bring
+    the renderer up to date with the game, so diff reports the squares changed since the last call to either.
+    """
+
+    def __init__(self, game):
+        """
+        Takes the KubaGame to render.  Nothing is read until the first call.
+        """
+        self._game = game
+        self._cells = None
+        self._row_texts = None
+        self._text = None
+        self._move_count = None
+        self._hash = None
+
+    def render(self):
+        """
+        Returns the board as seven lines of text, the same text print_board prints.  The text is only rebuilt for rows
+        that changed since the last call.
+        """
+        self._update()
+        if self._text is None:
+            self._text = "\n".join(self._row_texts)
+        return self._text
+
+    def diff(self):
+        """
+        Returns a list of ((x, y), marble) for every square whose marble changed since the last call to render or
+        diff.  The first call returns every square.
+        """
+        if self._cells is None:
+            self._update()
+            return [((x, y), cell) for x, row in enumerate(self._cells) for y, cell in enumerate(row)]
+        return self._update()
+
+    def get_rows(self):
+        """
+        Returns a copy of the board as a list of seven row lists, bringing the renderer up to date with the game as
+        render and diff do.
+        """
+        self._update()
+        return [list(row) for row in self._cells]
+
+    def _update(self):
+        """
+        Brings the renderer's copy of the board and the text of its changed rows up to date with the game and returns
+        the list of ((x, y), marble) squares that changed.
+        """
+        game = self._game
+        move_count = game.get_move_count()
+        position_hash = game.get_hash()
+        if move_count == self._move_count and position_hash == self._hash:
+            return []
+
+        changes = []
+        if self._cells is None:
+            self._cells = game.get_rows()
+            self._row_texts = [_row_text(row) for row in self._cells]
+        else:
+            last_change = game.get_last_change()
+            if move_count == self._move_count + 1 and last_change is not None and last_change[0] == self._hash:
+                squares = last_change[1]
+            else:
+                squares = [(x, y) for x in range(7) for y in range(7)]
+            cells = self._cells
+            get_marble = game.get_marble
+            for x, y in squares:
+                marble = get_marble((x, y))
+                if cells[x][y] != marble:
+                    cells[x][y] = marble
+                    changes.append(((x, y), marble))
+            if changes:
+                row_texts = self._row_texts
+                for x in {coordinates[0] for coordinates, _ in changes}:
+                    row_texts[x] = _row_text(cells[x])
+                self._text = None
+        self._move_count = move_count
+        self._hash = position_hash
+        return changes
+
+
+def _printed_board(game):
+    """
+    Returns the text print_board prints for the game, without the final newline.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        game.print_board()
+    return output.getvalue().rstrip("\n")
+
+
+def main():
+    """
+    Plays random games with moves made and taken back, calling render, diff and get_rows on one renderer in random
+    order, and checks every render against print_board
+    """
+    rng = random.Random(0)
+    checks = 0
+    for _ in range(200):
+        game = KubaGame(("PlayerA", "W"), ("PlayerB", "B"))
+        renderer = KubaRenderer(game)
+        player_name = "PlayerA"
+        deltas = []
+        for _ in range(100):
+            if deltas and rng.random() < 0.2:
+                game.unmake_move(deltas.pop())
+                player_name = game.get_current_turn() or "PlayerA"
+            else:
+                moves = list(game.legal_moves(player_name))
+                if not moves or game.get_winner() is not None:
+                    break
+                deltas.append(game.make_move(player_name, *rng.choice(moves), return_delta=True))
+                player_name = game.get_current_turn()
+            call = rng.choice(("render", "diff", "get_rows", "none"))
+            if call == "diff":
+                renderer.diff()
+            elif call == "get_rows":
+                renderer.get_rows()
+            elif call == "render":
+                if renderer.render() != _printed_board(game):
+                    print("render does not match print_board")
+                    return 1
+                checks += 1
+    print(f"{checks:,} renders match print_board")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Computer opponent for KubaGame using iterative deepening alpha-beta search with a transposition table.
+
+import time
+
+from KubaTablebase import DRAW, WIN
+
+WIN_SCORE = 100000
+CAPTURE_WEIGHT = 100
+MARBLE_WEIGHT = 60
+
+# transposition table entry bounds
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time budget for the move runs out.
+    """
+    pass
+
+
+class TranspositionTable:
+    """
+    Fixed size transposition table keyed by KubaGame.get_position_key.  Entries live in a list of 2 ** bits slots
+    indexed by the low bits of the key.  A slot is replaced when the new entry was searched at least as deep, or when
+    the stored entry is left over from an earlier search, so the table never grows past its size.
+    """
+
+    def __init__(self, bits=18):
+        """
+        Creates an empty table with 2 ** bits slots.
+        """
+        self._mask = (1 << bits) - 1
+        self._slots = [None] * (1 << bits)
+        self._generation = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        """
+        Marks the start of a new search so entries from earlier searches can be replaced first.
+        """
+        self._generation += 1
+
+    def probe(self, key):
+        """
+        Returns the (depth, score, bound, move) stored for the key, or None if the key is not in the table.
+        """
+        entry = self._slots[key & self._mask]
+        if entry is None or entry[0] != key:
+            return None
+        self.hits += 1
+        return entry[1], entry[2], entry[3], entry[4]
+
+    def store(self, key, depth, score, bound, move):
+        """
+        Stores a search result for the key if the replacement policy allows it.
+        """
+        index = key & self._mask
+        entry = self._slots[index]
+        if entry is not None and entry[0] != key and entry[5] == self._generation and entry[1] > depth:
+            return
+        self._slots[index] = (key, depth, score, bound, move, self._generation)
+        self.stores += 1
+
+    def __len__(self):
+        """
+        Returns the number of occupied slots.
+        """
+        return sum(1 for entry in self._slots if entry is not None)
+
+
+class KubaSearch:
+    """
+    Chooses moves for one player of a KubaGame.  The search makes and unmakes moves on the game it is given, so no
+    copies are made, and leaves the game exactly as it found it.  Each call to choose_move deepens one ply at a time
+    until the time budget runs out and plays the best move of the deepest completed iteration.
+    """
+
+    def __init__(self, time_budget=0.2, max_depth=64, table_bits=18, tablebase=None, book=None, evaluator=None,
+                 table=None):
+        """
+        Takes the time budget in seconds for each move, the deepest iteration to try, the size of the
+        transposition table as a power of two, an optional KubaTablebase whose positions are scored from the table
+        instead of being searched, an optional KubaBook whose moves are played without a search, an optional
+        KubaEvaluator to score the positions at the end of the search in place of evaluate and an optional table to
+        use in place of a new TranspositionTable, such as a KubaParallelSearch SharedTranspositionTable.
+        """
+        self._tablebase = tablebase
+        self._book = book
+        self._evaluator = evaluator
+        self._time_budget = time_budget
+        self._max_depth = max_depth
+        self._table = table if table is not None else TranspositionTable(table_bits)
+        self._nodes = 0
+        self._deadline = None
+        self._last_stats = None
+
+    def get_table(self):
+        """
+        Returns the transposition table.
+        """
+        return self._table
+
+    def get_last_stats(self):
+        """
+        Returns a dict describing the last search: the move chosen, its score, the deepest completed depth, the number
+        of nodes searched, the elapsed seconds, the nodes per second and whether the move came from the book.
+        """
+        return self._last_stats
+
+    def choose_move(self, game, player_name):
+        """
+        Takes a KubaGame and the name of the player to move and returns the chosen move as a (coordinates, direction)
+        tuple, or None if the player has no legal move.
+        """
+        moves = list(game.legal_moves(player_name))
+        if not moves:
+            return None
+
+        if self._book is not None:
+            entry = self._book.probe(game, player_name)
+            if entry is not None:
+                move, score, depth = entry
+                self._last_stats = {"move": move, "score": score, "depth": depth, "nodes": 0, "seconds": 0.0,
+                                    "nodes_per_second": 0.0, "book": True}
+                return move
+
+        self._table.new_search()
+        self._nodes = 0
+        start = time.perf_counter()
+        self._deadline = start + self._time_budget
+        best_move = moves[0]
+        best_score = None
+        completed_depth = 0
+        for depth in range(1, self._max_depth + 1):
+            try:
+                score, move = self._search_root(game, player_name, moves, depth)
+            except SearchTimeout:
+                break
+            best_move = move
+            best_score = score
+            completed_depth = depth
+            if abs(score) >= WIN_SCORE - self._max_depth or len(moves) == 1:
+                break
+
+            # the next iteration takes several times longer than this one, so do not start it without time to finish
+            if time.perf_counter() - start > self._time_budget / 2:
+                break
+
+        elapsed = time.perf_counter() - start
+        self._last_stats = {
+            "move": best_move,
+            "score": best_score,
+            "depth": completed_depth,
+            "nodes": self._nodes,
+            "seconds": elapsed,
+            "nodes_per_second": self._nodes / elapsed if elapsed > 0 else 0.0,
+            "book": False,
+        }
+        return best_move
+
+    def score_move(self, game, player_name, move, depth, alpha=-WIN_SCORE - 1, deadline=None):
+        """
+        Returns the score of one move of the player searched to the given depth, as choose_move scores its root moves
+        when alpha is the best score so far.  A score no higher than alpha only says the move is no better than alpha.
+        Raises SearchTimeout if the deadline, a time.perf_counter value, passes first.  The last stats describe this
+        move alone.
+        """
+        self._nodes = 0
+        start = time.perf_counter()
+        self._deadline = deadline if deadline is not None else float("inf")
+        delta = game.make_move(player_name, move[0], move[1], return_delta=True)
+        try:
+            score = -self._negamax(game, depth - 1, -WIN_SCORE - 1, -alpha, 1)
+        finally:
+            game.unmake_move(delta)
+        elapsed = time.perf_counter() - start
+        self._last_stats = {
+            "move": move,
+            "score": score,
+            "depth": depth,
+            "nodes": self._nodes,
+            "seconds": elapsed,
+            "nodes_per_second": self._nodes / elapsed if elapsed > 0 else 0.0,
+            "book": False,
+        }
+        return score
+
+    def _search_root(self, game, player_name, moves, depth):
+        """
+        Searches every root move to the given depth and returns the best (score, move).  The best move of the previous
+        iteration is searched first.
+        """
+        entry = self._table.probe(game.get_position_key())
+        ordered = self._order_moves(game, player_name, moves, entry[3] if entry is not None else None)
+        alpha = -WIN_SCORE - 1
+        best_move = ordered[0]
+        for move in ordered:
+            delta = game.make_move(player_name, move[0], move[1], return_delta=True)
+            try:
+                score = -self._negamax(game, depth - 1, -WIN_SCORE - 1, -alpha, 1)
+            finally:
+                game.unmake_move(delta)
+            if score > alpha:
+                alpha = score
+                best_move = move
+        self._table.store(game.get_position_key(), depth, alpha, EXACT, best_move)
+        return alpha, best_move
+
+    def _negamax(self, game, depth, alpha, beta, ply):
+        """
+        Returns the score of the position for the player to move, searched to the given depth with alpha-beta pruning.
+        """
+        self._nodes += 1
+        if not self._nodes & 255 and time.perf_counter() > self._deadline:
+            raise SearchTimeout
+
+        player_name = game.get_current_turn()
+        terminal = self._terminal_score(game, player_name, ply)
+        if terminal is not None:
+            return terminal
+
+        if self._tablebase is not None:
+            result = self._tablebase.probe(game)
+            if result is not None:
+                outcome, distance = result
+                if outcome == DRAW:
+                    return 0
+                if outcome == WIN:
+                    return WIN_SCORE - ply - distance
+                return -WIN_SCORE + ply + distance
+
+        key = game.get_position_key()
+        entry = self._table.probe(key)
+        hash_move = None
+        if entry is not None:
+            entry_depth, entry_score, bound, hash_move = entry
+            if entry_depth >= depth:
+                entry_score = _score_from_table(entry_score, ply)
+                if bound == EXACT:
+                    return entry_score
+                if bound == LOWER and entry_score >= beta:
+                    return entry_score
+                if bound == UPPER and entry_score <= alpha:
+                    return entry_score
+
+        if depth <= 0:
+            if self._evaluator is not None:
+                return self._evaluator.evaluate(game, player_name)
+            return self.evaluate(game, player_name)
+
+        moves = list(game.legal_moves(player_name))
+        if not moves:
+            return -WIN_SCORE + ply     # a player with no legal moves has lost
+
+        original_alpha = alpha
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        for move in self._order_moves(game, player_name, moves, hash_move):
+            delta = game.make_move(player_name, move[0], move[1], return_delta=True)
+            try:
+                score = -self._negamax(game, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.unmake_move(delta)
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= original_alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self._table.store(key, depth, _score_to_table(best_score, ply), bound, best_move)
+        return best_score
+
+    def _order_moves(self, game, player_name, moves, hash_move):
+        """
+        Returns the moves of player_name with the transposition table move first, then moves that push off a red or
+        opposing marble, then the rest.  The mover is passed in because there is no current turn before the first move.
+        """
+        own_color = _player_color(game, player_name)
+        first = []
+        captures = []
+        others = []
+        for move in moves:
+            if move == hash_move:
+                first.append(move)
+                continue
+            pushed_off = game.get_pushed_off_marble(move[0], move[1])
+            if pushed_off is not None and pushed_off != own_color:
+                captures.append(move)
+            else:
+                others.append(move)
+        return first + captures + others
+
+    def _terminal_score(self, game, player_name, ply):
+        """
+        Returns the score of a finished game for the player to move, or None if the game is not over.
+        """
+        winner = game.get_winner()
+        if winner is None:
+            return None
+        if winner == player_name:
+            return WIN_SCORE - ply
+        return -WIN_SCORE + ply
+
+    def evaluate(self, game, player_name):
+        """
+        Returns the static score of the position for the player: captured reds and marbles left on the board compared
+        with the opponent's.
+        """
+        opponent = _opponent(game, player_name)
+        white, black, red = game.get_marble_count()
+        if _player_color(game, player_name) == "W":
+            marbles = white - black
+        else:
+            marbles = black - white
+        captures = game.get_captured(player_name) - game.get_captured(opponent)
+        return CAPTURE_WEIGHT * captures + MARBLE_WEIGHT * marbles
+
+
+def _player_color(game, player_name):
+    """
+    Returns the marble color of the player.
+    """
+    if player_name == game.get_player_a_name():
+        return game.get_player_a_color()
+    return game.get_player_b_color()
+
+
+def _opponent(game, player_name):
+    """
+    Returns the name of the other player.
+    """
+    if player_name == game.get_player_a_name():
+        return game.get_player_b_name()
+    return game.get_player_a_name()
+
+
+def _score_to_table(score, ply):
+    """
+    Converts a win or loss score measured from the root to one measured from the stored node.
+    """
+    if score >= WIN_SCORE - 1000:
+        return score + ply
+    if score <= -WIN_SCORE + 1000:
+        return score - ply
+    return score
+
+
+def _score_from_table(score, ply):
+    """
+    Converts a stored win or loss score back to one measured from the root.
+    """
+    if score >= WIN_SCORE - 1000:
+        return score - ply
+    if score <= -WIN_SCORE + 1000:
+        return score + ply
+    return score
@@ -0,0 +1,543 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Durable storage for live KubaGame games: an append-only journal of new games, accepted moves and
+# closed games, written in group commits by a background thread, plus periodic snapshots that bound recovery time.
+
+# A store lives in one directory holding snapshot.bin and one journal, journal-<generation>.log.  Every journal record
+# is a 2 byte length and a 4 byte CRC32 of its body, then the body: b"N", the game id and the two players for a new
+# game, b"M", the game id, the player (0 for A, 1 for B) and the move byte as in KubaRecord for an accepted move, and
+# b"C" and the game id for a closed game.  Game ids are strings, stored as a length byte and UTF-8.
+#
+# Records are queued in memory and a flusher thread writes and fsyncs them together, every flush_interval seconds or
+# as soon as batch_size records are waiting, so the move path never waits for the disk.  A crash can lose the records
+# of the last flush_interval seconds; flush waits until everything recorded so far is on disk.
+#
+# A snapshot writes the state of every live game (KubaGame.get_state) to snapshot.bin through a temporary file and a
+# rename, then starts the next journal generation and deletes the old journal.  Recovery loads the snapshot and replays
+# the journal of the generation it names, stopping at the first torn or corrupt record, which is cut off.
+#
+# Records and snapshots must come from one thread, such as the server's event loop, so that a snapshot sees every
+# move recorded before it and none after.
+
+import argparse
+import gc
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+
+from KubaGame import KubaGame
+from KubaRecord import decode_move, encode_move
+
+MAGIC = b"KUBASN\x01\x00"
+SNAPSHOT_NAME = "snapshot.bin"
+
+_RECORD = struct.Struct("<HI")
+_SNAPSHOT_HEADER = struct.Struct("<QI")
+_GAME = struct.Struct("<5B49s")
+_HISTORY = struct.Struct("<I")
+_MOVE = struct.Struct("<BB")
+
+
+class StoreError(Exception):
+    """
+    Raised when a snapshot file is not in the expected format.
+    """
+    pass
+
+
+def _pack_text(text):
+    """
+    Returns a string as a length byte followed by its UTF-8 bytes.
+    """
+    data = text.encode()
+    if len(data) > 255:
+        raise ValueError(f"{text[:20]!r}... is longer than 255 bytes")
+    return bytes((len(data),)) + data
+
+
+def _unpack_text(data, position):
+    """
+    Returns (string, position after it) for a string packed by _pack_text.
+    """
+    end = position + 1 + data[position]
+    return data[position + 1:end].decode(), end
+
+
+def _pack_players(player_a, player_b):
+    """
+    Returns the names and colors of both players as bytes.
+    """
+    return _pack_text(player_a[0]) + player_a[1].encode() + _pack_text(player_b[0]) + player_b[1].encode()
+
+
+def _unpack_players(data, position):
+    """
+    Returns (player_a, player_b, position after them) for players packed by _pack_players.
+    """
+    name_a, position = _unpack_text(data, position)
+    color_a = chr(data[position])
+    name_b, position = _unpack_text(data, position + 1)
+    color_b = chr(data[position])
+    return (name_a, color_a), (name_b, color_b), position + 1
+
+
+def _journal_path(directory, generation):
+    """
+    Returns the path of the journal of one generation.
+    """
+    return os.path.join(directory, f"journal-{generation:08d}.log")
+
+
+def _sync_directory(directory):
+    """
+    Makes renames and new files in the directory durable, on systems that allow opening a directory.
+    """
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+class KubaStore:
+    """
+    Journals the games of one process to a directory and rebuilds them after a restart.  Call recover once before
+    recording anything, then add_game, record_move and remove_game as games start, move and end, and snapshot from time
+    to time, for example when snapshot_due says so.  close flushes the journal and stops the flusher thread.
+    """
+
+    def __init__(self, directory, batch_size=1024, flush_interval=0.01, snapshot_records=1000000):
+        """
+        Takes the store directory, created if missing, the number of waiting records that starts a flush at once, the
+        longest time in seconds a record waits to be flushed and the journal records after which snapshot_due is True.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._snapshot_records = snapshot_records
+        self._games = {}
+        self._generation = 0
+        self._journal = None
+        self._records = 0
+        self._queue = []
+        self._queued = 0
+        self._written = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._done = threading.Condition(self._lock)
+        self._io_lock = threading.Lock()
+        self._closing = False
+        self._flusher = None
+        self.commits = 0
+
+    def recover(self):
+        """
+        Loads the snapshot and replays the journal after it, then opens the journal for new records.  Returns a dict
+        of the live games by game id, which the store keeps for its snapshots.
+        """
+        games = {}
+        snapshot_path = os.path.join(self._directory, SNAPSHOT_NAME)
+        # every object built here lives on, so the cycle collector would only rescan the growing heap
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            if os.path.exists(snapshot_path):
+                self._generation, games = read_snapshot(snapshot_path)
+            path = _journal_path(self._directory, self._generation)
+            if os.path.exists(path):
+                self._records = _replay_journal(path, games)
+        finally:
+            if collecting:
+                gc.enable()
+        # older journals are covered by the snapshot and temporary files are left by a crash during a snapshot
+        for name in os.listdir(self._directory):
+            if ((name.startswith("journal-") and name != os.path.basename(path))
+                    or (name.startswith("snapshot-") and name.endswith(".tmp"))):
+                os.remove(os.path.join(self._directory, name))
+
+        self._games = games
+        self._journal = open(path, "ab")
+        self._flusher = threading.Thread(target=self._flush_forever, name="KubaStore flusher", daemon=True)
+        self._flusher.start()
+        return dict(games)
+
+    def add_game(self, game_id, game):
+        """
+        Records a new game, which must not have any moves yet.  Raises ValueError if the game id or a player name is
+        longer than 255 bytes.
+        """
+        body = b"N" + _pack_text(game_id) + _pack_players((game.get_player_a_name(), game.get_player_a_color()),
+                                                         (game.get_player_b_name(), game.get_player_b_color()))
+        self._games[game_id] = game
+        self._append(body)
+
+    def record_move(self, game_id, player_name, coordinates, direction):
+        """
+        Records a move that the game's make_move has just accepted.
+        """
+        game = self._games[game_id]
+        player = 0 if player_name == game.get_player_a_name() else 1
+        self._append(b"M" + _pack_text(game_id) + _MOVE.pack(player, encode_move(coordinates, direction)))
+
+    def remove_game(self, game_id):
+        """
+        Records that a game has ended and will not be recovered.
+        """
+        if self._games.pop(game_id, None) is not None:
+            self._append(b"C" + _pack_text(game_id))
+
+    def _append(self, body):
+        """
+        Queues one journal record and wakes the flusher when a batch is ready.
+        """
+        record = _RECORD.pack(len(body), zlib.crc32(body)) + body
+        with self._lock:
+            self._queue.append(record)
+            self._queued += 1
+            if len(self._queue) >= self._batch_size:
+                self._wakeup.notify()
+        self._records += 1
+
+    def _flush_forever(self):
+        """
+        Runs in the flusher thread, writing the queued records every flush_interval seconds or when a batch is ready.
+        """
+        while True:
+            with self._lock:
+                if not self._queue and not self._closing:
+                    self._wakeup.wait(self._flush_interval)
+                if self._closing and not self._queue:
+                    return
+            self._write_queue()
+
+    def _write_queue(self):
+        """
+        Writes and fsyncs every queued record as one group commit.
+        """
+        with self._io_lock:
+            with self._lock:
+                records = self._queue
+                self._queue = []
+                queued = self._queued
+            if records:
+                self._journal.write(b"".join(records))
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+                self.commits += 1
+            with self._lock:
+                self._written = queued
+                self._done.notify_all()
+
+    def flush(self):
+        """
+        Returns once every record made so far is on disk.
+        """
+        with self._lock:
+            target = self._queued
+            self._wakeup.notify()
+            while self._written < target:
+                self._done.wait()
+
+    def snapshot_due(self):
+        """
+        Returns True once snapshot_records records have been journaled since the last snapshot.
+        """
+        return self._records >= self._snapshot_records
+
+    def snapshot(self):
+        """
+        Writes every live game to the snapshot file and starts a new journal generation.  Returns the number of games
+        written.
+        """
+        with self._io_lock:
+            with self._lock:
+                records = self._queue
+                self._queue = []
+                queued = self._queued
+            if records:
+                self._journal.write(b"".join(records))
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+            generation = self._generation + 1
+            write_snapshot(os.path.join(self._directory, SNAPSHOT_NAME), generation, self._games)
+            old_journal = self._journal
+            self._journal = open(_journal_path(self._directory, generation), "ab")
+            _sync_directory(self._directory)
+            old_journal.close()
+            os.remove(_journal_path(self._directory, self._generation))
+            self._generation = generation
+            self._records = 0
+            with self._lock:
+                self._written = queued
+                self._done.notify_all()
+        return len(self._games)
+
+    def close(self):
+        """
+        Flushes the journal, stops the flusher thread and closes the journal.
+        """
+        if self._flusher is None:
+            return
+        with self._lock:
+            self._closing = True
+            self._wakeup.notify()
+        self._flusher.join()
+        self._flusher = None
+        self._journal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _replay_journal(path, games):
+    """
+    Applies the records of a journal to the dict of games and returns the number of records read.  The journal is cut
+    off at the first record that is incomplete, fails its CRC or cannot be read, since records after a torn write
+    cannot be trusted.
+    """
+    with open(path, "rb") as journal:
+        data = journal.read()
+    moves = {}
+    position = 0
+    records = 0
+    end = len(data)
+    while position + _RECORD.size <= end:
+        length, crc = _RECORD.unpack_from(data, position)
+        body = data[position + _RECORD.size:position + _RECORD.size + length]
+        if not length or len(body) != length or zlib.crc32(body) != crc:
+            break
+        # a record that passes its CRC but cannot be read, such as one in a zero filled tail, is torn as well
+        try:
+            kind = body[0]
+            if kind == 0x4D:     # M
+                # moves are gathered under the packed game id, which is decoded when the game is first seen
+                if length != body[1] + 4 or body[-2] > 1 or body[-1] >= 196:
+                    break
+                game_moves = moves.get(body[1:-2])
+                if game_moves is None:
+                    body[2:-2].decode()
+                    game_moves = moves[body[1:-2]] = []
+                game_moves.append(body[-2:])
+            elif kind == 0x4E:     # N
+                game_id, after = _unpack_text(body, 1)
+                player_a, player_b, record_end = _unpack_players(body, after)
+                if record_end != length:
+                    break
+                games[game_id] = KubaGame(player_a, player_b)
+                moves[body[1:after]] = []
+            elif kind == 0x43:     # C
+                game_id, record_end = _unpack_text(body, 1)
+                if record_end != length:
+                    break
+                games.pop(game_id, None)
+                moves.pop(body[1:], None)
+            else:
+                break
+        except (IndexError, UnicodeDecodeError):
+            break
+        position += _RECORD.size + length
+        records += 1
+
+    for packed_id, game_moves in moves.items():
+        game = games.get(packed_id[1:].decode())
+        if game is None or not game_moves:
+            continue
+        names = (game.get_player_a_name(), game.get_player_b_name())
+        game.apply_moves([(names[move[0]],) + decode_move(move[1]) for move in game_moves])
+
+    if position < end:
+        with open(path, "r+b") as journal:
+            journal.truncate(position)
+    return records
+
+
+def write_snapshot(path, generation, games):
+    """
+    Writes the state of every game in the dict to path, naming the journal generation that follows it.  The file is
+    written to a temporary name, fsynced and renamed over path, so a crash leaves either the old or the new snapshot.
+    """
+    parts = [MAGIC, _SNAPSHOT_HEADER.pack(generation, len(games))]
+    turns = {None: 0}
+    for game_id, game in games.items():
+        player_a, player_b, board, a_captured, b_captured, turn, winner, history, last_shifted = game.get_state()
+        turns[player_a[0]] = 1
+        turns[player_b[0]] = 2
+        parts.append(_pack_text(game_id))
+        parts.append(_pack_players(player_a, player_b))
+        parts.append(_GAME.pack(turns[turn], turns[winner], a_captured, b_captured, len(last_shifted), board.encode()))
+        parts.append(bytes(x * 7 + y for x, y in last_shifted))
+        parts.append(_HISTORY.pack(len(history)))
+        hashes = array("Q", history)
+        if sys.byteorder == "big":
+            hashes.byteswap()
+        parts.append(hashes.tobytes())
+
+    directory = os.path.dirname(path) or "."
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix="snapshot-", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as snapshot_file:
+            snapshot_file.write(b"".join(parts))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    _sync_directory(directory)
+
+
+def read_snapshot(path):
+    """
+    Returns (journal generation, dict of games by game id) read from a snapshot file.
+    """
+    with open(path, "rb") as snapshot_file:
+        data = snapshot_file.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise StoreError(f"{path} is not a Kuba store snapshot")
+    try:
+        return _parse_snapshot(data)
+    except (struct.error, IndexError, UnicodeDecodeError, ValueError) as error:
+        raise StoreError(f"{path} is damaged: {error}") from None
+
+
+def _parse_snapshot(data):
+    """
+    Returns (journal generation, dict of games by game id) from the bytes of a snapshot after its header check.
+    Raises StoreError, or the struct, index or decoding error of the first field that cannot be read.
+    """
+    generation, count = _SNAPSHOT_HEADER.unpack_from(data, len(MAGIC))
+    position = len(MAGIC) + _SNAPSHOT_HEADER.size
+    games = {}
+    for _ in range(count):
+        game_id, position = _unpack_text(data, position)
+        player_a, player_b, position = _unpack_players(data, position)
+        turn, winner, a_captured, b_captured, shifted, board = _GAME.unpack_from(data, position)
+        if board.strip(b"WBRX"):
+            raise StoreError(f"game {game_id!r} has a board with unknown cells")
+        position += _GAME.size
+        last_shifted = tuple((square // 7, square % 7) for square in data[position:position + shifted])
+        position += shifted
+        length = _HISTORY.unpack_from(data, position)[0]
+        position += _HISTORY.size
+        if not length or position + 8 * length > len(data):
+            raise StoreError(f"game {game_id!r} has a damaged history")
+        hashes = array("Q")
+        hashes.frombytes(data[position:position + 8 * length])
+        if sys.byteorder == "big":
+            hashes.byteswap()
+        position += 8 * length
+        names = (None, player_a[0], player_b[0])
+        games[game_id] = KubaGame.from_state((player_a, player_b, board.decode(), a_captured, b_captured, names[turn],
+                                              names[winner], hashes, last_shifted))
+    if position != len(data):
+        raise StoreError("the snapshot does not end after its last game")
+    return generation, games
+
+def _random_games(count, moves, seed):
+    """
+    Returns count lists of up to moves random legal (player, coordinates, direction) moves for the benchmark.
+    """
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = KubaGame(("PlayerA", "W"), ("PlayerB", "B"))
+        player_name = "PlayerA"
+        game_moves = []
+        for _ in range(moves):
+            legal = list(game.legal_moves(player_name))
+            if not legal:
+                break
+            coordinates, direction = rng.choice(legal)
+            game.make_move(player_name, coordinates, direction)
+            game_moves.append((player_name, coordinates, direction))
+            if game.get_winner() is not None:
+                break
+            player_name = game.get_current_turn()
+        games.append(game_moves)
+    return games
+
+
+def main():
+    """
+    Journals many games to a temporary store and times writing, recovery from the journal and recovery from a snapshot
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Kuba game store.")
+    parser.add_argument("--games", type=int, default=100000, help="live games to store")
+    parser.add_argument("--moves", type=int, default=40, help="moves per game")
+    parser.add_argument("--directory", help="store directory, a temporary directory by default")
+    args = parser.parse_args()
+
+    directory = args.directory or tempfile.mkdtemp(prefix="kubastore-")
+    patterns = _random_games(64, args.moves, 0)
+    try:
+        store = KubaStore(directory, snapshot_records=float("inf"))
+        store.recover()
+        players = (("PlayerA", "W"), ("PlayerB", "B"))
+        games = {}
+        for number in range(args.games):
+            game_id = str(number)
+            games[game_id] = KubaGame(*players)
+            store.add_game(game_id, games[game_id])
+
+        # interleave the games' moves as a server would see them
+        start = time.perf_counter()
+        moves = 0
+        for turn in range(args.moves):
+            for number in range(args.games):
+                game_moves = patterns[number % len(patterns)]
+                if turn < len(game_moves):
+                    game_id = str(number)
+                    player_name, coordinates, direction = game_moves[turn]
+                    games[game_id].make_move(player_name, coordinates, direction)
+                    store.record_move(game_id, player_name, coordinates, direction)
+                    moves += 1
+        store.flush()
+        elapsed = time.perf_counter() - start
+        print(f"{args.games:,} games, {moves:,} moves made and journaled in {elapsed:.2f} seconds "
+              f"({moves / elapsed:,.0f} moves/sec, {store.commits:,} group commits)")
+        store.close()
+
+        start = time.perf_counter()
+        store = KubaStore(directory, snapshot_records=float("inf"))
+        recovered = store.recover()
+        print(f"recovered {len(recovered):,} games from the journal in {time.perf_counter() - start:.2f} seconds")
+
+        start = time.perf_counter()
+        store.snapshot()
+        print(f"snapshot of {len(recovered):,} games written in {time.perf_counter() - start:.2f} seconds")
+        store.close()
+
+        start = time.perf_counter()
+        store = KubaStore(directory)
+        recovered = store.recover()
+        print(f"recovered {len(recovered):,} games from the snapshot in {time.perf_counter() - start:.2f} seconds")
+        store.close()
+        if any(recovered[game_id].get_state() != game.get_state() for game_id, game in games.items()):
+            print("recovered games do not match")
+            return 1
+    finally:
+        if args.directory is None:
+            shutil.rmtree(directory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
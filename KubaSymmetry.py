@@ -0,0 +1,177 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Maps KubaGame positions to a canonical representative under the symmetries of the board, so positions
+# that are rotations, reflections or color swaps of each other share one cache entry or one dataset record.
+
+# The move rules look the same after any of the 8 rotations and reflections of the board, and after swapping the white
+# and black marbles together with the players who own them.  A board is a 49 character string of "W", "B", "R" and
+# "X" read row by row, square x * 7 + y.  The canonical form always has white to move: when black is to move the
+# colors are swapped, and of the 8 rotations and reflections of the resulting board the smallest string is chosen.
+# A transform is a number from 0 to 15, the rotation or reflection in the low 3 bits plus COLOR_SWAP.
+
+import argparse
+import json
+import sys
+
+DIRECTIONS = ("L", "R", "F", "B")
+COLOR_SWAP = 8
+
+_SWAP_COLORS = str.maketrans("WB", "BW")
+
+
+def _flip_rows(cells):
+    """
+    Returns the board with the order of the rows reversed.
+    """
+    return cells[42:49] + cells[35:42] + cells[28:35] + cells[21:28] + cells[14:21] + cells[7:14] + cells[0:7]
+
+
+def _transpose(cells):
+    """
+    Returns the board reflected in its main diagonal, so square (x, y) moves to (y, x).
+    """
+    return cells[0::7] + cells[1::7] + cells[2::7] + cells[3::7] + cells[4::7] + cells[5::7] + cells[6::7]
+
+
+def _geometric_forms(cells):
+    """
+    Returns the 8 rotations and reflections of a board string or tuple, numbered as the transforms.  Slicing keeps this
+    to a few string operations.
+    """
+    flipped = _flip_rows(cells)
+    transposed = _transpose(cells)
+    turned = _flip_rows(transposed)
+    return cells, cells[::-1], flipped, flipped[::-1], transposed, transposed[::-1], turned, turned[::-1]
+
+
+def _build_tables():
+    """
+    Returns, for each of the 8 rotations and reflections, the square each square moves to, the direction each
+    direction becomes, and the number of the inverse transform.
+    """
+    gathers = _geometric_forms(tuple(range(49)))
+    square_maps = []
+    for gather in gathers:
+        square_map = [0] * 49
+        for new_square, old_square in enumerate(gather):
+            square_map[old_square] = new_square
+        square_maps.append(tuple(square_map))
+
+    steps = {"L": -1, "R": 1, "F": -7, "B": 7}
+    names = {step: direction for direction, step in steps.items()}
+    direction_maps = []
+    for square_map in square_maps:
+        direction_maps.append({direction: names[square_map[24 + step] - square_map[24]]
+                               for direction, step in steps.items()})
+
+    inverses = []
+    for square_map in square_maps:
+        for number, other in enumerate(square_maps):
+            if all(other[square_map[square]] == square for square in range(49)):
+                inverses.append(number)
+                break
+    return tuple(square_maps), tuple(direction_maps), tuple(inverses)
+
+
+_SQUARE_MAPS, _DIRECTION_MAPS, _INVERSES = _build_tables()
+
+
+def board_string(game):
+    """
+    Returns the board of a KubaGame as a 49 character string.
+    """
+    return "".join(map("".join, game.get_rows()))
+
+
+def transform_board(cells, transform):
+    """
+    Returns a board string after a transform.
+    """
+    if transform & COLOR_SWAP:
+        cells = cells.translate(_SWAP_COLORS)
+    return _geometric_forms(cells)[transform & 7]
+
+
+def canonical_board(cells, swap_colors=False):
+    """
+    Returns (canonical board, transform) for a board string, swapping the colors first when swap_colors is True.
+    """
+    if swap_colors:
+        cells = cells.translate(_SWAP_COLORS)
+    forms = _geometric_forms(cells)
+    best = min(range(8), key=forms.__getitem__)
+    return forms[best], best | (COLOR_SWAP if swap_colors else 0)
+
+
+def canonicalize(game):
+    """
+    Returns (key, transform) for a KubaGame, where the key is the tuple (canonical board, reds captured by the player
+    to move, reds captured by the other player) and the transform maps the game's board and moves to the canonical
+    ones.  Positions that are symmetries of each other have the same key.  Before the first move player A is taken to
+    be the player to move.
+    """
+    player_name = game.get_current_turn()
+    if player_name is None:
+        player_name = game.get_player_a_name()
+    if player_name == game.get_player_a_name():
+        color = game.get_player_a_color()
+        opponent = game.get_player_b_name()
+    else:
+        color = game.get_player_b_color()
+        opponent = game.get_player_a_name()
+    cells, transform = canonical_board(board_string(game), color == "B")
+    return (cells, game.get_captured(player_name), game.get_captured(opponent)), transform
+
+
+def transform_move(move, transform):
+    """
+    Returns a (coordinates, direction) move mapped through a transform.  A color swap does not change moves.
+    """
+    (x, y), direction = move
+    square = _SQUARE_MAPS[transform & 7][x * 7 + y]
+    return (square // 7, square % 7), _DIRECTION_MAPS[transform & 7][direction]
+
+
+def inverse_transform(transform):
+    """
+    Returns the transform that undoes a transform.
+    """
+    return _INVERSES[transform & 7] | (transform & COLOR_SWAP)
+
+
+def untransform_move(move, transform):
+    """
+    Returns a move in the canonical frame mapped back to the frame of the position the transform came from.
+    """
+    return transform_move(move, inverse_transform(transform))
+
+
+def main():
+    """
+    Counts the distinct positions and distinct canonical positions in the games of a selfplay.py JSON lines file
+    """
+    from KubaGame import KubaGame
+
+    parser = argparse.ArgumentParser(description="Measure how much symmetry shrinks a set of Kuba positions.")
+    parser.add_argument("source", help="JSON lines written by selfplay.py")
+    args = parser.parse_args()
+
+    positions = set()
+    classes = set()
+    total = 0
+    with open(args.source) as source:
+        for line in source:
+            record = json.loads(line)
+            game = KubaGame(("PlayerA", "W"), ("PlayerB", "B"))
+            for player_name, coordinates, direction in record["moves"]:
+                game.make_move(player_name, tuple(coordinates), direction)
+                total += 1
+                positions.add(game.get_position_key())
+                classes.add(canonicalize(game)[0])
+    print(f"{total:,} positions, {len(positions):,} distinct, {len(classes):,} distinct up to symmetry "
+          f"({len(positions) / max(len(classes), 1):.2f}x smaller)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
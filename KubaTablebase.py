@@ -0,0 +1,421 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Endgame tablebase for low material KubaGame positions, generated by retrograde analysis and probed in
+# constant time from a memory mapped file.
+
+# A position is the squares of the white, black and red marbles, the color to move and the reds captured by the white
+# player.  The reds captured by the black player follow from them, since every red that leaves the board is captured:
+# white captures + black captures + reds on the board = 13.  Positions are grouped by signature (white count, black
+# count, red count, color to move, white captures) and numbered within a signature by a perfect hash, the
+# combinatorial rank of the marble squares, so every position of the table has its own byte and no keys are stored.
+#
+# File layout:  the 8 byte header b"KUBATB\x01\x00", a 2 byte little endian signature count, one directory entry per
+# signature (the five signature bytes, the 8 byte offset of its values and the 8 byte number of positions), then one
+# value byte per position.  A value of 0 is a draw, 1 to 127 a win for the color to move in that many plies and 128 + n
+# a loss in n plies.
+#
+# The table is solved with the KubaGame move rules except the Ko rule, which depends on the position before the last
+# move and is not part of a table position.
+
+import argparse
+import itertools
+import mmap
+import struct
+import sys
+import time
+from array import array
+from collections import deque
+from math import comb
+
+MAGIC = b"KUBATB\x01\x00"
+COLORS = ("W", "B")
+DRAW = "draw"
+WIN = "win"
+LOSS = "loss"
+MAX_DISTANCE = 127
+
+_COUNT = struct.Struct("<H")
+_ENTRY = struct.Struct("<5BQQ")
+_LOSS_FLAG = 0x80
+
+
+class TablebaseError(Exception):
+    """
+    Raised when a tablebase file is not in the expected format or a table cannot be generated.
+    """
+    pass
+
+
+def _build_moves():
+    """
+    Returns, for every square numbered x * 7 + y, a tuple of (access square, ray) for the directions that do not move
+    the marble straight off the board.  The access square is -1 on the edge of the board and the ray is the tuple of
+    squares from the marble to the edge.
+    """
+    steps = ((0, -1), (0, 1), (-1, 0), (1, 0))
+    table = []
+    for x in range(7):
+        for y in range(7):
+            moves = []
+            for dx, dy in steps:
+                ray = []
+                cx, cy = x, y
+                while 0 <= cx <= 6 and 0 <= cy <= 6:
+                    ray.append(cx * 7 + cy)
+                    cx += dx
+                    cy += dy
+                if len(ray) == 1:
+                    continue
+                ax, ay = x - dx, y - dy
+                access = ax * 7 + ay if 0 <= ax <= 6 and 0 <= ay <= 6 else -1
+                moves.append((access, tuple(ray)))
+            table.append(tuple(moves))
+    return tuple(table)
+
+
+_MOVES = _build_moves()
+
+
+def signature_size(white, black, red):
+    """
+    Returns the number of ways to place the given numbers of white, black and red marbles on the board.
+    """
+    return comb(49, white) * comb(49 - white, black) * comb(49 - white - black, red)
+
+
+def signatures(max_white, max_black, max_red):
+    """
+    Yields every (white, black, red, color to move, white captures) signature of positions within the material limits
+    where the game is not over: both colors and at least one red are on the board and neither player has captured
+    seven reds.  The color to move is 0 for white and 1 for black.
+    """
+    for white in range(1, max_white + 1):
+        for black in range(1, max_black + 1):
+            for red in range(1, max_red + 1):
+                for side in (0, 1):
+                    for white_captures in range(7):
+                        if 0 <= 13 - red - white_captures <= 6:
+                            yield white, black, red, side, white_captures
+
+
+def _rank_set(squares, skipped):
+    """
+    Returns the combinatorial rank of a sorted tuple of squares after removing the skipped squares from the numbering.
+    """
+    rank = 0
+    for count, square in enumerate(squares, 1):
+        rank += comb(square - sum(1 for other in skipped if other < square), count)
+    return rank
+
+
+def position_rank(whites, blacks, reds):
+    """
+    Returns the perfect hash of a position within its signature, from the sorted tuples of white, black and red
+    squares.  The ranks of a signature are exactly 0 to signature_size - 1.
+    """
+    white_rank = _rank_set(whites, ())
+    black_rank = _rank_set(blacks, whites)
+    red_rank = _rank_set(reds, whites + blacks)
+    free = 49 - len(whites)
+    rank = white_rank * comb(free, len(blacks)) + black_rank
+    return rank * comb(free - len(blacks), len(reds)) + red_rank
+
+
+def _positions(signature):
+    """
+    Yields the (whites, blacks, reds) square tuples of every position of a signature.
+    """
+    white, black, red = signature[:3]
+    squares = range(49)
+    for whites in itertools.combinations(squares, white):
+        rest = [square for square in squares if square not in whites]
+        for blacks in itertools.combinations(rest, black):
+            others = [square for square in rest if square not in blacks]
+            for reds in itertools.combinations(others, red):
+                yield whites, blacks, reds
+
+
+def successors(whites, blacks, reds, side, white_captures):
+    """
+    Returns a list with one entry per legal move of the color to move (ignoring the Ko rule).  An entry is WIN or LOSS
+    when the move ends the game with a win or loss for the mover, otherwise the (whites, blacks, reds, side, white
+    captures) position it leads to.
+    """
+    cells = ["X"] * 49
+    for square in whites:
+        cells[square] = "W"
+    for square in blacks:
+        cells[square] = "B"
+    for square in reds:
+        cells[square] = "R"
+    own = whites if side == 0 else blacks
+    black_captures = 13 - len(reds) - white_captures
+    result = []
+    for square in own:
+        for access, ray in _MOVES[square]:
+            if access >= 0 and cells[access] != "X":
+                continue
+            length = 0
+            for cell_square in ray:
+                if cells[cell_square] == "X":
+                    break
+                length += 1
+            pushed = ray[-1] if length == len(ray) else -1
+            shift = {ray[index]: ray[index + 1] for index in range(min(length, len(ray) - 1))}
+            new_whites = tuple(sorted(shift.get(s, s) for s in whites if s != pushed))
+            new_blacks = tuple(sorted(shift.get(s, s) for s in blacks if s != pushed))
+            new_reds = tuple(sorted(shift.get(s, s) for s in reds if s != pushed))
+            new_white_captures = white_captures
+            if pushed >= 0:
+                pushed_color = cells[pushed]
+                own_count = len(new_whites) if side == 0 else len(new_blacks)
+                opponent_count = len(new_blacks) if side == 0 else len(new_whites)
+                if pushed_color == "R":
+                    captures = white_captures if side == 0 else black_captures
+                    if captures + 1 >= 7:
+                        result.append(WIN)
+                        continue
+                    if side == 0:
+                        new_white_captures += 1
+                elif opponent_count == 0:
+                    result.append(WIN)
+                    continue
+                elif own_count == 0:
+                    result.append(LOSS)
+                    continue
+            result.append((new_whites, new_blacks, new_reds, 1 - side, new_white_captures))
+    return result
+
+
+def generate(path, max_white=1, max_black=1, max_red=1, progress=None):
+    """
+    Solves every position within the material limits by retrograde analysis and writes the table to path.  Each
+    position's moves are generated once to build the predecessor lists, then results spread backwards from the
+    positions decided in one ply in order of distance: a position with a move to a lost position is won, and a
+    position whose moves all lead to won positions is lost.  Positions never decided are draws.  progress, if given,
+    is called with a message at each stage.  Returns a dict of counts by result.
+    """
+    table = list(signatures(max_white, max_black, max_red))
+    offsets = {}
+    total = 0
+    for signature in table:
+        offsets[signature] = total
+        total += signature_size(*signature[:3])
+
+    def report(message):
+        if progress is not None:
+            progress(message)
+
+    # build the successor lists and seed the positions decided in at most one ply
+    report(f"{len(table)} signatures, {total:,} positions")
+    edge_start = array("q", bytes(8 * (total + 1)))
+    edges = array("i")
+    values = bytearray(total)
+    lost_now = []
+    decided_in_one = []
+    for signature in table:
+        offset = offsets[signature]
+        side, white_captures = signature[3], signature[4]
+        for whites, blacks, reds in _positions(signature):
+            index = offset + position_rank(whites, blacks, reds)
+            start_edge = len(edges)
+            edge_start[index] = start_edge
+            winning = False
+            losing = False
+            for move in successors(whites, blacks, reds, side, white_captures):
+                if move == WIN:
+                    winning = True
+                elif move == LOSS:
+                    losing = True
+                else:
+                    child = move[:3]
+                    child_signature = (len(child[0]), len(child[1]), len(child[2])) + move[3:]
+                    edges.append(offsets[child_signature] + position_rank(*child))
+            edge_start[index + 1] = len(edges)
+            if winning:
+                values[index] = 1
+                decided_in_one.append(index)
+            elif len(edges) == start_edge:
+                if losing:
+                    values[index] = _LOSS_FLAG | 1     # every move pushes off the mover's last marble
+                    decided_in_one.append(index)
+                else:
+                    values[index] = _LOSS_FLAG     # a player with no legal moves has lost
+                    lost_now.append(index)
+        report(f"moves generated for signature {signature}")
+
+    # turn the successor lists into predecessor lists
+    predecessor_start = array("q", bytes(8 * (total + 1)))
+    for child in edges:
+        predecessor_start[child + 1] += 1
+    for index in range(total):
+        predecessor_start[index + 1] += predecessor_start[index]
+    fill = array("q", predecessor_start)
+    predecessors = array("i", bytes(4 * len(edges)))
+    remaining = array("H", bytes(2 * total))
+    for index in range(total):
+        remaining[index] = edge_start[index + 1] - edge_start[index]
+        for edge in range(edge_start[index], edge_start[index + 1]):
+            child = edges[edge]
+            predecessors[fill[child]] = index
+            fill[child] += 1
+    del fill, edges, edge_start
+    report("predecessors built")
+
+    # spread the results backwards in order of distance, so wins get the shortest and losses the longest distance
+    queue = deque(lost_now)
+    queue.extend(decided_in_one)
+    del lost_now, decided_in_one
+    while queue:
+        index = queue.popleft()
+        value = values[index]
+        distance = (value & ~_LOSS_FLAG) + 1
+        if distance > MAX_DISTANCE:
+            raise TablebaseError(f"distance {distance} does not fit in the table")
+        lost = value & _LOSS_FLAG
+        for edge in range(predecessor_start[index], predecessor_start[index + 1]):
+            parent = predecessors[edge]
+            if values[parent]:
+                continue
+            if lost:
+                values[parent] = distance
+                queue.append(parent)
+            else:
+                remaining[parent] -= 1
+                if not remaining[parent]:
+                    values[parent] = _LOSS_FLAG | distance
+                    queue.append(parent)
+
+    with open(path, "wb") as table_file:
+        table_file.write(MAGIC)
+        table_file.write(_COUNT.pack(len(table)))
+        start = len(MAGIC) + _COUNT.size + _ENTRY.size * len(table)
+        for signature in table:
+            table_file.write(_ENTRY.pack(*signature, start + offsets[signature], signature_size(*signature[:3])))
+        table_file.write(values)
+
+    wins = sum(1 for value in values if 0 < value < _LOSS_FLAG)
+    losses = sum(1 for value in values if value >= _LOSS_FLAG)
+    return {"positions": total, "wins": wins, "losses": losses, "draws": total - wins - losses}
+
+
+class KubaTablebase:
+    """
+    Read only access to a tablebase file through mmap.  Probing ranks the position and reads one byte, so it takes the
+    same time however large the table is.
+    """
+
+    def __init__(self, path):
+        """
+        Opens and maps the tablebase file at path.
+        """
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise TablebaseError(f"{path} is empty")
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise TablebaseError(f"{path} is not a Kuba tablebase file")
+        count = _COUNT.unpack_from(self._map, len(MAGIC))[0]
+        self._offsets = {}
+        self._limits = [0, 0, 0]
+        for number in range(count):
+            entry = _ENTRY.unpack_from(self._map, len(MAGIC) + _COUNT.size + number * _ENTRY.size)
+            self._offsets[entry[:5]] = entry[5]
+            self._limits = [max(limit, value) for limit, value in zip(self._limits, entry[:3])]
+        self._positions = sum(_ENTRY.unpack_from(self._map, len(MAGIC) + _COUNT.size + number * _ENTRY.size)[6]
+                              for number in range(count))
+
+    def __len__(self):
+        """
+        Returns the number of positions in the table.
+        """
+        return self._positions
+
+    def get_limits(self):
+        """
+        Returns the largest (white, black, red) marble counts in the table.
+        """
+        return tuple(self._limits)
+
+    def probe_position(self, whites, blacks, reds, side, white_captures):
+        """
+        Takes the sorted tuples of white, black and red squares (numbered x * 7 + y), the color to move (0 for white, 1
+        for black) and the reds captured by the white player.  Returns (result, distance in plies) for the color to
+        move, where result is WIN, LOSS or DRAW, or None if the position is not in the table.
+        """
+        offset = self._offsets.get((len(whites), len(blacks), len(reds), side, white_captures))
+        if offset is None:
+            return None
+        value = self._map[offset + position_rank(whites, blacks, reds)]
+        if value == 0:
+            return DRAW, 0
+        if value & _LOSS_FLAG:
+            return LOSS, value & ~_LOSS_FLAG
+        return WIN, value
+
+    def probe(self, game):
+        """
+        Takes a KubaGame and returns (result, distance in plies) for the player to move, or None if the position is not
+        in the table, the game is over or no player has moved yet.
+        """
+        white, black, red = game.get_marble_count()
+        limits = self._limits
+        if white > limits[0] or black > limits[1] or red > limits[2]:
+            return None
+        player_name = game.get_current_turn()
+        if player_name is None or game.get_winner() is not None:
+            return None
+        if game.get_player_a_color() == "W":
+            white_player = game.get_player_a_name()
+        else:
+            white_player = game.get_player_b_name()
+        if player_name == game.get_player_a_name():
+            side = COLORS.index(game.get_player_a_color())
+        else:
+            side = COLORS.index(game.get_player_b_color())
+
+        squares = {"W": [], "B": [], "R": [], "X": []}
+        for x in range(7):
+            for y in range(7):
+                squares[game.get_marble((x, y))].append(x * 7 + y)
+        return self.probe_position(tuple(squares["W"]), tuple(squares["B"]), tuple(squares["R"]), side,
+                                   game.get_captured(white_player))
+
+    def close(self):
+        """
+        Unmaps and closes the file.
+        """
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    """
+    Generates a tablebase from the command line
+    """
+    parser = argparse.ArgumentParser(description="Generate a Kuba endgame tablebase.")
+    parser.add_argument("path", help="tablebase file to write")
+    parser.add_argument("--max-white", type=int, default=1, help="most white marbles in a position")
+    parser.add_argument("--max-black", type=int, default=1, help="most black marbles in a position")
+    parser.add_argument("--max-red", type=int, default=1, help="most red marbles in a position")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = generate(args.path, args.max_white, args.max_black, args.max_red,
+                      progress=lambda message: print(message, file=sys.stderr))
+    elapsed = time.perf_counter() - start
+    print(f"{counts['positions']:,} positions in {elapsed:.1f} seconds: {counts['wins']:,} wins, "
+          f"{counts['losses']:,} losses, {counts['draws']:,} draws")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Micro-benchmark and regression suite for the KubaGame move engine.  Writes results as JSON and can
+# compare them with a saved baseline, failing when a case slows down by more than a threshold.
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from KubaGame import KubaGame
+
+PLAYERS = (("PlayerA", "W"), ("PlayerB", "B"))
+
+# (setup moves, benchmarked move of PlayerA) for each make_move case.  The setup moves reach a position where the
+# move is legal, and each benchmarked move is undone with unmake_move so every call starts from the same position.
+MOVE_CASES = {
+    "make_move_L": ([], ((6, 6), "L")),
+    "make_move_R": ([], ((0, 0), "R")),
+    "make_move_F": ([], ((6, 6), "F")),
+    "make_move_B": ([], ((0, 0), "B")),
+    "make_move_long_chain": ([("PlayerA", (6, 6), "L"), ("PlayerB", (6, 1), "L"), ("PlayerA", (6, 4), "F"),
+                              ("PlayerB", (5, 0), "R")], ((5, 6), "L")),
+    "make_move_push_off": ([("PlayerA", (5, 6), "L"), ("PlayerB", (1, 5), "R"), ("PlayerA", (5, 4), "F"),
+                            ("PlayerB", (6, 0), "F"), ("PlayerA", (4, 4), "F"), ("PlayerB", (6, 1), "R")],
+                           ((3, 4), "F")),
+}
+
+
+def measure(operation, batch, samples):
+    """
+    Calls operation(batch) samples times, where each call runs the operation batch times, and returns the per
+    operation time in seconds of every sample.
+    """
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        operation(batch)
+        times.append((time.perf_counter() - start) / batch)
+    return times
+
+
+def summarize(times):
+    """
+    Returns the ops/sec of the median sample and the p50, p90 and p99 time per operation in microseconds.
+    """
+    ordered = sorted(times)
+
+    def at(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    return {
+        "ops_per_sec": 1.0 / at(0.5),
+        "p50_us": at(0.5) * 1e6,
+        "p90_us": at(0.9) * 1e6,
+        "p99_us": at(0.99) * 1e6,
+    }
+
+
+def move_case(setup, move):
+    """
+    Returns an operation that makes and unmakes PlayerA's move after the setup moves.
+    """
+    game = KubaGame(*PLAYERS)
+    for player_name, coordinates, direction in setup:
+        if not game.make_move(player_name, coordinates, direction):
+            raise RuntimeError(f"setup move {coordinates} {direction} is not legal")
+    coordinates, direction = move
+
+    def operation(batch):
+        make_move = game.make_move
+        unmake_move = game.unmake_move
+        for _ in range(batch):
+            unmake_move(make_move("PlayerA", coordinates, direction, return_delta=True))
+
+    return operation
+
+
+def get_marble_case():
+    """
+    Returns an operation that looks up every square of the starting board.
+    """
+    game = KubaGame(*PLAYERS)
+    squares = [(x, y) for x in range(7) for y in range(7)]
+
+    def operation(batch):
+        get_marble = game.get_marble
+        for index in range(batch):
+            get_marble(squares[index % 49])
+
+    return operation
+
+
+def get_marble_count_case():
+    """
+    Returns an operation that reads the marble counts of the starting board.
+    """
+    game = KubaGame(*PLAYERS)
+
+    def operation(batch):
+        get_marble_count = game.get_marble_count
+        for _ in range(batch):
+            get_marble_count()
+
+    return operation
+
+
+def fuzz_case(seed):
+    """
+    Returns an operation that makes random moves, most of them illegal, with random players, coordinates including
+    some off the board, and directions including unknown ones, starting a new game whenever one is won.
+    """
+    rng = random.Random(seed)
+    names = [PLAYERS[0][0], PLAYERS[1][0]]
+    attempts = [(rng.choice(names), (rng.randint(-1, 7), rng.randint(-1, 7)), rng.choice("LRFBUD"))
+                for _ in range(4096)]
+    game = KubaGame(*PLAYERS)
+
+    def operation(batch):
+        nonlocal game
+        for index in range(batch):
+            player_name, coordinates, direction = attempts[index & 4095]
+            game.make_move(player_name, coordinates, direction)
+            if game.get_winner() is not None:
+                game = KubaGame(*PLAYERS)
+
+    return operation
+
+
+def random_game_case(seed):
+    """
+    Returns an operation that plays whole games of random legal moves, up to 200 moves each, from a fixed seed so
+    every run plays the same games.
+    """
+    def operation(batch):
+        rng = random.Random(seed)
+        for _ in range(batch):
+            game = KubaGame(*PLAYERS)
+            player_name = PLAYERS[0][0]
+            for _ in range(200):
+                moves = list(game.legal_moves(player_name))
+                if not moves:
+                    break
+                coordinates, direction = rng.choice(moves)
+                game.make_move(player_name, coordinates, direction)
+                if game.get_winner() is not None:
+                    break
+                player_name = game.get_current_turn()
+
+    return operation
+
+
+def replay_case(seed):
+    """
+    Returns an operation that replays random games with KubaGame.replay, counting one operation per move.  The games
+    are played once here so only the replay is timed.
+    """
+    rng = random.Random(seed)
+    games = []
+    moves_played = 0
+    while moves_played < 4096:
+        game = KubaGame(*PLAYERS)
+        player_name = PLAYERS[0][0]
+        moves = []
+        for _ in range(200):
+            legal = list(game.legal_moves(player_name))
+            if not legal:
+                break
+            coordinates, direction = rng.choice(legal)
+            game.make_move(player_name, coordinates, direction)
+            moves.append((player_name, coordinates, direction))
+            if game.get_winner() is not None:
+                break
+            player_name = game.get_current_turn()
+        games.append(moves)
+        moves_played += len(moves)
+
+    def operation(batch):
+        replayed = 0
+        while replayed < batch:
+            for moves in games:
+                KubaGame.replay(PLAYERS, moves[:batch - replayed])
+                replayed += len(moves)
+                if replayed >= batch:
+                    break
+
+    return operation
+
+
+def run_suite(samples=30, batch=2000, seed=0):
+    """
+    Runs every case and returns the results dict that is written as JSON.
+    """
+    cases = {name: move_case(setup, move) for name, (setup, move) in MOVE_CASES.items()}
+    cases["get_marble"] = get_marble_case()
+    cases["get_marble_count"] = get_marble_count_case()
+    cases["fuzz_random_moves"] = fuzz_case(seed)
+    cases["replay_moves"] = replay_case(seed)
+    results = {}
+    for name, operation in cases.items():
+        operation(batch)     # warm up
+        results[name] = summarize(measure(operation, batch, samples))
+    results["random_game"] = summarize(measure(random_game_case(seed), 1, max(samples // 3, 5)))
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Compares two results dicts and returns a list of (case, baseline ops/sec, current ops/sec, change) for the cases
+    that are slower than the baseline by more than threshold, a fraction such as 0.1 for 10%.
+    """
+    regressions = []
+    for name, base in baseline["results"].items():
+        result = current["results"].get(name)
+        if result is None:
+            continue
+        change = result["ops_per_sec"] / base["ops_per_sec"] - 1.0
+        if change < -threshold:
+            regressions.append((name, base["ops_per_sec"], result["ops_per_sec"], change))
+    return regressions
+
+
+def print_results(results):
+    """
+    Prints a table of the results.
+    """
+    print(f"{'case':24} {'ops/sec':>14} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10}")
+    for name, result in results["results"].items():
+        print(f"{name:24} {result['ops_per_sec']:14,.0f} {result['p50_us']:10.2f} {result['p90_us']:10.2f} "
+              f"{result['p99_us']:10.2f}")
+
+
+def main():
+    """
+    Runs the suite, writes the JSON results and compares them with a baseline when one is given
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the KubaGame move engine.")
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="fail when a case is slower than the baseline by more than this fraction")
+    parser.add_argument("--samples", type=int, default=30, help="timed samples per case")
+    parser.add_argument("--batch", type=int, default=2000, help="operations per sample")
+    args = parser.parse_args()
+
+    results = run_suite(args.samples, args.batch)
+    print_results(results)
+    if args.out:
+        with open(args.out, "w") as out:
+            json.dump(results, out, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before:,.0f} -> {after:,.0f} ops/sec ({change:+.1%})")
+        if regressions:
+            return 1
+        print(f"No case regressed by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Benchmark comparing move throughput of the list based KubaGame and the bitboard based KubaBitboard,
+# and the aggregate throughput of the NumPy KubaBatch engine when numpy is installed.
+
+import argparse
+import random
+import time
+
+from KubaBitboard import KubaBitboard
+from KubaGame import KubaGame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PLAYERS = (("PlayerA", "W"), ("PlayerB", "B"))
+DIRECTIONS = ("L", "R", "F", "B")
+
+
+def random_game(rng, max_moves=200):
+    """
+    Plays one game of random legal moves and returns it as a list of (player name, coordinates, direction) tuples.
+    Moves are found by trial on a KubaBitboard, so every move in the list is accepted by both engines.  The game stops
+    before a winner is decided so that every move can be replayed.
+    """
+    game = KubaBitboard(*PLAYERS)
+    moves = []
+    player = PLAYERS[0][0]
+    while len(moves) < max_moves:
+        candidates = [((x, y), direction) for x in range(7) for y in range(7) for direction in DIRECTIONS]
+        rng.shuffle(candidates)
+        for coordinates, direction in candidates:
+            if game.make_move(player, coordinates, direction):
+                break
+        else:
+            break
+        if game.get_winner() is not None:
+            break
+        moves.append((player, coordinates, direction))
+        player = game.get_current_turn()
+    return moves
+
+
+def replay(engine, games):
+    """
+    Replays every game on a fresh instance of the engine class and returns the number of moves made.
+    """
+    moves_made = 0
+    for moves in games:
+        game = engine(*PLAYERS)
+        for player_name, coordinates, direction in moves:
+            game.make_move(player_name, coordinates, direction)
+        moves_made += len(moves)
+    return moves_made
+
+
+def replay_with_counts(engine, games):
+    """
+    Replays every game like replay, reading the marble counts after every move the way an analysis loop or a winner
+    check does, and returns the number of moves made.
+    """
+    moves_made = 0
+    for moves in games:
+        game = engine(*PLAYERS)
+        for player_name, coordinates, direction in moves:
+            game.make_move(player_name, coordinates, direction)
+            game.get_marble_count()
+        moves_made += len(moves)
+    return moves_made
+
+
+def bench_engine(workload, engine, games, repeat):
+    """
+    Returns the best moves per second of the engine running the workload over the given number of repeats.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        moves_made = workload(engine, games)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return moves_made / best
+
+
+def bench_batch(games, steps, seed):
+    """
+    Plays random legal moves on every board of a KubaBatch for the given number of steps.  Returns the moves applied
+    per second counting only make_moves, and counting both the move sampling and make_moves.
+    """
+    from KubaBatch import KubaBatch
+
+    rng = numpy.random.default_rng(seed)
+    batch = KubaBatch(games)
+    moves_made = 0
+    apply_time = 0.0
+    start = time.perf_counter()
+    for _ in range(steps):
+        mask = batch.legal_move_mask().reshape(games, 196)
+        choice = (rng.random((games, 196)) * mask).argmax(axis=1)
+        squares = choice // 4
+        players = numpy.maximum(batch.get_current_turns(), 0)
+        apply_start = time.perf_counter()
+        made = batch.make_moves(players, squares // 7, squares % 7, choice % 4)
+        apply_time += time.perf_counter() - apply_start
+        moves_made += int(made.sum())
+    total_time = time.perf_counter() - start
+    return moves_made / apply_time, moves_made / total_time
+
+
+def main():
+    """
+    Generates random games and prints moves per second for each engine
+    """
+    parser = argparse.ArgumentParser(description="Compare move throughput of KubaGame and KubaBitboard.")
+    parser.add_argument("--games", type=int, default=200, help="number of random games to replay")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed repeats, the best is reported")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random games")
+    parser.add_argument("--batch-sizes", default="1,1000,100000", help="comma separated KubaBatch sizes")
+    parser.add_argument("--batch-steps", type=int, default=20, help="moves per board in the KubaBatch benchmark")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    games = [random_game(rng) for _ in range(args.games)]
+    total_moves = sum(len(moves) for moves in games)
+    print(f"Replaying {args.games} games ({total_moves} moves)")
+
+    for label, workload in (("make_move", replay), ("make_move + get_marble_count", replay_with_counts)):
+        list_rate = bench_engine(workload, KubaGame, games, args.repeat)
+        bitboard_rate = bench_engine(workload, KubaBitboard, games, args.repeat)
+        print("")
+        print(label)
+        print(f"KubaGame:      {list_rate:12,.0f} moves/sec")
+        print(f"KubaBitboard:  {bitboard_rate:12,.0f} moves/sec")
+        print(f"Speedup:       {bitboard_rate / list_rate:12.2f}x")
+
+    if numpy is None:
+        print("")
+        print("numpy is not installed, skipping the KubaBatch benchmark")
+        return
+
+    print("")
+    print("KubaBatch (aggregate moves/sec over all boards)")
+    for size in args.batch_sizes.split(","):
+        apply_rate, rollout_rate = bench_batch(int(size), args.batch_steps, args.seed)
+        print(f"N = {int(size):>7,}:  {apply_rate:14,.0f} make_moves only  {rollout_rate:14,.0f} with sampling")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Exports positions seen in KubaGame games to fixed width shard files that training jobs can open with
+# numpy.memmap, plus a manifest listing the shards.
+
+# Each shard is a raw array of POSITION_DTYPE records with no header, so numpy.memmap(path, dtype=POSITION_DTYPE)
+# maps it directly.  Every writer appends to its own shards, named with the writer's id, and registers each finished
+# shard in manifest.json so many writers can export into the same directory.
+
+import argparse
+import json
+import os
+import uuid
+
+import numpy as np
+
+from KubaGame import KubaGame
+
+MANIFEST = "manifest.json"
+COLORS = ("W", "B", "R")
+
+# planes hold 1 where a marble of that color is (W, B, R); side_to_move is 0 for player A and 1 for player B;
+# outcome is 1 if the side to move went on to win, -1 if it lost and 0 if the game had no winner
+POSITION_DTYPE = np.dtype([
+    ("planes", np.int8, (3, 7, 7)),
+    ("side_to_move", np.int8),
+    ("captured", np.int8, (2,)),
+    ("outcome", np.int8),
+])
+
+
+def position_planes(game):
+    """
+    Returns the (3, 7, 7) int8 planes of the marbles on the board of a KubaGame.
+    """
+    planes = np.zeros((3, 7, 7), dtype=np.int8)
+    for x in range(7):
+        for y in range(7):
+            marble = game.get_marble((x, y))
+            if marble != "X":
+                planes[COLORS.index(marble), x, y] = 1
+    return planes
+
+
+def game_positions(player_a, player_b, first_player, moves, winner):
+    """
+    Replays a game and returns a POSITION_DTYPE array with one record for every position a player moved from.  winner
+    is the winning player's name as the selfplay record gives it, or None, since a player left with no legal moves loses
+    without KubaGame setting a winner.
+    """
+    game = KubaGame(player_a, player_b)
+    records = np.zeros(len(moves), dtype=POSITION_DTYPE)
+    player_name = first_player
+    movers = []
+    for number, (coordinates, direction) in enumerate(moves):
+        record = records[number]
+        record["planes"] = position_planes(game)
+        record["side_to_move"] = 0 if player_name == player_a[0] else 1
+        record["captured"] = (game.get_captured(player_a[0]), game.get_captured(player_b[0]))
+        movers.append(player_name)
+        if not game.make_move(player_name, coordinates, direction):
+            raise ValueError(f"illegal move {coordinates} {direction} by {player_name}")
+        player_name = game.get_current_turn()
+
+    if winner is not None:
+        records["outcome"] = [1 if mover == winner else -1 for mover in movers]
+    return records
+
+
+class ShardWriter:
+    """
+    Writes position records into shard files of at most shard_size records.  The writer id keeps shard names from
+    different writers apart, so independent processes can export into one directory.  Shards are created exclusively,
+    skipping any name already taken, so a reused writer id never overwrites a shard the manifest lists.
+    """
+
+    def __init__(self, directory, writer_id=None, shard_size=1 << 20):
+        """
+        Takes the output directory, a writer id unique among the writers sharing the directory, a random one by
+        default, and the number of records per shard.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._writer_id = writer_id if writer_id is not None else uuid.uuid4().hex
+        self._shard_size = shard_size
+        self._shard_number = 0
+        self._file = None
+        self._name = None
+        self._records = 0
+
+    def write(self, records):
+        """
+        Appends a POSITION_DTYPE array, starting a new shard whenever the current one is full.
+        """
+        while len(records):
+            if self._file is None:
+                self._open_shard()
+            room = self._shard_size - self._records
+            chunk = records[:room]
+            self._file.write(chunk.tobytes())
+            self._records += len(chunk)
+            records = records[room:]
+            if self._records == self._shard_size:
+                self._finish_shard()
+
+    def _open_shard(self):
+        """
+        Creates the next shard file whose name is not taken.
+        """
+        while True:
+            self._name = f"positions-{self._writer_id}-{self._shard_number:05d}.bin"
+            try:
+                self._file = open(os.path.join(self._directory, self._name), "xb")
+            except FileExistsError:
+                self._shard_number += 1
+                continue
+            self._records = 0
+            return
+
+    def close(self):
+        """
+        Finishes the current shard.
+        """
+        if self._file is not None:
+            self._finish_shard()
+
+    def _finish_shard(self):
+        """
+        Closes the current shard and adds it to the manifest.
+        """
+        self._file.close()
+        self._file = None
+        add_to_manifest(self._directory, self._name, self._records)
+        self._shard_number += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _manifest_lock(directory):
+    """
+    Returns an open lock file for the manifest.  The lock is taken with fcntl where it exists.
+    """
+    lock = open(os.path.join(directory, MANIFEST + ".lock"), "w")
+    try:
+        import fcntl
+    except ImportError:
+        return lock
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+
+def add_to_manifest(directory, shard_name, records):
+    """
+    Adds a finished shard to the manifest of the directory.  The manifest is rewritten under a lock and replaced
+    atomically so readers never see a partial file.
+    """
+    lock = _manifest_lock(directory)
+    try:
+        manifest = read_manifest(directory)
+        manifest["shards"].append({"file": shard_name, "records": records})
+        path = os.path.join(directory, MANIFEST)
+        with open(path + ".tmp", "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=1)
+        os.replace(path + ".tmp", path)
+    finally:
+        lock.close()
+
+
+def read_manifest(directory):
+    """
+    Returns the manifest of the directory as a dict with the record dtype description and the list of shards.
+    """
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return {"dtype": POSITION_DTYPE.descr, "shards": []}
+    with open(path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def open_shards(directory):
+    """
+    Returns a read only numpy.memmap of every shard listed in the manifest.  Nothing is read until records are used.
+    """
+    shards = []
+    for shard in read_manifest(directory)["shards"]:
+        if shard["records"]:
+            path = os.path.join(directory, shard["file"])
+            shards.append(np.memmap(path, dtype=POSITION_DTYPE, mode="r", shape=(shard["records"],)))
+    return shards
+
+
+def sample_positions(shards, count, rng):
+    """
+    Returns count records drawn uniformly at random from the memory mapped shards, copying only those records.
+    """
+    sizes = np.array([len(shard) for shard in shards])
+    picks = rng.integers(0, sizes.sum(), count)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    shard_numbers = np.searchsorted(starts, picks, side="right") - 1
+    sample = np.empty(count, dtype=POSITION_DTYPE)
+    for number, shard in enumerate(shards):
+        chosen = shard_numbers == number
+        if chosen.any():
+            sample[chosen] = shard[np.sort(picks[chosen] - starts[number])]
+    return sample[rng.permutation(count)]
+
+
+def main():
+    """
+    Exports the games of a selfplay.py JSON lines file to shards
+    """
+    parser = argparse.ArgumentParser(description="Export self-play positions to memory mappable shards.")
+    parser.add_argument("source", help="JSON lines written by selfplay.py")
+    parser.add_argument("directory", help="output directory for the shards and manifest")
+    parser.add_argument("--writer-id", default=None, help="unique id of this writer, random by default")
+    parser.add_argument("--shard-size", type=int, default=1 << 20, help="records per shard")
+    args = parser.parse_args()
+
+    players = (("PlayerA", "W"), ("PlayerB", "B"))
+    positions = 0
+    with open(args.source) as source, ShardWriter(args.directory, args.writer_id, args.shard_size) as writer:
+        for line in source:
+            record = json.loads(line)
+            if not record["moves"]:
+                continue
+            moves = [(tuple(coordinates), direction) for player, coordinates, direction in record["moves"]]
+            records = game_positions(players[0], players[1], record["moves"][0][0], moves, record["winner"])
+            writer.write(records)
+            positions += len(records)
+    print(f"exported {positions} positions to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
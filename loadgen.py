@@ -0,0 +1,125 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Load generator for server.py.  Opens many concurrent KubaGame sessions, plays random legal moves in all
+# of them and reports move latency percentiles.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+
+async def request(reader, writer, message):
+    """
+    Sends one request and returns the decoded response.
+    """
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def run_connection(host, port, games, moves, rng, latencies):
+    """
+    Opens one connection, creates its games and then plays one random legal move in each game in turn until every
+    game has made the given number of moves or finished.  Appends the latency of every move request to latencies.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    sessions = []
+    for number in range(games):
+        response = await request(reader, writer, {"cmd": "new", "players": [["A", "W"], ["B", "B"]]})
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        sessions.append(response["session"])
+
+    # every game stays open until the whole run is over, so all sessions are concurrent
+    for _ in range(moves):
+        for session in list(sessions):
+            legal = await request(reader, writer, {"cmd": "moves", "session": session})
+            turn = await request(reader, writer, {"cmd": "turn", "session": session})
+            if not legal["moves"]:
+                sessions.remove(session)
+                continue
+            coordinates, direction = rng.choice(legal["moves"])
+            player = turn["turn"] or "A"
+            start = time.perf_counter()
+            response = await request(reader, writer, {"cmd": "move", "session": session, "player": player,
+                                                      "coordinates": coordinates, "direction": direction})
+            latencies.append(time.perf_counter() - start)
+            if response["winner"] is not None:
+                sessions.remove(session)
+    writer.close()
+
+
+def percentile(values, fraction):
+    """
+    Returns the value at the given fraction of the sorted values.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_load(host, port, games, connections, moves, seed):
+    """
+    Spreads the games over the connections, runs them all concurrently and prints the results.
+    """
+    latencies = []
+    per_connection = [games // connections + (1 if number < games % connections else 0)
+                      for number in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(run_connection(host, port, count, moves, random.Random(f"{seed}:{number}"), latencies)
+                           for number, count in enumerate(per_connection) if count))
+    elapsed = time.perf_counter() - start
+    print(f"{games} concurrent games over {connections} connections, {len(latencies)} moves in {elapsed:.1f} seconds")
+    print(f"move latency  p50 {percentile(latencies, 0.5) * 1000:.2f} ms  p90 {percentile(latencies, 0.9) * 1000:.2f} ms"
+          f"  p99 {percentile(latencies, 0.99) * 1000:.2f} ms  max {max(latencies) * 1000:.2f} ms")
+
+
+def wait_for_server(host, port, timeout=10.0):
+    """
+    Waits until the server accepts connections, raising RuntimeError after timeout seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1.0).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"server at {host}:{port} did not start")
+            time.sleep(0.1)
+
+
+def main():
+    """
+    Runs the load generator, starting a local server process unless --no-spawn is given
+    """
+    parser = argparse.ArgumentParser(description="Load test server.py with many concurrent games.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--games", type=int, default=10000, help="concurrent games")
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--moves", type=int, default=5, help="moves played in every game")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-spawn", action="store_true", help="use a server that is already running")
+    args = parser.parse_args()
+
+    server = None
+    if not args.no_spawn:
+        server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+        server = subprocess.Popen([sys.executable, server_path, "--host", args.host, "--port", str(args.port)])
+    try:
+        wait_for_server(args.host, args.port)
+        asyncio.run(run_load(args.host, args.port, args.games, args.connections, args.moves, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -21,7 +21,16 @@
 # push off a neutral or opposing marble, you are entitled to another turn.
 # Kuba incorporates the Ko rule to prohibit the same position being repeated over and over again.
 
+import os
+
+from KubaBook import KubaBook
 from KubaGame import KubaGame
+from KubaMCTS import KubaMCTS
+from KubaRenderer import KubaRenderer
+from KubaSearch import KubaSearch
+
+# opening book built with "python KubaBook.py opening.book", used for hints and by the computer when it is present
+BOOK_PATH = "opening.book"
 
 
 def print_commands():
@@ -38,6 +47,7 @@ def print_commands():
     print("count:  Display the count of each marble color on the board as (W,B,R).")
     print("colors: Display the marble color for each player.")
     print("names: Display the name of each player.")
+    print("hint:  Suggest a move for the player whose turn it is.")
     print("exit:  Quit the game.")
     print("")
 
@@ -98,6 +108,19 @@ def main():
     else:
         player2_color = "W"
 
+    # Opening book, if one has been built
+    book = KubaBook(BOOK_PATH) if os.path.exists(BOOK_PATH) else None
+
+    # Computer opponent setup
+    computer = None
+    play_computer = input(f"Should {player2_name} be played by the computer?  Enter Y or N: ")
+    if play_computer == "Y" or play_computer == "y":
+        engine = input("Which engine?  Enter S for alpha-beta search or M for Monte Carlo tree search: ")
+        if engine == "M" or engine == "m":
+            computer = KubaMCTS(time_budget=1.0)
+        else:
+            computer = KubaSearch(time_budget=0.2, book=book)
+
     print("")
     print("Game board layout:  'B' and 'W' are player marbles, 'R' are the red marbles, 'X' are empty spaces.  ")
     print(f"{player1_name} is marble color '{player1_color}', "
@@ -108,7 +131,8 @@ def main():
     # Initialize board
     print("GAME BOARD")
     game = KubaGame((player1_name, player1_color), (player2_name, player2_color))
-    game.print_board()
+    renderer = KubaRenderer(game)
+    print(renderer.render())
     print("")
 
     while True:
@@ -118,6 +142,25 @@ def main():
             print(f"{winner} is the winner!  Congratulations!")
             break
 
+        # computer takes its turn
+        if computer is not None and game.get_current_turn() == player2_name:
+            computer_move = computer.choose_move(game, player2_name)
+            if computer_move is None:
+                print(f"{player2_name} has no legal moves.  {player1_name} is the winner!  Congratulations!")
+                break
+            game.make_move(player2_name, computer_move[0], computer_move[1])
+            stats = computer.get_last_stats()
+            direction_name = {"L": "left", "R": "right", "F": "up", "B": "down"}[computer_move[1]]
+            if stats.get("book"):
+                print(f"{player2_name} moved the marble at {computer_move[0]} {direction_name} (opening book)")
+            elif "depth" in stats:
+                print(f"{player2_name} moved the marble at {computer_move[0]} {direction_name} "
+                      f"(depth {stats['depth']}, {stats['nodes_per_second']:,.0f} nodes/sec)")
+            else:
+                print(f"{player2_name} moved the marble at {computer_move[0]} {direction_name} "
+                      f"({stats['playouts']} playouts, {stats['playouts_per_second']:,.0f} playouts/sec)")
+            continue
+
         # get command
         command = input("Enter command: ")
 
@@ -133,7 +176,7 @@ def main():
         if command == "board":
             print("")
             print("GAME BOARD")
-            game.print_board()
+            print(renderer.render())
             print("")
 
         # print who's turn it is
@@ -160,7 +203,9 @@ def main():
                 continue
 
             # make the movement
-            movement = game.make_move(move_player, int_coords, move_direction)
+            # KubaGame calls up and down F (forward) and B (backward)
+            game_direction = {"R": "R", "L": "L", "U": "F", "D": "B"}[move_direction]
+            movement = game.make_move(move_player, int_coords, game_direction)
             if not movement:
                 print("Invalid movement")
                 continue
@@ -196,6 +241,18 @@ def main():
         if command == "names":
             print(f"Player 1 name is {player1_name} and player 2 name is {player2_name}")
 
+        # suggest a move from the opening book, or from a short search once the game has left the book
+        if command == "hint":
+            hint_player = game.get_current_turn()
+            if hint_player is None:
+                hint_player = player1_name
+            hint_move = KubaSearch(time_budget=0.5, book=book).choose_move(game, hint_player)
+            if hint_move is None:
+                print(f"{hint_player} has no legal moves.")
+                continue
+            direction_name = {"L": "left", "R": "right", "F": "up", "B": "down"}[hint_move[1]]
+            print(f"Hint for {hint_player}: move the marble at {hint_move[0]} {direction_name}")
+
 
 if __name__ == "__main__":
     main()
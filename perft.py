@@ -0,0 +1,193 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Counts the positions reachable from the starting layout of KubaGame in a given number of plies, as a
+# correctness check for faster move engines and as a throughput benchmark.
+
+# As with perft in chess, the counts cover the leaves, the positions reached after exactly depth plies.  A move that
+# wins the game ends its branch, so it only counts when it is made on the last ply.  Each leaf is counted once for
+# every move sequence that reaches it:
+#   nodes      leaves
+#   captures   leaves reached by pushing off a red marble
+#   push_offs  leaves reached by pushing off any marble
+#   terminal   leaves where the move won the game
+# Either player may make the first move of a game, so the first player is given.
+#
+# The subtree below a position depends on the board, the player to move, the captures and, through the Ko rule, the
+# board before the last move, so subtree counts are cached under those.  Root moves are split across worker processes,
+# each with its own cache.
+
+import argparse
+import multiprocessing
+import sys
+import time
+
+from KubaGame import KubaGame
+
+PLAYERS = (("PlayerA", "W"), ("PlayerB", "B"))
+FIELDS = ("nodes", "captures", "push_offs", "terminal")
+
+_NO_LEAVES = (0, 0, 0, 0)
+
+_worker_cache = {}
+
+
+def perft(game, player_name, depth, cache=None, cache_limit=1 << 20):
+    """
+    Returns the (nodes, captures, push_offs, terminal) counts for depth plies from the game's position with player_name
+    to move.  The game is left as it was found.  cache, if given, is a dict of subtree counts that is filled up to
+    cache_limit entries and can be passed to later calls.
+    """
+    if depth <= 0:
+        return 1, 0, 0, 0
+    return _perft(game, player_name, depth, cache, cache_limit)
+
+
+def _perft(game, player_name, depth, cache, cache_limit):
+    """
+    Returns the counts for depth plies, depth at least 1.  On the last ply the moves are counted without being made,
+    apart from push-offs, which are made to see whether they win.
+    """
+    if depth == 1:
+        nodes = 0
+        captures = 0
+        push_offs = 0
+        terminal = 0
+        for coordinates, direction in game.legal_moves(player_name):
+            nodes += 1
+            pushed_off = game.get_pushed_off_marble(coordinates, direction)
+            if pushed_off is not None:
+                push_offs += 1
+                if pushed_off == "R":
+                    captures += 1
+                delta = game.make_move(player_name, coordinates, direction, return_delta=True)
+                if game.get_winner() is not None:
+                    terminal += 1
+                game.unmake_move(delta)
+        return nodes, captures, push_offs, terminal
+
+    key = None
+    if cache is not None:
+        last_change = game.get_last_change()
+        key = (game.get_position_key(), last_change[0] if last_change is not None else None, depth)
+        counts = cache.get(key)
+        if counts is not None:
+            return counts
+
+    nodes = 0
+    captures = 0
+    push_offs = 0
+    terminal = 0
+    for coordinates, direction in list(game.legal_moves(player_name)):
+        delta = game.make_move(player_name, coordinates, direction, return_delta=True)
+        try:
+            if game.get_winner() is None:
+                counts = _perft(game, game.get_current_turn(), depth - 1, cache, cache_limit)
+                nodes += counts[0]
+                captures += counts[1]
+                push_offs += counts[2]
+                terminal += counts[3]
+        finally:
+            game.unmake_move(delta)
+
+    counts = (nodes, captures, push_offs, terminal)
+    if key is not None and len(cache) < cache_limit:
+        cache[key] = counts
+    return counts
+
+
+def divide(game, player_name, depth, cache=None, cache_limit=1 << 20):
+    """
+    Returns a list of (move, counts) with the counts below each legal move of the player, which add up to perft of the
+    same depth.
+    """
+    results = []
+    for move in list(game.legal_moves(player_name)):
+        results.append((move, _move_counts(game, player_name, move, depth, cache, cache_limit)))
+    return results
+
+
+def _move_counts(game, player_name, move, depth, cache, cache_limit):
+    """
+    Returns the counts for depth plies starting with one move.
+    """
+    coordinates, direction = move
+    if depth == 1:
+        pushed_off = game.get_pushed_off_marble(coordinates, direction)
+    delta = game.make_move(player_name, coordinates, direction, return_delta=True)
+    try:
+        if depth == 1:
+            return (1, 1 if pushed_off == "R" else 0, 1 if pushed_off is not None else 0,
+                    1 if game.get_winner() is not None else 0)
+        if game.get_winner() is not None:
+            return _NO_LEAVES
+        return _perft(game, game.get_current_turn(), depth - 1, cache, cache_limit)
+    finally:
+        game.unmake_move(delta)
+
+
+def _root_move_task(task):
+    """
+    Counts the subtree of one root move in a worker process, using the process's cache for every task it runs.
+    Returns (move, counts, cache size).
+    """
+    first_player, move, depth, use_cache, cache_limit = task
+    game = KubaGame(*PLAYERS)
+    cache = _worker_cache if use_cache else None
+    counts = _move_counts(game, first_player, move, depth, cache, cache_limit)
+    return move, counts, len(_worker_cache)
+
+
+def run_perft(depth, workers=None, first_player=PLAYERS[0][0], use_cache=True, cache_limit=1 << 20):
+    """
+    Counts depth plies from the starting layout and yields (move, counts, cache size) for each root move as it is
+    finished.  Root moves are spread over a pool of worker processes (one per CPU by default), or counted in this
+    process when workers is 1.
+    """
+    game = KubaGame(*PLAYERS)
+    tasks = [(first_player, move, depth, use_cache, cache_limit) for move in game.legal_moves(first_player)]
+    if workers == 1:
+        for task in tasks:
+            yield _root_move_task(task)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(_root_move_task, tasks):
+            yield result
+
+
+def main():
+    """
+    Runs perft from the command line and prints the counts of each root move and the totals
+    """
+    parser = argparse.ArgumentParser(description="Count the KubaGame move tree from the starting layout.")
+    parser.add_argument("depth", type=int, help="plies to count")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU by default")
+    parser.add_argument("--first", choices=[name for name, color in PLAYERS], default=PLAYERS[0][0],
+                        help="player who makes the first move")
+    parser.add_argument("--no-cache", action="store_true", help="count every subtree instead of caching by position")
+    parser.add_argument("--cache-limit", type=int, default=1 << 20, help="cached subtrees per worker")
+    parser.add_argument("--divide", action="store_true", help="print the counts below each root move")
+    args = parser.parse_args()
+    if args.depth < 1:
+        parser.error("depth must be at least 1")
+
+    start = time.perf_counter()
+    totals = [0, 0, 0, 0]
+    cache_size = 0
+    for move, counts, size in run_perft(args.depth, args.workers, args.first, not args.no_cache, args.cache_limit):
+        for index, count in enumerate(counts):
+            totals[index] += count
+        cache_size = max(cache_size, size)
+        if args.divide:
+            print(f"{move[0]} {move[1]}: {counts[0]:,}")
+    elapsed = time.perf_counter() - start
+
+    for field, count in zip(FIELDS, totals):
+        print(f"{field:10} {count:,}")
+    print(f"depth {args.depth} in {elapsed:.2f} seconds ({totals[0] / elapsed:,.0f} leaves/sec, "
+          f"largest cache {cache_size:,} subtrees)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
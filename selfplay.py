@@ -0,0 +1,191 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Plays KubaGame self-play games across a process pool and streams the finished games back as JSON lines.
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+from KubaGame import KubaGame
+from KubaSearch import KubaSearch
+
+PLAYERS = (("PlayerA", "W"), ("PlayerB", "B"))
+
+
+def random_policy(game, player_name, rng):
+    """
+    Returns a random legal move for the player, or None if there is none.
+    """
+    moves = list(game.legal_moves(player_name))
+    if not moves:
+        return None
+    return rng.choice(moves)
+
+
+def greedy_policy(game, player_name, rng):
+    """
+    Returns a random legal move that pushes off a red or opposing marble if there is one, otherwise a random legal
+    move, or None if the player has no legal move.
+    """
+    moves = list(game.legal_moves(player_name))
+    if not moves:
+        return None
+    if player_name == game.get_player_a_name():
+        own_color = game.get_player_a_color()
+    else:
+        own_color = game.get_player_b_color()
+    captures = []
+    for move in moves:
+        pushed_off = game.get_pushed_off_marble(move[0], move[1])
+        if pushed_off is not None and pushed_off != own_color:
+            captures.append(move)
+    if captures:
+        return rng.choice(captures)
+    return rng.choice(moves)
+
+
+class SearchPolicy:
+    """
+    Policy that plays the KubaSearch move at a fixed depth.  A fixed depth instead of a time budget keeps the games
+    reproducible however busy the machine is.
+    """
+
+    def __init__(self, depth=2):
+        """
+        Takes the search depth in plies.
+        """
+        self._search = KubaSearch(time_budget=float("inf"), max_depth=depth, table_bits=16)
+
+    def __call__(self, game, player_name, rng):
+        """
+        Returns the search move for the player, or None if there is none.
+        """
+        return self._search.choose_move(game, player_name)
+
+
+POLICIES = {
+    "random": lambda: random_policy,
+    "greedy": lambda: greedy_policy,
+    "search": SearchPolicy,
+}
+
+
+def game_winner(game):
+    """
+    Returns the winner of the game, or None if it is not over.  Besides KubaGame.get_winner, a player to move with no
+    legal moves has lost.
+    """
+    winner = game.get_winner()
+    if winner is not None:
+        return winner
+    player_name = game.get_current_turn()
+    if player_name is not None and next(game.legal_moves(player_name), None) is None:
+        if player_name == game.get_player_a_name():
+            return game.get_player_b_name()
+        return game.get_player_a_name()
+    return None
+
+
+def game_seed(seed, index):
+    """
+    Returns the random seed of one game.  Seeds depend only on the run seed and the game index, never on which worker
+    plays the game, so results are the same for any number of workers.
+    """
+    return f"{seed}:{index}"
+
+
+def play_game(index, seed, policy_names, max_moves):
+    """
+    Plays one game and returns its record as a dict with the game index, the moves as [player, [x, y], direction]
+    lists, the winner (None if the move limit was reached), the captures of each player and the final marble counts.
+    """
+    rng = random.Random(game_seed(seed, index))
+    policies = {
+        PLAYERS[0][0]: POLICIES[policy_names[0]](),
+        PLAYERS[1][0]: POLICIES[policy_names[1]](),
+    }
+    game = KubaGame(*PLAYERS)
+    player_name = PLAYERS[index % 2][0]     # alternate which player starts
+    moves = []
+    winner = None
+    while len(moves) < max_moves:
+        move = policies[player_name](game, player_name, rng)
+        if move is None:
+            break
+        game.make_move(player_name, move[0], move[1])
+        moves.append([player_name, list(move[0]), move[1]])
+        winner = game_winner(game)
+        if winner is not None:
+            break
+        player_name = game.get_current_turn()
+    if winner is None:
+        winner = game_winner(game)
+
+    return {
+        "index": index,
+        "moves": moves,
+        "winner": winner,
+        "captured": [game.get_captured(PLAYERS[0][0]), game.get_captured(PLAYERS[1][0])],
+        "marble_count": list(game.get_marble_count()),
+    }
+
+
+def _play_game_task(task):
+    """
+    Unpacks a task tuple for Pool.imap_unordered.
+    """
+    return play_game(*task)
+
+
+def run_selfplay(games, workers=None, seed=0, policy_names=("random", "random"), max_moves=400, chunksize=4):
+    """
+    Plays the given number of games and yields each game record as soon as it is finished, so records arrive in
+    completion order rather than index order.  Games are spread over a pool of worker processes (one per CPU by
+    default), or played in this process when workers is 1.
+    """
+    tasks = ((index, seed, tuple(policy_names), max_moves) for index in range(games))
+    if workers == 1:
+        for task in tasks:
+            yield _play_game_task(task)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        for record in pool.imap_unordered(_play_game_task, tasks, chunksize):
+            yield record
+
+
+def main():
+    """
+    Runs self-play from the command line and writes one JSON record per line
+    """
+    parser = argparse.ArgumentParser(description="Play KubaGame self-play games in parallel.")
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU by default")
+    parser.add_argument("--seed", type=int, default=0, help="run seed, games are reproducible for the same seed")
+    parser.add_argument("--policy-a", choices=sorted(POLICIES), default="random", help="policy of PlayerA")
+    parser.add_argument("--policy-b", choices=sorted(POLICIES), default="random", help="policy of PlayerB")
+    parser.add_argument("--max-moves", type=int, default=400, help="moves before a game is stopped without a winner")
+    parser.add_argument("--out", default="-", help="output file for the JSON lines, - for stdout")
+    args = parser.parse_args()
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w")
+    start = time.perf_counter()
+    total_moves = 0
+    try:
+        for record in run_selfplay(args.games, args.workers, args.seed, (args.policy_a, args.policy_b),
+                                   args.max_moves):
+            total_moves += len(record["moves"])
+            out.write(json.dumps(record) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"{args.games} games, {total_moves} moves in {elapsed:.2f} seconds "
+          f"({args.games / elapsed:,.1f} games/sec, {total_moves / elapsed:,.0f} moves/sec)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
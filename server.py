@@ -0,0 +1,334 @@
+# Author:  Brian Andrews
+# Date:  10/18/2026
+# Description:  Asyncio TCP server hosting many KubaGame sessions behind a line oriented JSON protocol.
+
+# Every request is one JSON object per line and gets one JSON object per line back.  Requests name a command with
+# "cmd".  "new" takes "players" as [[name, color], [name, color]] and returns a "session" id.  The other commands take
+# that "session" and mirror the commands of main.py:
+#   move      "player", "coordinates" [x, y] and "direction", returns "result" true or false and the "winner"
+#   board     returns "board", the seven rows
+#   diff      returns "changes", the [[x, y], marble] squares changed since the last board or diff request
+#   turn      returns "turn"
+#   captured  returns "captured", a dict of red marbles captured by player name
+#   marble    "coordinates" [x, y], returns "marble"
+#   count     returns "count" as [W, B, R]
+#   moves     returns "moves", the legal [[x, y], direction] moves of the player to move (or of "player")
+#   close     ends the session
+# "stats" needs no session and returns "stats", the KubaInstrumentation snapshot, when the server runs with
+# --instrument.
+# Every response has "ok", and "error" with a message when ok is false.
+#
+# With --store DIR the server journals every new session, accepted move and closed session to a KubaStore in DIR and
+# reopens the live sessions, under their old ids, when it starts again.
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+from KubaGame import KubaGame
+from KubaInstrumentation import KubaInstrumentation
+from KubaRenderer import KubaRenderer
+from KubaStore import KubaStore
+
+MAX_LINE = 4096
+
+
+class Session:
+    """
+    One hosted game with its lock, its renderer and the time it was last used.
+    """
+
+    __slots__ = ("game", "lock", "renderer", "last_used")
+
+    def __init__(self, game):
+        """
+        Takes the KubaGame the session hosts.
+        """
+        self.game = game
+        self.renderer = KubaRenderer(game)
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class KubaServer:
+    """
+    Holds the session table and answers protocol requests.  Commands on one session run one at a time under the
+    session's lock, sessions idle for longer than idle_timeout seconds are evicted, and new sessions are refused once
+    max_sessions are open.  Each connection handles one request at a time and waits for its response to drain before
+    reading the next line, so a slow client only holds back itself.
+    """
+
+    def __init__(self, max_sessions=100000, idle_timeout=600.0, instrumentation=None, store=None):
+        """
+        Takes the session limit, the idle time in seconds after which a session is evicted, an optional enabled
+        KubaInstrumentation whose snapshot the stats command returns and an optional KubaStore, not yet recovered,
+        that the sessions are restored from and journaled to.
+        """
+        self._instrumentation = instrumentation
+        self._store = store
+        self._sessions = {}
+        last_id = 0
+        if store is not None:
+            for session_id, game in store.recover().items():
+                self._sessions[session_id] = Session(game)
+                if session_id.isdigit():
+                    last_id = max(last_id, int(session_id))
+        self._ids = itertools.count(last_id + 1)
+        self._max_sessions = max_sessions
+        self._idle_timeout = idle_timeout
+        self._commands = {
+            "move": self._move,
+            "board": self._board,
+            "diff": self._diff,
+            "turn": self._turn,
+            "captured": self._captured,
+            "marble": self._marble,
+            "count": self._count,
+            "moves": self._moves,
+            "close": self._close,
+        }
+
+    def get_session_count(self):
+        """
+        Returns the number of open sessions.
+        """
+        return len(self._sessions)
+
+    async def handle_request(self, request):
+        """
+        Takes a decoded request dict and returns the response dict.
+        """
+        command = request.get("cmd")
+        if command == "new":
+            return self._new(request)
+        if command == "stats":
+            if self._instrumentation is None:
+                return {"ok": False, "error": "instrumentation is not enabled"}
+            return {"ok": True, "stats": self._instrumentation.snapshot()}
+        handler = self._commands.get(command) if isinstance(command, str) else None
+        if handler is None:
+            return {"ok": False, "error": f"unknown command {command!r}"}
+        session_id = request.get("session")
+        if not isinstance(session_id, str):
+            return {"ok": False, "error": "session must be a string"}
+        session = self._sessions.get(session_id)
+        if session is None:
+            return {"ok": False, "error": "unknown session"}
+        async with session.lock:
+            session.last_used = time.monotonic()
+            try:
+                return handler(request, session)
+            except (KeyError, TypeError, ValueError, IndexError) as error:
+                return {"ok": False, "error": f"bad request: {error}"}
+
+    def _new(self, request):
+        """
+        Opens a session for the two players of the request.
+        """
+        if len(self._sessions) >= self._max_sessions:
+            return {"ok": False, "error": "server is full"}
+        try:
+            (name_a, color_a), (name_b, color_b) = request["players"]
+        except (KeyError, TypeError, ValueError):
+            return {"ok": False, "error": "players must be [[name, color], [name, color]]"}
+        if not all(isinstance(value, str) for value in (name_a, color_a, name_b, color_b)):
+            return {"ok": False, "error": "player names and colors must be strings"}
+        if {color_a, color_b} != {"W", "B"} or name_a == name_b:
+            return {"ok": False, "error": "players need different names and the colors W and B"}
+        session_id = str(next(self._ids))
+        game = KubaGame((name_a, color_a), (name_b, color_b))
+        if self._store is not None:
+            try:
+                self._store.add_game(session_id, game)
+            except ValueError as error:
+                return {"ok": False, "error": f"bad request: {error}"}
+        self._sessions[session_id] = Session(game)
+        return {"ok": True, "session": session_id}
+
+    def _move(self, request, session):
+        """
+        Makes a move in the session's game.
+        """
+        game = session.game
+        player_name = request["player"]
+        if player_name != game.get_player_a_name() and player_name != game.get_player_b_name():
+            return {"ok": False, "error": f"unknown player {player_name!r}"}
+        coordinates = request["coordinates"]
+        direction = request["direction"]
+        if (not isinstance(coordinates, list) or len(coordinates) != 2
+                or any(type(value) is not int or not 0 <= value <= 6 for value in coordinates)):
+            return {"ok": False, "error": "coordinates must be [x, y] with integers from 0 to 6"}
+        if type(direction) is not str or direction not in ("L", "R", "F", "B"):
+            return {"ok": False, "error": "direction must be one of L, R, F and B"}
+        coordinates = tuple(coordinates)
+        result = game.make_move(player_name, coordinates, direction, return_delta=self._store is not None)
+        if result and self._store is not None:
+            # a move the journal cannot take would be lost on restart, so it is taken back
+            try:
+                self._store.record_move(request["session"], player_name, coordinates, direction)
+            except Exception as error:
+                game.unmake_move(result)
+                return {"ok": False, "error": f"move could not be journaled: {error}"}
+        return {"ok": True, "result": bool(result), "winner": game.get_winner()}
+
+    def _board(self, request, session):
+        """
+        Returns the rows of the session's board.
+        """
+        return {"ok": True, "board": session.renderer.get_rows()}
+
+    def _diff(self, request, session):
+        """
+        Returns the squares of the session's board that changed since the last board or diff request, or every square
+        on the first request.
+        """
+        return {"ok": True, "changes": [[list(coordinates), marble] for coordinates, marble in session.renderer.diff()]}
+
+    def _turn(self, request, session):
+        """
+        Returns the player whose turn it is.
+        """
+        return {"ok": True, "turn": session.game.get_current_turn()}
+
+    def _captured(self, request, session):
+        """
+        Returns the reds captured by each player.
+        """
+        game = session.game
+        names = (game.get_player_a_name(), game.get_player_b_name())
+        return {"ok": True, "captured": {name: game.get_captured(name) for name in names}}
+
+    def _marble(self, request, session):
+        """
+        Returns the marble at the requested coordinates.
+        """
+        return {"ok": True, "marble": session.game.get_marble(tuple(request["coordinates"]))}
+
+    def _count(self, request, session):
+        """
+        Returns the marble counts as [W, B, R].
+        """
+        return {"ok": True, "count": list(session.game.get_marble_count())}
+
+    def _moves(self, request, session):
+        """
+        Returns the legal moves of the requested player, or of the player to move.
+        """
+        game = session.game
+        player_name = request.get("player") or game.get_current_turn() or game.get_player_a_name()
+        return {"ok": True, "moves": [[list(coordinates), direction]
+                                      for coordinates, direction in game.legal_moves(player_name)]}
+
+    def _close(self, request, session):
+        """
+        Removes the session from the table.
+        """
+        self._sessions.pop(request["session"], None)
+        if self._store is not None:
+            self._store.remove_game(request["session"])
+        return {"ok": True}
+
+    def evict_idle(self):
+        """
+        Removes every session that has not been used for idle_timeout seconds and returns how many were removed.
+        """
+        cutoff = time.monotonic() - self._idle_timeout
+        idle = [key for key, session in self._sessions.items()
+                if session.last_used < cutoff and not session.lock.locked()]
+        for key in idle:
+            del self._sessions[key]
+            if self._store is not None:
+                self._store.remove_game(key)
+        return len(idle)
+
+    async def evict_forever(self, interval=10.0):
+        """
+        Evicts idle sessions every interval seconds until cancelled, and snapshots the store when it is due.  The
+        snapshot runs on the event loop so that no move is recorded while it is written.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+            if self._store is not None and self._store.snapshot_due():
+                self._store.snapshot()
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves one client connection until it closes.
+        """
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(b'{"ok": false, "error": "line too long"}\n')
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as error:
+                    response = {"ok": False, "error": f"bad request: {error}"}
+                else:
+                    try:
+                        response = await self.handle_request(request)
+                    except Exception as error:
+                        # a request that slips past the checks gets an error rather than closing the connection
+                        response = {"ok": False, "error": f"bad request: {error!r}"}
+                    if "id" in request:
+                        response["id"] = request["id"]
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port, eviction_interval=10.0):
+        """
+        Listens on host and port and serves clients until cancelled.
+        """
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_LINE)
+        evictor = asyncio.create_task(self.evict_forever(eviction_interval))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+
+
+def main():
+    """
+    Runs the server from the command line
+    """
+    parser = argparse.ArgumentParser(description="Host KubaGame sessions over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-sessions", type=int, default=100000)
+    parser.add_argument("--idle-timeout", type=float, default=600.0, help="seconds before an idle session is evicted")
+    parser.add_argument("--instrument", action="store_true", help="record move latencies for the stats command")
+    parser.add_argument("--store", help="directory to journal sessions to and restore them from")
+    args = parser.parse_args()
+    instrumentation = None
+    if args.instrument:
+        instrumentation = KubaInstrumentation()
+        instrumentation.enable()
+    store = None
+    if args.store:
+        store = KubaStore(args.store)
+    server = KubaServer(args.max_sessions, args.idle_timeout, instrumentation, store)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if store is not None:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()